@@ -0,0 +1,184 @@
+"""
+Booth Name Matcher
+
+In-memory index of each division's polling place names, used to resolve the
+booth names read off tally sheets (OCR and SMS) to AEC polling places. Names
+are normalized (case, punctuation, common abbreviations) for exact lookups,
+and a trigram inverted index ranks near misses by similarity.
+
+Divisions are indexed on first use. Each index records the reference data
+version it was built from and is only used while that is still the current
+version, so it follows polling place reloads made by any process.
+"""
+
+import os
+import re
+import threading
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+# Minimum similarity for a match to be applied without a reviewer
+BOOTH_MATCH_THRESHOLD = float(os.environ.get("BOOTH_MATCH_THRESHOLD", "0.6"))
+
+ABBREVIATIONS = {
+    "PS": "PUBLIC SCHOOL",
+    "HS": "HIGH SCHOOL",
+    "STH": "SOUTH",
+    "NTH": "NORTH",
+    "MT": "MOUNT",
+    "PT": "POINT",
+}
+
+_NON_ALPHANUMERIC = re.compile(r"[^A-Z0-9 ]+")
+
+
+def normalize_booth_name(name: Optional[str]) -> str:
+    """Normalize a booth name: upper case, no punctuation, expanded abbreviations."""
+    if not name:
+        return ""
+    words = _NON_ALPHANUMERIC.sub(" ", name.upper().replace("&", " AND ")).split()
+    # Rejoin dotted initials ("P.S." -> "PS") so they expand like abbreviations
+    joined: List[str] = []
+    for word, previous in zip(words, [""] + words):
+        if len(word) == 1 and len(previous) == 1 and joined:
+            joined[-1] += word
+        else:
+            joined.append(word)
+    return " ".join(ABBREVIATIONS.get(word, word) for word in joined)
+
+
+def trigrams(normalized: str) -> Set[str]:
+    """Get the character trigrams of a normalized name, padded at word edges."""
+    padded = f"  {normalized} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass
+class BoothMatch:
+    """A polling place a booth name may refer to."""
+
+    polling_place_id: int
+    polling_place_name: str
+    score: float
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class DivisionBoothIndex:
+    """Exact and trigram lookups over one division's polling places."""
+
+    def __init__(self, polling_places: Iterable[Tuple[int, str]]):
+        self.places: List[Tuple[int, str, Set[str]]] = []
+        self.exact: Dict[str, int] = {}
+        self.postings: Dict[str, List[int]] = {}
+        for polling_place_id, polling_place_name in polling_places:
+            normalized = normalize_booth_name(polling_place_name)
+            if not normalized:
+                continue
+            grams = trigrams(normalized)
+            position = len(self.places)
+            self.places.append((polling_place_id, polling_place_name, grams))
+            self.exact.setdefault(normalized, position)
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(position)
+
+    def match(self, name: Optional[str], limit: int = 5) -> List[BoothMatch]:
+        """
+        Get the polling places most similar to a booth name.
+
+        Args:
+            name: Booth name as read from the tally sheet
+            limit: Maximum number of matches to return
+
+        Returns:
+            Matches ordered by descending score (1.0 for an exact match)
+        """
+        normalized = normalize_booth_name(name)
+        if not normalized:
+            return []
+
+        exact = self.exact.get(normalized)
+        grams = trigrams(normalized)
+        shared: Dict[int, int] = {}
+        for gram in grams:
+            for position in self.postings.get(gram, ()):
+                shared[position] = shared.get(position, 0) + 1
+
+        # Jaccard similarity over trigram sets
+        scores = {
+            position: count / (len(grams) + len(self.places[position][2]) - count)
+            for position, count in shared.items()
+        }
+        if exact is not None:
+            scores[exact] = 1.0
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        return [
+            BoothMatch(
+                polling_place_id=self.places[position][0],
+                polling_place_name=self.places[position][1],
+                score=round(score, 3),
+            )
+            for position, score in ranked
+        ]
+
+
+class BoothNameIndex:
+    """Per-division booth name indexes, loaded on demand."""
+
+    def __init__(self, threshold: float = BOOTH_MATCH_THRESHOLD):
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        # {division: (reference data version, index)}
+        self._divisions: Dict[str, Tuple[int, DivisionBoothIndex]] = {}
+
+    def get(self, division: str, version: int) -> Optional[DivisionBoothIndex]:
+        """
+        Get a division's index if it was built from ``version`` of the
+        reference data, or None if it hasn't been loaded or is out of date.
+        """
+        cached = self._divisions.get(division)
+        if cached is None or cached[0] != version:
+            return None
+        return cached[1]
+
+    def install(
+        self,
+        division: str,
+        polling_places: Iterable[Tuple[int, str]],
+        version: int,
+    ) -> DivisionBoothIndex:
+        """
+        Index a division's (polling_place_id, polling_place_name) pairs.
+
+        ``version`` is the reference data version, read before the polling
+        places. The index is kept unless one from a later version already
+        is; it is returned either way.
+        """
+        index = DivisionBoothIndex(polling_places)
+        with self._lock:
+            cached = self._divisions.get(division)
+            if cached is None or cached[0] <= version:
+                self._divisions[division] = (version, index)
+        return index
+
+    def clear(self) -> None:
+        """Forget every division; they are re-indexed on next use."""
+        with self._lock:
+            self._divisions = {}
+
+    def resolve(
+        self, index: DivisionBoothIndex, name: Optional[str]
+    ) -> Tuple[Optional[BoothMatch], List[BoothMatch]]:
+        """
+        Resolve a booth name against a division's index.
+
+        Returns:
+            Tuple of (best match if it clears the threshold, candidate matches)
+        """
+        matches = index.match(name)
+        best = matches[0] if matches and matches[0].score >= self.threshold else None
+        # Two equally good candidates are left for a reviewer to pick
+        if best and len(matches) > 1 and matches[1].score == best.score:
+            best = None
+        return best, matches
@@ -10,11 +10,22 @@ import csv
 import json
 import logging
 import random
-import sqlite3
 import requests
 from pathlib import Path
 from typing import Dict, List, Any, Optional
 
+from sqlalchemy import text
+
+from common.bulk_loader import (
+    bulk_load,
+    file_sha256,
+    record_source_hash,
+    source_unchanged,
+    sync_rows,
+)
+from common.data_versions import REFERENCE_SCOPE, bump_versions, notify_changed
+from common.db_utils import get_connection, get_db_path, primary_key_column
+
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 )
@@ -25,7 +36,31 @@ AEC_BOOTH_RESULTS_URL = "https://results.aec.gov.au/27966/Website/Downloads/Hous
 DATA_DIR = Path(__file__).parent.parent / "data"
 is_docker = os.path.exists("/.dockerenv") or os.path.isdir("/app/data")
 data_dir_path = "/app/data" if is_docker else str(Path(__file__).parent.parent / "data")
-DB_PATH = Path(f"{data_dir_path}/results.db")
+DB_PATH = Path(get_db_path())
+POLLING_PLACE_COLUMNS = (
+    "state",
+    "division_id",
+    "division_name",
+    "polling_place_id",
+    "polling_place_name",
+    "address",
+    "latitude",
+    "longitude",
+    "status",
+    "wheelchair_access",
+    "data",
+)
+
+PREPOLL_BOOTH_PREFIX = "Pre-Poll-"
+
+BOOTH_RESULT_COLUMNS = (
+    "division_name",
+    "polling_place_name",
+    "liberal_national_percentage",
+    "labor_percentage",
+    "total_votes",
+    "data",
+)
 logger.info(f"Using database path: {DB_PATH}, exists: {DB_PATH.exists()}")
 logger.info(f"Current working directory: {os.getcwd()}")
 
@@ -92,24 +127,19 @@ def get_tcp_candidates_for_division(division_name: str) -> List[Dict[str, Any]]:
     """
     try:
         logger.info(f"Getting TCP candidates for division: {division_name}")
-        db_path_str = str(DB_PATH)
-        conn = sqlite3.connect(db_path_str)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-
-        cursor.execute(
+        with get_connection() as conn:
+            cursor = conn.execute(
+                text(
+                    """
+            SELECT * FROM tcp_candidates 
+            WHERE electorate = :division_name 
+            ORDER BY id
             """
-        SELECT * FROM tcp_candidates 
-        WHERE electorate = ? 
-        ORDER BY id
-        """,
-            (division_name,),
-        )
-
-        rows = cursor.fetchall()
-        results = [dict(row) for row in rows]
+                ),
+                {"division_name": division_name},
+            )
+            results = [dict(row) for row in cursor.mappings()]
 
-        conn.close()
         logger.info(f"Found {len(results)} TCP candidates for division {division_name}")
         return results
     except Exception as e:
@@ -157,23 +187,22 @@ def get_polling_place_by_id(polling_place_id: int) -> Optional[Dict[str, Any]]:
     """
     try:
         logger.info(f"Getting polling place by ID: {polling_place_id}")
-        db_path_str = str(DB_PATH)
-        conn = sqlite3.connect(db_path_str)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-
-        cursor.execute(
+        with get_connection() as conn:
+            row = (
+                conn.execute(
+                    text(
+                        """
+            SELECT * FROM polling_places 
+            WHERE polling_place_id = :polling_place_id
             """
-        SELECT * FROM polling_places 
-        WHERE polling_place_id = ?
-        """,
-            (polling_place_id,),
-        )
-
-        row = cursor.fetchone()
-        result = dict(row) if row else None
+                    ),
+                    {"polling_place_id": polling_place_id},
+                )
+                .mappings()
+                .first()
+            )
+            result = dict(row) if row else None
 
-        conn.close()
         if result:
             logger.info(f"Found polling place with ID {polling_place_id}")
         else:
@@ -185,58 +214,34 @@ def get_polling_place_by_id(polling_place_id: int) -> Optional[Dict[str, Any]]:
         return None
 
 
-def create_polling_places_table() -> None:
-    """Create the polling_places table in the SQLite database if it doesn't exist."""
-    try:
-        logger.info(f"Creating polling_places table in database: {DB_PATH}")
-        db_path_str = str(DB_PATH)
-        logger.info(f"Database path as string: {db_path_str}")
-        conn = sqlite3.connect(db_path_str)
-        cursor = conn.cursor()
-
-        cursor.execute("PRAGMA table_info(polling_places)")
-        columns = {column[1] for column in cursor.fetchall()}
-
-        required_columns = {
-            "status",
-            "wheelchair_access",
-            "address",
-            "latitude",
-            "longitude",
-        }
-        missing_columns = required_columns - columns
-
-        if columns and missing_columns:
-            logger.info(
-                f"Polling places table exists but is missing columns: {missing_columns}"
-            )
-            logger.info(
-                "Dropping and recreating polling_places table with correct schema"
+def _create_polling_places_sql(conn, table_name: str) -> str:
+    return f"""
+            CREATE TABLE IF NOT EXISTS {table_name} (
+                {primary_key_column(conn)},
+                state TEXT NOT NULL,
+                division_id INTEGER NOT NULL,
+                division_name TEXT NOT NULL,
+                polling_place_id INTEGER NOT NULL,
+                polling_place_name TEXT NOT NULL,
+                address TEXT,
+                latitude REAL,
+                longitude REAL,
+                status TEXT,
+                wheelchair_access TEXT,
+                data TEXT,
+                row_hash TEXT
             )
-            cursor.execute("DROP TABLE polling_places")
-            conn.commit()
-
-        cursor.execute(
             """
-        CREATE TABLE IF NOT EXISTS polling_places (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            state TEXT NOT NULL,
-            division_id INTEGER NOT NULL,
-            division_name TEXT NOT NULL,
-            polling_place_id INTEGER NOT NULL,
-            polling_place_name TEXT NOT NULL,
-            address TEXT,
-            latitude REAL,
-            longitude REAL,
-            status TEXT,
-            wheelchair_access TEXT,
-            data JSON
-        )
-        """
-        )
 
-        conn.commit()
-        conn.close()
+
+def create_polling_places_table() -> None:
+    """Create the polling_places table in the database if it doesn't exist."""
+    try:
+        logger.info("Creating polling_places table if it doesn't exist")
+        with get_connection() as conn:
+            # Older table layouts are rebuilt by the schema migrations
+            conn.execute(text(_create_polling_places_sql(conn, "polling_places")))
+            conn.commit()
         logger.info("Successfully created polling_places table")
     except Exception as e:
         logger.error(f"Error creating polling_places table: {e}")
@@ -565,7 +570,12 @@ def process_polling_places_file(file_path: Path) -> List[Dict[str, Any]]:
 
 def save_polling_places_to_database(polling_places: List[Dict[str, Any]]) -> bool:
     """
-    Save polling places to the database.
+    Bring the polling places in the database in line with the AEC file.
+
+    Booths are matched on their AEC polling place ID (PPId) and only new,
+    changed or withdrawn booths are written, in a single transaction, so an
+    on-the-day change touches just that booth and readers never see a
+    partial table. Pre-poll booths added by add_prepoll_booths are left alone.
 
     Args:
         polling_places: List of polling place dictionaries
@@ -578,92 +588,50 @@ def save_polling_places_to_database(polling_places: List[Dict[str, Any]]) -> boo
             logger.warning("No polling places to save to database")
             return False
 
-        logger.info(f"Saving {len(polling_places)} polling places to database")
-        db_path_str = str(DB_PATH)
-        conn = sqlite3.connect(db_path_str)
-        cursor = conn.cursor()
-
-        # First, completely clear the polling_places table
-        cursor.execute("DELETE FROM polling_places")
-        conn.commit()
-
-        cursor.execute("SELECT COUNT(*) FROM polling_places")
-        count = cursor.fetchone()[0]
-        logger.info(f"Polling places table has {count} records after clearing")
-
-        valid_polling_places = []
-        invalid_count = 0
-
-        for place in polling_places:
-            if (
-                not place.get("state")
-                or not place.get("division_name")
-                or not place.get("polling_place_name")
-                or place.get("polling_place_id", 0) <= 0
-                or place.get("division_id", 0) <= 0
-            ):
-                invalid_count += 1
-                continue
-
-            valid_polling_places.append(place)
-
+        valid_polling_places = [
+            place
+            for place in polling_places
+            if place.get("state")
+            and place.get("division_name")
+            and place.get("polling_place_name")
+            and place.get("polling_place_id", 0) > 0
+            and place.get("division_id", 0) > 0
+        ]
+        invalid_count = len(polling_places) - len(valid_polling_places)
         logger.info(
             f"Filtered out {invalid_count} invalid records, proceeding with {len(valid_polling_places)} valid records"
         )
+        if not valid_polling_places:
+            logger.warning("No valid polling places, keeping the existing table")
+            return False
 
-        for place in valid_polling_places:
-            cursor.execute(
-                """
-            INSERT INTO polling_places
-            (state, division_id, division_name, polling_place_id, polling_place_name, 
-             address, latitude, longitude, status, wheelchair_access, data)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-                (
-                    place["state"],
-                    place["division_id"],
-                    place["division_name"],
-                    place["polling_place_id"],
-                    place["polling_place_name"],
-                    place.get("address", ""),
-                    place.get("latitude"),
-                    place.get("longitude"),
-                    place.get("status", "Current"),
-                    place.get("wheelchair_access", ""),
-                    json.dumps(place),
-                ),
-            )
-
-        conn.commit()
+        rows = [
+            {
+                "state": place["state"],
+                "division_id": place["division_id"],
+                "division_name": place["division_name"],
+                "polling_place_id": place["polling_place_id"],
+                "polling_place_name": place["polling_place_name"],
+                "address": place.get("address", ""),
+                "latitude": place.get("latitude"),
+                "longitude": place.get("longitude"),
+                "status": place.get("status", "Current"),
+                "wheelchair_access": place.get("wheelchair_access", ""),
+                "data": json.dumps(place),
+            }
+            for place in valid_polling_places
+        ]
 
-        cursor.execute(
-            """
-        SELECT COUNT(*) FROM polling_places 
-        WHERE state = '' OR division_id = 0 OR polling_place_id = 0 OR 
-              division_name = '' OR polling_place_name = ''
-        """
+        logger.info(f"Saving {len(rows)} polling places to database")
+        report = sync_rows(
+            "polling_places",
+            ("polling_place_id",),
+            POLLING_PLACE_COLUMNS,
+            rows,
+            where="polling_place_name NOT LIKE :prepoll_pattern",
+            params={"prepoll_pattern": f"{PREPOLL_BOOTH_PREFIX}%"},
         )
-        empty_count = cursor.fetchone()[0]
-
-        if empty_count > 0:
-            logger.warning(
-                f"Found {empty_count} empty records after insertion, removing them"
-            )
-            cursor.execute(
-                """
-            DELETE FROM polling_places 
-            WHERE state = '' OR division_id = 0 OR polling_place_id = 0 OR 
-                  division_name = '' OR polling_place_name = ''
-            """
-            )
-            conn.commit()
-
-        cursor.execute("SELECT COUNT(*) FROM polling_places")
-        final_count = cursor.fetchone()[0]
-        logger.info(f"Successfully saved {final_count} polling places to database")
-
-        conn.close()
-        return final_count > 0
+        return report.rows > 0
     except Exception as e:
         logger.error(f"Error saving polling places to database: {e}")
         import traceback
@@ -684,24 +652,19 @@ def get_polling_places_for_division(division_name: str) -> List[Dict[str, Any]]:
     """
     try:
         logger.info(f"Getting polling places for division: {division_name}")
-        db_path_str = str(DB_PATH)
-        conn = sqlite3.connect(db_path_str)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-
-        cursor.execute(
+        with get_connection() as conn:
+            cursor = conn.execute(
+                text(
+                    """
+            SELECT * FROM polling_places 
+            WHERE division_name = :division_name 
+            ORDER BY polling_place_name
             """
-        SELECT * FROM polling_places 
-        WHERE division_name = ? 
-        ORDER BY polling_place_name
-        """,
-            (division_name,),
-        )
-
-        rows = cursor.fetchall()
-        polling_places = [dict(row) for row in rows]
+                ),
+                {"division_name": division_name},
+            )
+            polling_places = [dict(row) for row in cursor.mappings()]
 
-        conn.close()
         logger.info(
             f"Found {len(polling_places)} polling places for division {division_name}"
         )
@@ -841,65 +804,86 @@ def add_prepoll_booths() -> bool:
     """Add pre-poll booths for each division."""
     try:
         logger.info("Adding pre-poll booths for each division")
-        conn = sqlite3.connect(str(DB_PATH))
-        cursor = conn.cursor()
-
-        # Get all unique divisions
-        cursor.execute("SELECT DISTINCT division_name FROM polling_places")
-        divisions = [row[0] for row in cursor.fetchall()]
-        logger.info(f"Found {len(divisions)} divisions")
-
-        # For each division, add a pre-poll booth if it doesn't exist
-        for division in divisions:
-            prepoll_name = f"Pre-Poll-{division}"
-
-            # Check if pre-poll booth already exists
-            cursor.execute(
-                "SELECT COUNT(*) FROM polling_places WHERE division_name = ? AND polling_place_name = ?",
-                (division, prepoll_name),
-            )
-            exists = cursor.fetchone()[0] > 0
-
-            if not exists:
-                # Get max polling_place_id for this division
-                cursor.execute(
-                    "SELECT MAX(polling_place_id) FROM polling_places WHERE division_name = ?",
-                    (division,),
+        with get_connection() as conn:
+            # Get all unique divisions
+            divisions = [
+                row[0]
+                for row in conn.execute(
+                    text("SELECT DISTINCT division_name FROM polling_places")
+                )
+            ]
+            logger.info(f"Found {len(divisions)} divisions")
+            added = False
+
+            # For each division, add a pre-poll booth if it doesn't exist
+            for division in divisions:
+                prepoll_name = f"{PREPOLL_BOOTH_PREFIX}{division}"
+
+                # Check if pre-poll booth already exists
+                exists = (
+                    conn.execute(
+                        text(
+                            "SELECT COUNT(*) FROM polling_places "
+                            "WHERE division_name = :division AND polling_place_name = :name"
+                        ),
+                        {"division": division, "name": prepoll_name},
+                    ).scalar()
+                    > 0
                 )
-                max_id = cursor.fetchone()[0] or 0
-                new_id = max_id + 1
 
-                # Insert pre-poll booth
-                cursor.execute(
+                if not exists:
+                    # Get max polling_place_id for this division
+                    max_id = (
+                        conn.execute(
+                            text(
+                                "SELECT MAX(polling_place_id) FROM polling_places "
+                                "WHERE division_name = :division"
+                            ),
+                            {"division": division},
+                        ).scalar()
+                        or 0
+                    )
+                    new_id = max_id + 1
+
+                    # Insert pre-poll booth
+                    conn.execute(
+                        text(
+                            """
+                        INSERT INTO polling_places (
+                            state,
+                            division_id,
+                            division_name,
+                            polling_place_id,
+                            polling_place_name,
+                            address,
+                            status,
+                            wheelchair_access,
+                            data
+                        ) VALUES (:state, :division_id, :division_name,
+                                  :polling_place_id, :polling_place_name, :address,
+                                  :status, :wheelchair_access, :data)
                     """
-                    INSERT INTO polling_places (
-                        state,
-                        division_id,
-                        division_name,
-                        polling_place_id,
-                        polling_place_name,
-                        address,
-                        status,
-                        wheelchair_access,
-                        data
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                    (
-                        "NSW",  # State
-                        0,  # Division ID (placeholder)
-                        division,
-                        new_id,
-                        prepoll_name,
-                        f"Pre-poll voting center for {division}",
-                        "ACTIVE",
-                        "Yes",
-                        json.dumps({"type": "pre-poll"}),
-                    ),
-                )
-                logger.info(f"Added pre-poll booth for {division}")
+                        ),
+                        {
+                            "state": "NSW",
+                            "division_id": 0,  # Placeholder
+                            "division_name": division,
+                            "polling_place_id": new_id,
+                            "polling_place_name": prepoll_name,
+                            "address": f"Pre-poll voting center for {division}",
+                            "status": "ACTIVE",
+                            "wheelchair_access": "Yes",
+                            "data": json.dumps({"type": "pre-poll"}),
+                        },
+                    )
+                    logger.info(f"Added pre-poll booth for {division}")
+                    added = True
 
-        conn.commit()
-        conn.close()
+            if added:
+                bump_versions(conn, [REFERENCE_SCOPE])
+            conn.commit()
+        if added:
+            notify_changed([REFERENCE_SCOPE])
         logger.info("Successfully added pre-poll booths")
         return True
 
@@ -921,31 +905,21 @@ def process_and_load_polling_places() -> bool:
         ensure_data_dir()
         create_polling_places_table()
 
-        # First, completely clear the polling_places table
-        db_path_str = str(DB_PATH)
-        conn = sqlite3.connect(db_path_str)
-        cursor = conn.cursor()
-
-        logger.info("Completely clearing polling_places table before loading new data")
-        cursor.execute("DELETE FROM polling_places")
-        conn.commit()
-
-        cursor.execute("SELECT COUNT(*) FROM polling_places")
-        count = cursor.fetchone()[0]
-        logger.info(f"Polling places table has {count} records after clearing")
-
-        conn.close()
-
-        # Download and process polling places
+        # Download and process polling places. The existing booths stay
+        # visible and only changed booths are written by the save below.
         success = download_polling_places_data()
         if not success:
             logger.error("Failed to download polling places data")
             return False
 
+        polling_places_path = Path(DATA_DIR, "polling_places", "polling-places-2025.csv")
+        content_hash = file_sha256(polling_places_path)
+        if source_unchanged(polling_places_path.name, content_hash, "polling_places"):
+            logger.info("Polling places file is unchanged, skipping reload")
+            return True
+
         # Process the polling places data
-        polling_places = process_polling_places_file(
-            Path(DATA_DIR, "polling_places", "polling-places-2025.csv")
-        )
+        polling_places = process_polling_places_file(polling_places_path)
         if not success:
             logger.error("Failed to process polling places data")
             return False
@@ -962,6 +936,7 @@ def process_and_load_polling_places() -> bool:
             logger.error("Failed to add pre-poll booths")
             return False
 
+        record_source_hash(polling_places_path.name, content_hash, len(polling_places))
         return True
     except Exception as e:
         logger.error(f"Error processing and loading polling places: {e}")
@@ -971,6 +946,70 @@ def process_and_load_polling_places() -> bool:
         return False
 
 
+def create_booth_results_table() -> None:
+    """Create the booth_results_2022 table in the database if it doesn't exist."""
+    with get_connection() as conn:
+        conn.execute(
+            text(
+                f"""
+            CREATE TABLE IF NOT EXISTS booth_results_2022 (
+                {primary_key_column(conn)},
+                division_name TEXT NOT NULL,
+                polling_place_name TEXT NOT NULL,
+                liberal_national_percentage REAL,
+                labor_percentage REAL,
+                total_votes INTEGER,
+                data TEXT,
+                row_hash TEXT
+            )
+            """
+            )
+        )
+        conn.commit()
+
+
+def load_booth_results_file(booth_results_path: Path) -> bool:
+    """
+    Load the 2022 booth results file, replacing the existing rows.
+
+    Args:
+        booth_results_path: Path to the HouseTppByPollingPlaceDownload CSV
+
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    try:
+        with open(booth_results_path, "r", encoding="utf-8-sig") as f:
+            reader = csv.DictReader(f)
+            booth_results = []
+            for row in reader:
+                try:
+                    # Extract relevant data from the 2022 results
+                    booth_result = {
+                        "division_name": row.get("DivisionNm", "").strip(),
+                        "polling_place_name": row.get("PollingPlace", "").strip(),
+                        "liberal_national_percentage": float(
+                            row.get("LiberalPercentage", 0)
+                        ),
+                        "labor_percentage": float(row.get("LaborPercentage", 0)),
+                        "total_votes": int(row.get("TotalVotes", 0)),
+                        "data": json.dumps(row),
+                    }
+                    booth_results.append(booth_result)
+                except Exception as e:
+                    logger.warning(f"Error processing 2022 booth result row: {e}")
+                    continue
+
+        bulk_load("booth_results_2022", BOOTH_RESULT_COLUMNS, booth_results)
+        logger.info(
+            f"Successfully processed and saved {len(booth_results)} 2022 booth results"
+        )
+        return True
+    except Exception as e:
+        logger.error(f"Error processing 2022 booth results: {e}")
+        return False
+
+
 def process_and_load_booth_results() -> bool:
     """
     Process and load both 2022 booth results and 2025 polling places data.
@@ -981,6 +1020,7 @@ def process_and_load_booth_results() -> bool:
     try:
         ensure_data_dir()
         create_polling_places_table()
+        create_booth_results_table()
 
         # First, download and process 2022 booth results
         logger.info("Downloading 2022 booth results...")
@@ -996,80 +1036,16 @@ def process_and_load_booth_results() -> bool:
             logger.error(f"2022 booth results file not found at {booth_results_path}")
             return False
 
-        try:
-            with open(booth_results_path, "r", encoding="utf-8-sig") as f:
-                reader = csv.DictReader(f)
-                booth_results = []
-                for row in reader:
-                    try:
-                        # Extract relevant data from the 2022 results
-                        booth_result = {
-                            "division_name": row.get("DivisionNm", "").strip(),
-                            "polling_place_name": row.get("PollingPlace", "").strip(),
-                            "liberal_national_percentage": float(
-                                row.get("LiberalPercentage", 0)
-                            ),
-                            "labor_percentage": float(row.get("LaborPercentage", 0)),
-                            "total_votes": int(row.get("TotalVotes", 0)),
-                            "data": json.dumps(row),
-                        }
-                        booth_results.append(booth_result)
-                    except Exception as e:
-                        logger.warning(f"Error processing 2022 booth result row: {e}")
-                        continue
-
-                # Save to database
-                db_path_str = str(DB_PATH)
-                conn = sqlite3.connect(db_path_str)
-                cursor = conn.cursor()
-
-                # Create booth_results_2022 table if it doesn't exist
-                cursor.execute(
-                    """
-                    CREATE TABLE IF NOT EXISTS booth_results_2022 (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        division_name TEXT NOT NULL,
-                        polling_place_name TEXT NOT NULL,
-                        liberal_national_percentage REAL,
-                        labor_percentage REAL,
-                        total_votes INTEGER,
-                        data JSON
-                    )
-                """
-                )
-
-                # Clear existing data
-                cursor.execute("DELETE FROM booth_results_2022")
-                conn.commit()
-
-                # Insert new data
-                for result in booth_results:
-                    cursor.execute(
-                        """
-                        INSERT INTO booth_results_2022 
-                        (division_name, polling_place_name, liberal_national_percentage, 
-                         labor_percentage, total_votes, data)
-                        VALUES (?, ?, ?, ?, ?, ?)
-                    """,
-                        (
-                            result["division_name"],
-                            result["polling_place_name"],
-                            result["liberal_national_percentage"],
-                            result["labor_percentage"],
-                            result["total_votes"],
-                            result["data"],
-                        ),
-                    )
-
-                conn.commit()
-                conn.close()
-
-                logger.info(
-                    f"Successfully processed and saved {len(booth_results)} 2022 booth results"
-                )
-
-        except Exception as e:
-            logger.error(f"Error processing 2022 booth results: {e}")
+        content_hash = file_sha256(booth_results_path)
+        if source_unchanged(booth_results_path.name, content_hash, "booth_results_2022"):
+            logger.info("2022 booth results file is unchanged, skipping reload")
+        elif load_booth_results_file(booth_results_path):
+            with get_connection() as conn:
+                row_count = conn.execute(
+                    text("SELECT COUNT(*) FROM booth_results_2022")
+                ).scalar()
+            record_source_hash(booth_results_path.name, content_hash, row_count)
+        else:
             return False
 
         # Now handle 2025 polling places data
@@ -0,0 +1,130 @@
+"""
+Booth Swing
+
+Vectorized two-candidate-preferred (TCP) percentages and swings for many
+booths at once. Booths from any number of divisions are handled in a single
+pass: per-division inputs (the TCP candidate names) are resolved once and
+broadcast to the booths through a division index.
+
+The swing rules are those of ``calculate_tcp_swing`` in the FastAPI app:
+when both the current and previous pairs include a Liberal candidate the
+swing is the change in the Liberal percentage; otherwise previous results
+are lined up with the current candidates (flipping them if the pair is in
+the opposite order) and the swing is to current TCP candidate 1.
+"""
+
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+# The 2022 booth results only record the Liberal/National share, so the
+# previous pair is always (everyone else, the Coalition)
+PREVIOUS_TCP_NAMES = ("OTHER", "LIBERAL NATIONAL")
+
+
+def tcp_percentages(
+    tcp1_votes: np.ndarray, tcp2_votes: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Get each booth's TCP percentages from its votes.
+
+    Args:
+        tcp1_votes: Votes for TCP candidate 1, NaN where not counted
+        tcp2_votes: Votes for TCP candidate 2, NaN where not counted
+
+    Returns:
+        Tuple of (candidate 1 %, candidate 2 %), NaN where there are no votes
+    """
+    tcp1_votes = np.asarray(tcp1_votes, dtype=float)
+    tcp2_votes = np.asarray(tcp2_votes, dtype=float)
+    total = tcp1_votes + tcp2_votes
+    counted = total > 0
+    safe_total = np.where(counted, total, 1.0)
+    return (
+        np.where(counted, tcp1_votes / safe_total * 100, np.nan),
+        np.where(counted, tcp2_votes / safe_total * 100, np.nan),
+    )
+
+
+def liberal_side(names: Sequence[Tuple[Optional[str], Optional[str]]]) -> np.ndarray:
+    """Get 0 or 1 for the Liberal candidate of each pair, -1 if neither is."""
+    return np.array(
+        [
+            0
+            if name1 and "LIBERAL" in name1.upper()
+            else 1 if name2 and "LIBERAL" in name2.upper() else -1
+            for name1, name2 in names
+        ],
+        dtype=np.int8,
+    ).reshape(-1)
+
+
+def tcp_swings(
+    current_pct1: np.ndarray,
+    current_pct2: np.ndarray,
+    previous_pct1: np.ndarray,
+    previous_pct2: np.ndarray,
+    division_index: np.ndarray,
+    current_names: Sequence[Tuple[Optional[str], Optional[str]]],
+    previous_names: Sequence[Tuple[str, str]],
+) -> np.ndarray:
+    """
+    Get the TCP swing at each booth.
+
+    Args:
+        current_pct1, current_pct2: Current TCP percentages, NaN if not counted
+        previous_pct1, previous_pct2: Previous TCP percentages, NaN if the
+            booth has no previous result
+        division_index: Index into the name lists of each booth's division
+        current_names: (TCP candidate 1, TCP candidate 2) names per division
+        previous_names: Previous (TCP candidate 1, TCP candidate 2) names per
+            division
+
+    Returns:
+        Swing per booth rounded to 2 decimal places, NaN where it can't be
+        calculated. Positive means a swing to the Liberal candidate when
+        both pairs have one, otherwise to current TCP candidate 1.
+    """
+    current_pct1 = np.asarray(current_pct1, dtype=float)
+    current_pct2 = np.asarray(current_pct2, dtype=float)
+    previous_pct1 = np.asarray(previous_pct1, dtype=float)
+    previous_pct2 = np.asarray(previous_pct2, dtype=float)
+    division_index = np.asarray(division_index, dtype=np.intp)
+    if not len(division_index):
+        return np.empty(0)
+
+    # Per-division rules, broadcast to booths below
+    named = np.array([bool(name1 and name2) for name1, name2 in current_names])
+    current_liberal = liberal_side(current_names)
+    previous_liberal = liberal_side(previous_names)
+    flipped = np.array(
+        [
+            previous[0] == current[1] and previous[1] == current[0]
+            for current, previous in zip(current_names, previous_names)
+        ]
+    )
+
+    current_liberal = current_liberal[division_index]
+    previous_liberal = previous_liberal[division_index]
+    flipped = flipped[division_index]
+
+    liberal_swing = np.where(
+        current_liberal == 0, current_pct1, current_pct2
+    ) - np.where(previous_liberal == 0, previous_pct1, previous_pct2)
+
+    aligned1 = np.where(flipped, previous_pct2, previous_pct1)
+    aligned2 = np.where(flipped, previous_pct1, previous_pct2)
+    ordered_swing = ((current_pct1 - aligned1) - (current_pct2 - aligned2)) / 2
+
+    swing = np.where(
+        (current_liberal >= 0) & (previous_liberal >= 0), liberal_swing, ordered_swing
+    )
+    # A zero percentage counts as missing, as in calculate_tcp_swing
+    valid = (
+        named[division_index]
+        & (np.nan_to_num(current_pct1) != 0)
+        & (np.nan_to_num(current_pct2) != 0)
+        & ~np.isnan(previous_pct1)
+        & ~np.isnan(previous_pct2)
+    )
+    return np.where(valid, np.round(swing, 2), np.nan)
@@ -0,0 +1,397 @@
+"""
+Bulk Loader
+
+Shared fast paths for loading reference data (candidates, polling places,
+2022 booth results).
+
+``bulk_load`` replaces a table's rows in one transaction: the old rows are
+deleted and the new rows inserted with batched ``executemany``, so readers see
+either the old or the new data. On SQLite the secondary indexes are also
+dropped and rebuilt, so index maintenance happens once instead of per row;
+WAL readers keep their snapshot meanwhile. PostgreSQL keeps its indexes, as
+DROP INDEX would lock every reader of the table out until the load commits.
+
+``sync_rows`` applies only what changed. Each row carries a content hash in
+``row_hash``; rows are matched on their AEC key and only new, changed and
+removed rows are written. Whole source files are hashed as well and recorded
+in ``reference_sources`` so an unchanged download can be skipped outright.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+from common.data_versions import REFERENCE_SCOPE, bump_versions, notify_changed
+from common.db_utils import (
+    get_connection,
+    SQLITE_CACHE_SIZE_KB,
+)
+
+logger = logging.getLogger(__name__)
+
+BULK_LOAD_BATCH_SIZE = 5000
+
+# Larger page cache while loading so index rebuilds sort in memory
+SQLITE_LOAD_CACHE_SIZE_KB = 256 * 1024
+
+
+@dataclass
+class LoadReport:
+    table: str
+    rows: int
+    seconds: float
+    inserted: int = 0
+    updated: int = 0
+    deleted: int = 0
+    unchanged: int = 0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else float(self.rows)
+
+    def as_dict(self) -> Dict[str, Any]:
+        report = asdict(self)
+        report["seconds"] = round(self.seconds, 4)
+        report["rows_per_second"] = round(self.rows_per_second, 1)
+        return report
+
+
+_reports: Dict[str, LoadReport] = {}
+_reports_lock = threading.Lock()
+
+
+def record_load_report(report: LoadReport) -> None:
+    """Log a load report and keep it as the latest report for its table."""
+    logger.info(
+        f"Loaded {report.rows} rows into {report.table} in {report.seconds:.3f}s "
+        f"({report.rows_per_second:,.0f} rows/sec; {report.inserted} inserted, "
+        f"{report.updated} updated, {report.deleted} deleted, "
+        f"{report.unchanged} unchanged)"
+    )
+    with _reports_lock:
+        _reports[report.table] = report
+
+
+def get_load_reports() -> List[LoadReport]:
+    """Get the latest load report for every table loaded by this process."""
+    with _reports_lock:
+        return list(_reports.values())
+
+
+def _secondary_indexes(conn: Connection, table: str) -> List[Tuple[str, str]]:
+    """Get CREATE INDEX statements for a table's non-primary-key indexes."""
+    statements = []
+    for index in inspect(conn).get_indexes(table):
+        columns = index.get("column_names") or []
+        if not index.get("name") or not columns or None in columns:
+            continue
+        unique = "UNIQUE " if index.get("unique") else ""
+        statements.append(
+            (
+                index["name"],
+                f"CREATE {unique}INDEX IF NOT EXISTS {index['name']} "
+                f"ON {table} ({', '.join(columns)})",
+            )
+        )
+    return statements
+
+
+def bulk_load(
+    table: str,
+    columns: Sequence[str],
+    rows: Iterable[Dict[str, Any]],
+    where: Optional[str] = None,
+    params: Optional[Dict[str, Any]] = None,
+    batch_size: int = BULK_LOAD_BATCH_SIZE,
+    label: Optional[str] = None,
+) -> LoadReport:
+    """
+    Replace the rows of a table in a single transaction.
+
+    Args:
+        table: Table to load
+        columns: Columns to insert; every row must have these keys
+        rows: Rows to insert
+        where: Optional SQL condition limiting which existing rows are
+            replaced (default: all of them)
+        params: Bind parameters for ``where``
+        batch_size: Rows per ``executemany`` call
+        label: Name to report the load under (default: the table name)
+
+    Returns:
+        LoadReport with the row count and elapsed time
+    """
+    insert_sql = text(
+        f"INSERT INTO {table} ({', '.join(columns)}) "
+        f"VALUES ({', '.join(':' + column for column in columns)})"
+    )
+    delete_sql = text(f"DELETE FROM {table}" + (f" WHERE {where}" if where else ""))
+
+    started = time.perf_counter()
+    loaded = 0
+    with get_connection() as conn:
+        sqlite = conn.dialect.name == "sqlite"
+        if sqlite:
+            # Durability is relaxed only for this load; the pool's
+            # connection settings are restored below
+            conn.exec_driver_sql("PRAGMA synchronous=OFF")
+            conn.exec_driver_sql(f"PRAGMA cache_size=-{SQLITE_LOAD_CACHE_SIZE_KB}")
+        try:
+            if sqlite:
+                conn.exec_driver_sql("BEGIN IMMEDIATE")
+            else:
+                conn.execute(text("SET LOCAL synchronous_commit = off"))
+
+            # DROP INDEX takes an exclusive lock on PostgreSQL tables
+            indexes = _secondary_indexes(conn, table) if sqlite else []
+            for name, _ in indexes:
+                conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+            conn.execute(delete_sql, params or {})
+
+            batch: List[Dict[str, Any]] = []
+            for row in rows:
+                batch.append({column: row.get(column) for column in columns})
+                if len(batch) >= batch_size:
+                    conn.execute(insert_sql, batch)
+                    loaded += len(batch)
+                    batch = []
+            if batch:
+                conn.execute(insert_sql, batch)
+                loaded += len(batch)
+
+            for _, create_sql in indexes:
+                conn.execute(text(create_sql))
+            conn.execute(text(f"ANALYZE {table}"))
+            bump_versions(conn, [REFERENCE_SCOPE])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            if sqlite:
+                conn.exec_driver_sql("PRAGMA synchronous=NORMAL")
+                conn.exec_driver_sql(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+    notify_changed([REFERENCE_SCOPE])
+
+    report = LoadReport(
+        table=label or table,
+        rows=loaded,
+        seconds=time.perf_counter() - started,
+        inserted=loaded,
+    )
+    record_load_report(report)
+    return report
+
+
+def row_hash(row: Dict[str, Any], columns: Sequence[str]) -> str:
+    """Get a stable content hash of a row's values for the given columns."""
+    values = json.dumps([row.get(column) for column in columns], default=str)
+    return hashlib.sha256(values.encode("utf-8")).hexdigest()
+
+
+def sync_rows(
+    table: str,
+    key_columns: Sequence[str],
+    columns: Sequence[str],
+    rows: Iterable[Dict[str, Any]],
+    where: Optional[str] = None,
+    params: Optional[Dict[str, Any]] = None,
+    label: Optional[str] = None,
+) -> LoadReport:
+    """
+    Bring a table in line with ``rows``, writing only the rows that changed.
+
+    Rows are matched on ``key_columns`` and compared by ``row_hash``. New
+    rows are inserted, changed rows updated in place and rows missing from
+    ``rows`` deleted, all in one transaction.
+
+    Args:
+        table: Table to sync; it must have a ``row_hash`` column
+        key_columns: Columns identifying a row, e.g. the AEC polling place ID
+        columns: Columns to write; must include ``key_columns``
+        rows: Complete new set of rows within the scope
+        where: Optional SQL condition limiting the rows being synced
+            (default: the whole table)
+        params: Bind parameters for ``where``; they are bound alongside the
+            row values so must not clash with a column of a different value
+        label: Name to report the sync under (default: the table name)
+
+    Returns:
+        LoadReport with insert, update, delete and unchanged counts
+    """
+    params = params or {}
+    scope = f" AND ({where})" if where else ""
+    key_match = " AND ".join(f"{column} = :{column}" for column in key_columns)
+    write_columns = list(columns) + ["row_hash"]
+
+    started = time.perf_counter()
+    incoming: Dict[tuple, Dict[str, Any]] = {}
+    for row in rows:
+        values = {column: row.get(column) for column in columns}
+        values["row_hash"] = row_hash(values, columns)
+        incoming[tuple(values[column] for column in key_columns)] = values
+
+    with get_connection() as conn:
+        if conn.dialect.name == "sqlite":
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+        try:
+            existing = {
+                tuple(row[:-1]): row[-1]
+                for row in conn.execute(
+                    text(
+                        f"SELECT {', '.join(key_columns)}, row_hash FROM {table}"
+                        + (f" WHERE {where}" if where else "")
+                    ),
+                    params,
+                )
+            }
+
+            to_insert = [v for k, v in incoming.items() if k not in existing]
+            to_update = [
+                v
+                for k, v in incoming.items()
+                if k in existing and existing[k] != v["row_hash"]
+            ]
+            to_delete = [
+                {**dict(zip(key_columns, key)), **params}
+                for key in existing
+                if key not in incoming
+            ]
+
+            if to_delete:
+                conn.execute(
+                    text(f"DELETE FROM {table} WHERE {key_match}{scope}"), to_delete
+                )
+            if to_update:
+                assignments = ", ".join(
+                    f"{column} = :{column}"
+                    for column in write_columns
+                    if column not in key_columns
+                )
+                conn.execute(
+                    text(f"UPDATE {table} SET {assignments} WHERE {key_match}{scope}"),
+                    [{**row, **params} for row in to_update],
+                )
+            if to_insert:
+                conn.execute(
+                    text(
+                        f"INSERT INTO {table} ({', '.join(write_columns)}) "
+                        f"VALUES ({', '.join(':' + c for c in write_columns)})"
+                    ),
+                    to_insert,
+                )
+            if to_insert or to_update or to_delete:
+                bump_versions(conn, [REFERENCE_SCOPE])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    if to_insert or to_update or to_delete:
+        notify_changed([REFERENCE_SCOPE])
+
+    report = LoadReport(
+        table=label or table,
+        rows=len(incoming),
+        seconds=time.perf_counter() - started,
+        inserted=len(to_insert),
+        updated=len(to_update),
+        deleted=len(to_delete),
+        unchanged=len(incoming) - len(to_insert) - len(to_update),
+    )
+    record_load_report(report)
+    return report
+
+
+def file_sha256(path: Path) -> str:
+    """Get the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def create_reference_sources_table(conn: Connection) -> None:
+    """Create the table recording the last loaded hash of each reference file."""
+    conn.execute(
+        text(
+            """
+    CREATE TABLE IF NOT EXISTS reference_sources (
+        source TEXT PRIMARY KEY,
+        content_hash TEXT NOT NULL,
+        row_count INTEGER,
+        loaded_at TIMESTAMP
+    )
+    """
+        )
+    )
+
+
+def source_unchanged(source: str, content_hash: str, table: str) -> bool:
+    """
+    Check whether a reference file matches the one last loaded.
+
+    Args:
+        source: Name the file was recorded under
+        content_hash: SHA-256 of the file just downloaded
+        table: Table the file loads into; an empty table always reloads
+
+    Returns:
+        bool: True if the file is unchanged and its rows are still loaded
+    """
+    started = time.perf_counter()
+    with get_connection() as conn:
+        create_reference_sources_table(conn)
+        conn.commit()
+        recorded = conn.execute(
+            text(
+                "SELECT content_hash, row_count FROM reference_sources "
+                "WHERE source = :source"
+            ),
+            {"source": source},
+        ).first()
+        if recorded is None or recorded[0] != content_hash:
+            return False
+        if conn.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar() == 0:
+            return False
+
+    record_load_report(
+        LoadReport(
+            table=source,
+            rows=recorded[1] or 0,
+            seconds=time.perf_counter() - started,
+            unchanged=recorded[1] or 0,
+        )
+    )
+    return True
+
+
+def record_source_hash(source: str, content_hash: str, row_count: int) -> None:
+    """Record the content hash of a reference file that has been loaded."""
+    with get_connection() as conn:
+        conn.execute(
+            text("DELETE FROM reference_sources WHERE source = :source"),
+            {"source": source},
+        )
+        conn.execute(
+            text(
+                "INSERT INTO reference_sources (source, content_hash, row_count, loaded_at) "
+                "VALUES (:source, :content_hash, :row_count, :loaded_at)"
+            ),
+            {
+                "source": source,
+                "content_hash": content_hash,
+                "row_count": row_count,
+                "loaded_at": datetime.utcnow(),
+            },
+        )
+        conn.commit()
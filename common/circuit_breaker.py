@@ -0,0 +1,93 @@
+"""
+Circuit Breaker
+
+Stops calling a dependency that keeps failing. After ``failure_threshold``
+failures in a row the circuit opens and calls are refused for
+``reset_seconds``; then a single trial call is let through (half-open). Its
+success closes the circuit again, its failure reopens it for another
+``reset_seconds``. A trial that ends without a verdict (cancelled because
+the caller went away) is released so the next call can be the trial.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Thread-safe consecutive-failure circuit breaker."""
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_seconds: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self.opened = 0
+
+    @property
+    def state(self) -> str:
+        """Get the current state, moving an open circuit to half-open in time."""
+        with self._lock:
+            if (
+                self._state == OPEN
+                and self.clock() - self._opened_at >= self.reset_seconds
+            ):
+                self._state = HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """Check whether a call may go ahead; a half-open circuit allows one."""
+        state = self.state
+        with self._lock:
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        """Count a successful call, closing the circuit."""
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._trial_running = False
+
+    def release(self) -> None:
+        """End a call that neither succeeded nor failed, such as a cancelled one."""
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        """Count a failed call, opening the circuit past the threshold."""
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    self.opened += 1
+                self._state = OPEN
+                self._opened_at = self.clock()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the state, consecutive failures and times opened."""
+        state = self.state
+        with self._lock:
+            return {
+                "state": state,
+                "consecutive_failures": self._failures,
+                "opened": self.opened,
+            }
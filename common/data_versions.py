@@ -0,0 +1,148 @@
+"""
+Data Versions
+
+Monotonically increasing version counters for the data behind the read
+endpoints. Every write bumps the counters of the scopes it touches in the
+same transaction: the division it belongs to and ``results`` for result
+writes, ``reference`` for candidates, polling places and 2022 booth results.
+Read endpoints turn the versions of the scopes they depend on into a strong
+ETag, so clients can revalidate with ``If-None-Match`` and get
+``304 Not Modified`` when nothing has changed.
+
+Versions live in the database, so they are shared by every process and
+survive restarts. Writers also call ``notify_changed`` after committing, so
+in-process caches of derived responses can be dropped straight away.
+"""
+
+import hashlib
+import logging
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.engine import Connection
+
+logger = logging.getLogger(__name__)
+
+RESULTS_SCOPE = "results"
+REFERENCE_SCOPE = "reference"
+
+BUMP_VERSION_SQL = text(
+    """
+    INSERT INTO data_versions (scope, version, updated_at)
+    VALUES (:scope, 1, :updated_at)
+    ON CONFLICT (scope) DO UPDATE
+    SET version = data_versions.version + 1, updated_at = excluded.updated_at
+    """
+)
+
+BUMP_DIVISION_VERSIONS_SQL = text(
+    """
+    UPDATE data_versions SET version = version + 1, updated_at = :updated_at
+    WHERE scope LIKE 'division:%'
+    """
+)
+
+SELECT_VERSIONS_SQL = text(
+    "SELECT scope, version, updated_at FROM data_versions WHERE scope IN :scopes"
+).bindparams(bindparam("scopes", expanding=True))
+
+
+SELECT_DIVISION_VERSIONS_SQL = text(
+    "SELECT scope, version FROM data_versions WHERE scope LIKE 'division:%'"
+)
+
+DIVISION_SCOPE_PREFIX = "division:"
+
+
+def division_scope(division: str) -> str:
+    """Get the version scope for a division's results."""
+    return f"{DIVISION_SCOPE_PREFIX}{division}"
+
+
+def create_data_versions_table(conn: Connection) -> None:
+    """Create the data_versions table if it doesn't exist."""
+    conn.execute(
+        text(
+            """
+    CREATE TABLE IF NOT EXISTS data_versions (
+        scope TEXT PRIMARY KEY,
+        version INTEGER NOT NULL,
+        updated_at TEXT NOT NULL
+    )
+    """
+        )
+    )
+
+
+def bump_params(scopes: Iterable[str]) -> List[Dict[str, str]]:
+    """Get the parameter sets for bumping several scopes with BUMP_VERSION_SQL."""
+    updated_at = datetime.now(timezone.utc).isoformat()
+    return [
+        {"scope": scope, "updated_at": updated_at}
+        for scope in sorted(set(scope for scope in scopes if scope))
+    ]
+
+
+def bump_versions(conn: Connection, scopes: Iterable[str]) -> None:
+    """Bump the versions of the given scopes inside the caller's transaction."""
+    params = bump_params(scopes)
+    if params:
+        create_data_versions_table(conn)
+        conn.execute(BUMP_VERSION_SQL, params)
+
+
+_change_listeners: List[Callable[[Sequence[str]], None]] = []
+
+
+def add_change_listener(listener: Callable[[Sequence[str]], None]) -> None:
+    """Register a callback for scopes changed by a committed write."""
+    if listener not in _change_listeners:
+        _change_listeners.append(listener)
+
+
+def notify_changed(scopes: Iterable[str]) -> None:
+    """Tell listeners the given scopes changed. Call after commit."""
+    scopes = sorted(set(scope for scope in scopes if scope))
+    if not scopes:
+        return
+    for listener in list(_change_listeners):
+        try:
+            listener(scopes)
+        except Exception as e:
+            logger.error(f"Data change listener failed for {scopes}: {e}")
+
+
+def get_versions(
+    conn: Connection, scopes: Sequence[str]
+) -> Dict[str, Dict[str, Any]]:
+    """Get {scope: {"version": int, "updated_at": str}} for the given scopes."""
+    return {
+        row.scope: {"version": row.version, "updated_at": row.updated_at}
+        for row in conn.execute(SELECT_VERSIONS_SQL, {"scopes": list(scopes)})
+    }
+
+
+def make_etag(scopes: Sequence[str], versions: Dict[str, Dict[str, Any]]) -> str:
+    """
+    Build a strong ETag from the versions of the scopes a response depends on.
+
+    The update time is part of the tag so a version number reused after the
+    database is recreated never matches an old tag.
+    """
+    digest = hashlib.sha256()
+    for scope in scopes:
+        version = versions.get(scope) or {}
+        digest.update(
+            f"{scope}={version.get('version', 0)}@{version.get('updated_at')};".encode()
+        )
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag."""
+    if not if_none_match:
+        return False
+    # If-None-Match uses weak comparison, so W/ prefixes added by proxies match
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
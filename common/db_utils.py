@@ -1,27 +1,79 @@
 import os
 import sqlite3
+import threading
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
 import logging
 
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Connection, Engine, make_url
+
 logger = logging.getLogger(__name__)
 
 
-def get_db_path() -> str:
-    """Get the standardized database path."""
+def _default_db_path() -> str:
     is_docker = os.path.exists("/.dockerenv") or os.path.isdir("/app/data")
     if is_docker:
         data_dir_path = "/app/data"
     else:
         # Get the absolute path to amalfiResults/data
         data_dir_path = str(Path(__file__).parent.parent / "data")
+    return str(Path(data_dir_path) / "results.db")
+
+
+def get_sqlalchemy_url() -> str:
+    """
+    Get the SQLAlchemy URL for the database.
+
+    ``DATABASE_URL`` wins when it is set, so the services can point at a
+    PostgreSQL server; otherwise the shared SQLite file is used.
+    """
+    url = os.environ.get("DATABASE_URL")
+    if url:
+        # Heroku-style URLs use a scheme SQLAlchemy no longer accepts
+        if url.startswith("postgres://"):
+            url = "postgresql://" + url[len("postgres://") :]
+        return url
+
+    # Convert to absolute path; SQLite URLs need three slashes before it
+    abs_path = os.path.abspath(_default_db_path())
+    logger.error(f"ABSOLUTE PATH BEING USED: {abs_path}")
+    return f"sqlite:///{abs_path}"
+
+
+def is_sqlite_url(url: Optional[str] = None) -> bool:
+    """Check whether a database URL (default: the configured one) is SQLite."""
+    return make_url(url or get_sqlalchemy_url()).get_backend_name() == "sqlite"
+
 
-    db_path = str(Path(data_dir_path) / "results.db")
+def get_async_sqlalchemy_url(url: Optional[str] = None) -> str:
+    """Get the SQLAlchemy URL for the database using an asyncio driver."""
+    url = make_url(url or get_sqlalchemy_url())
+    if url.get_backend_name() == "sqlite":
+        url = url.set(drivername="sqlite+aiosqlite")
+    elif url.get_backend_name() == "postgresql":
+        url = url.set(drivername="postgresql+asyncpg")
+    return url.render_as_string(hide_password=False)
+
+
+def get_db_path() -> str:
+    """Get the standardized SQLite database path."""
+    url = os.environ.get("DATABASE_URL")
+    if url and is_sqlite_url(url) and make_url(url).database:
+        db_path = make_url(url).database
+    else:
+        db_path = _default_db_path()
     logger.error(f"DB PATH BEING USED: {db_path}")  # Debug log
     return db_path
 
 
 def ensure_database_exists() -> None:
     """Ensure the database file exists and has the correct permissions."""
+    if not is_sqlite_url():
+        # Server databases are provisioned outside the app
+        return
+
     db_path = get_db_path()
     data_dir = Path(db_path).parent
 
@@ -33,6 +85,7 @@ def ensure_database_exists() -> None:
     if not os.path.exists(db_path):
         logger.info(f"Creating new database at {db_path}")
         conn = sqlite3.connect(db_path)
+        configure_sqlite_connection(conn)
         conn.close()
         os.chmod(db_path, 0o666)  # Read/write permissions for the database file
         logger.info("Database file created with appropriate permissions")
@@ -40,13 +93,126 @@ def ensure_database_exists() -> None:
         logger.info(f"Database already exists at {db_path}")
 
 
-def get_sqlalchemy_url() -> str:
-    """Get the SQLAlchemy URL for the database."""
-    db_path = get_db_path()
-    # Convert to absolute path
-    abs_path = os.path.abspath(db_path)
-    logger.error(f"ABSOLUTE PATH BEING USED: {abs_path}")
-    # SQLite URLs need three slashes for relative paths, four for absolute
-    if abs_path.startswith("/"):
-        return f"sqlite:///{abs_path}"  # Three slashes for absolute paths on Unix
-    return f"sqlite:///{abs_path}"  # Three slashes for relative paths
+# Connection tuning for the shared SQLite database. WAL lets the dashboard
+# readers keep going while a result is being written, and busy_timeout makes a
+# second writer wait for the lock instead of failing with "database is locked".
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", 5000))
+SQLITE_MMAP_SIZE = int(os.environ.get("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+SQLITE_CACHE_SIZE_KB = int(os.environ.get("SQLITE_CACHE_SIZE_KB", 32 * 1024))
+SQLITE_STATEMENT_CACHE_SIZE = int(os.environ.get("SQLITE_STATEMENT_CACHE_SIZE", 256))
+SQLITE_POOL_SIZE = int(os.environ.get("SQLITE_POOL_SIZE", 8))
+
+
+def configure_sqlite_connection(conn) -> None:
+    """Apply the standard pragmas to a new SQLite DB-API connection."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        # A negative cache_size is expressed in KiB rather than pages
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+    finally:
+        cursor.close()
+
+
+# Pool tuning for server databases. Every FastAPI replica and the Flask app
+# holds its own pool, so keep pool_size * replicas under max_connections.
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", 1800))
+
+
+def engine_options(url: str) -> Dict[str, Any]:
+    """Get the create_engine keyword arguments for a database URL."""
+    if is_sqlite_url(url):
+        options: Dict[str, Any] = {
+            "connect_args": {"timeout": SQLITE_BUSY_TIMEOUT_MS / 1000},
+            "pool_size": SQLITE_POOL_SIZE,
+            "max_overflow": 0,
+            "pool_timeout": DB_POOL_TIMEOUT,
+        }
+        if "aiosqlite" not in url:
+            options["connect_args"].update(
+                check_same_thread=False,
+                cached_statements=SQLITE_STATEMENT_CACHE_SIZE,
+            )
+        return options
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        # Replace connections the server dropped (restarts, idle timeouts)
+        "pool_pre_ping": True,
+    }
+
+
+def _configure_new_sqlite_connection(dbapi_connection, connection_record) -> None:
+    configure_sqlite_connection(dbapi_connection)
+
+
+def create_db_engine(url: Optional[str] = None) -> Engine:
+    """
+    Create a pooled SQLAlchemy engine for the results database.
+
+    SQLite connections get the standard pragmas as they are opened; server
+    databases get a sized, pre-pinged pool.
+    """
+    url = url or get_sqlalchemy_url()
+    engine = create_engine(url, **engine_options(url))
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _configure_new_sqlite_connection)
+    return engine
+
+
+_engine: Optional[Engine] = None
+_engine_pid: Optional[int] = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> Engine:
+    """
+    Get the process-wide engine, creating it on first use.
+
+    The engine is recreated after a fork so worker processes never share
+    pooled connections with their parent.
+    """
+    global _engine, _engine_pid
+    pid = os.getpid()
+    if _engine is None or _engine_pid != pid:
+        with _engine_lock:
+            if _engine is None or _engine_pid != pid:
+                ensure_database_exists()
+                if _engine is not None:
+                    # Drop the parent's connections without closing them
+                    _engine.dispose(close=False)
+                _engine = create_db_engine()
+                _engine_pid = pid
+    return _engine
+
+
+@contextmanager
+def get_connection() -> Iterator[Connection]:
+    """
+    Borrow a pooled connection to the results database.
+
+    Usage:
+        with get_connection() as conn:
+            conn.execute(text("... WHERE id = :id"), {"id": 1})
+            conn.commit()
+
+    Uncommitted changes are rolled back when the connection is returned.
+    """
+    with get_engine().connect() as conn:
+        yield conn
+
+
+def primary_key_column(conn: Connection) -> str:
+    """Get the DDL for an auto-incrementing ``id`` primary key column."""
+    if conn.dialect.name == "postgresql":
+        return "id SERIAL PRIMARY KEY"
+    return "id INTEGER PRIMARY KEY AUTOINCREMENT"
@@ -0,0 +1,337 @@
+"""
+Division Tally Cache
+
+Process-local running totals for each division's reviewed results, so the
+division results endpoint can answer without re-reading and re-aggregating
+every result. Handlers that change a reviewed result apply it to the cache
+as a delta (the booth's old counts out, its new counts in), and the cache is
+rebuilt from the database on startup.
+
+Each tally records the division's data version it reflects. Readers only use
+a tally whose version equals the one they just read from the database, so a
+write made through another process, or one whose delta hasn't been applied
+yet, makes the division reload instead of serving old totals under a new
+ETag. A write's delta is only applied to a tally one version behind it; a
+tally that has missed changes in between is dropped.
+"""
+
+import os
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional
+
+from common.result_votes import normalize_votes
+
+TALLY_CACHE_ENABLED = os.environ.get("DIVISION_TALLY_CACHE", "1") != "0"
+
+
+@dataclass
+class BoothTally:
+    """Vote counts for one reviewed result."""
+
+    result_id: int
+    booth_name: Optional[str]
+    timestamp: Optional[datetime]
+    image_url: Optional[str]
+    primary: Dict[str, int] = field(default_factory=dict)
+    tcp: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    totals: Dict[str, Optional[int]] = field(default_factory=dict)
+
+    @classmethod
+    def from_result(cls, result: Any, data: Optional[Dict[str, Any]]) -> "BoothTally":
+        """Build a booth tally from a Result row and its parsed data."""
+        primary_rows, tcp_rows = normalize_votes(data)
+        booth = cls(
+            result_id=result.id,
+            booth_name=result.booth_name,
+            timestamp=result.timestamp,
+            image_url=result.image_url,
+            primary=dict(primary_rows),
+            totals={
+                "formal": result.formal_votes,
+                "informal": result.informal_votes,
+                "total": result.total_votes,
+            },
+        )
+        for tcp_candidate, candidate, votes in tcp_rows:
+            booth.tcp.setdefault(tcp_candidate, {})[candidate] = votes
+        return booth
+
+
+class DivisionTally:
+    """Running primary and TCP totals across a division's booths."""
+
+    def __init__(self, division: str, version: int = 0):
+        self.division = division
+        # The division's data version these totals reflect
+        self.version = version
+        self.booths: Dict[int, BoothTally] = {}
+        # Totals keep the order candidates were first entered
+        self.primary: Dict[str, int] = {}
+        self.tcp: Dict[str, Dict[str, int]] = {}
+        self._primary_booths: Dict[str, int] = {}
+        self._tcp_booths: Dict[tuple, int] = {}
+        self.last_updated = datetime.now(timezone.utc)
+        self._response: Optional[Dict[str, Any]] = None
+
+    def add(self, booth: BoothTally) -> None:
+        """Add a booth's counts to the totals, replacing any previous counts."""
+        self.remove(booth.result_id)
+        self.booths[booth.result_id] = booth
+        for candidate, votes in booth.primary.items():
+            self.primary[candidate] = self.primary.get(candidate, 0) + votes
+            self._primary_booths[candidate] = self._primary_booths.get(candidate, 0) + 1
+        for tcp_candidate, distribution in booth.tcp.items():
+            for candidate, votes in distribution.items():
+                totals = self.tcp.setdefault(candidate, {})
+                totals[tcp_candidate] = totals.get(tcp_candidate, 0) + votes
+                key = (candidate, tcp_candidate)
+                self._tcp_booths[key] = self._tcp_booths.get(key, 0) + 1
+        self._touch()
+
+    def remove(self, result_id: int) -> bool:
+        """Subtract a booth's counts from the totals. Returns False if absent."""
+        booth = self.booths.pop(result_id, None)
+        if booth is None:
+            return False
+        for candidate, votes in booth.primary.items():
+            self.primary[candidate] -= votes
+            self._primary_booths[candidate] -= 1
+            if not self._primary_booths[candidate]:
+                del self.primary[candidate], self._primary_booths[candidate]
+        for tcp_candidate, distribution in booth.tcp.items():
+            for candidate, votes in distribution.items():
+                key = (candidate, tcp_candidate)
+                self.tcp[candidate][tcp_candidate] -= votes
+                self._tcp_booths[key] -= 1
+                if not self._tcp_booths[key]:
+                    del self.tcp[candidate][tcp_candidate], self._tcp_booths[key]
+                    if not self.tcp[candidate]:
+                        del self.tcp[candidate]
+        self._touch()
+        return True
+
+    def _touch(self) -> None:
+        self.last_updated = datetime.now(timezone.utc)
+        self._response = None
+
+    def as_response(self) -> Dict[str, Any]:
+        """Get the division results payload, built once per change."""
+        if self._response is None:
+            self._response = self._build_response()
+        return self._response
+
+    def _build_response(self) -> Dict[str, Any]:
+        booths = sorted(
+            self.booths.values(),
+            key=lambda b: b.timestamp or datetime.min,
+            reverse=True,
+        )
+        booth_results = [
+            {
+                "id": booth.result_id,
+                "booth_name": booth.booth_name,
+                "timestamp": booth.timestamp.isoformat() if booth.timestamp else None,
+                "image_url": booth.image_url,
+                "primary_votes": booth.primary,
+                "tcp_votes": booth.tcp,
+                "totals": booth.totals,
+            }
+            for booth in booths
+        ]
+
+        total_primary_votes = sum(self.primary.values())
+        primary_votes_array = []
+        for candidate, votes in self.primary.items():
+            entry = {"candidate": candidate, "votes": votes}
+            if total_primary_votes > 0:
+                entry["percentage"] = (votes / total_primary_votes) * 100
+            primary_votes_array.append(entry)
+
+        # Distributions of each excluded candidate's votes to the TCP pair
+        tcp_candidates = sorted(
+            {tcp for distribution in self.tcp.values() for tcp in distribution}
+        )
+        tcp_votes_array = []
+        for candidate, distribution in self.tcp.items():
+            if candidate in tcp_candidates:
+                continue
+            primary = self.primary.get(candidate, 0)
+            distributions: Dict[str, Any] = {}
+            for tcp_candidate in tcp_candidates:
+                votes = distribution.get(tcp_candidate, 0)
+                distributions[tcp_candidate] = (
+                    {"votes": votes, "percentage": (votes / primary) * 100}
+                    if primary > 0
+                    else votes
+                )
+            tcp_votes_array.append(
+                {
+                    "candidate": candidate,
+                    "primary_votes": primary,
+                    "distributions": distributions,
+                }
+            )
+
+        return {
+            "status": "success",
+            "booth_count": len(booth_results),
+            "total_booths": len(
+                booth_results
+            ),  # This should be updated with actual total booths
+            "booth_results": booth_results,
+            "primary_votes": primary_votes_array,
+            "tcp_votes": tcp_votes_array,
+            "last_updated": self.last_updated.isoformat(),
+        }
+
+
+class TallyCache:
+    """Division tallies keyed by division name."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._divisions: Dict[str, DivisionTally] = {}
+        self._result_divisions: Dict[int, str] = {}
+
+    def get(self, division: str, version: int) -> Optional[DivisionTally]:
+        """
+        Get a division's tally if it reflects ``version`` of the division.
+
+        Returns None if the division hasn't been loaded or its tally is at
+        another version.
+        """
+        if not TALLY_CACHE_ENABLED:
+            return None
+        tally = self._divisions.get(division)
+        if tally is None or tally.version != version:
+            return None
+        return tally
+
+    def install(
+        self, division: str, booths: Iterable[BoothTally], version: int
+    ) -> DivisionTally:
+        """
+        Build a division's tally from booths read from the database.
+
+        ``version`` must be read before the booths. The tally is cached
+        unless a tally at a later version already is; it is returned either
+        way.
+        """
+        tally = DivisionTally(division, version)
+        for booth in booths:
+            tally.add(booth)
+        with self._lock:
+            cached = self._divisions.get(division)
+            if TALLY_CACHE_ENABLED and (cached is None or cached.version <= version):
+                self._install(tally)
+        return tally
+
+    def rebuild(self, booths: Iterable[tuple], versions: Dict[str, int]) -> None:
+        """
+        Replace the whole cache with (division, booth) pairs from the database.
+
+        Args:
+            booths: (division, booth) pairs for every reviewed result
+            versions: {division: data version}, read before the booths
+        """
+        divisions: Dict[str, DivisionTally] = {}
+        for division, booth in booths:
+            if division not in divisions:
+                divisions[division] = DivisionTally(
+                    division, versions.get(division, 0)
+                )
+            divisions[division].add(booth)
+        with self._lock:
+            self._divisions = divisions
+            self._result_divisions = {
+                result_id: division
+                for division, tally in divisions.items()
+                for result_id in tally.booths
+            }
+
+    def upsert(
+        self, division: str, booth: BoothTally, versions: Dict[str, int]
+    ) -> None:
+        """
+        Apply a reviewed result's counts, moving it between divisions if needed.
+
+        Args:
+            division: The result's division
+            booth: The result's counts
+            versions: {division: version} for every division the write bumped
+        """
+        with self._lock:
+            tallies = self._advance(versions)
+            previous = self._result_divisions.get(booth.result_id)
+            if previous in tallies:
+                tallies[previous].remove(booth.result_id)
+                del self._result_divisions[booth.result_id]
+            if division in tallies:
+                tallies[division].add(booth)
+                self._result_divisions[booth.result_id] = division
+
+    def remove(self, result_ids: Iterable[int], versions: Dict[str, int]) -> None:
+        """
+        Take results' counts out of their divisions.
+
+        Args:
+            result_ids: The results to take out
+            versions: {division: version} for every division the write bumped
+        """
+        with self._lock:
+            tallies = self._advance(versions)
+            for result_id in result_ids:
+                division = self._result_divisions.get(result_id)
+                if division in tallies:
+                    tallies[division].remove(result_id)
+                    del self._result_divisions[result_id]
+
+    def reset_division(self, division: str, version: int) -> None:
+        """Empty a division whose results have all been deleted at ``version``."""
+        with self._lock:
+            cached = self._divisions.get(division)
+            if cached is None or cached.version < version:
+                self._install(DivisionTally(division, version))
+
+    def clear(self) -> None:
+        """Forget every division; they are reloaded on next use."""
+        with self._lock:
+            self._divisions = {}
+            self._result_divisions = {}
+
+    def _advance(self, versions: Dict[str, int]) -> Dict[str, DivisionTally]:
+        """
+        Move cached tallies to the versions a committed write bumped them to.
+
+        Returns:
+            The tallies the write's change applies to: those exactly one
+            version behind it. Tallies further behind have missed another
+            write and are dropped; tallies already at or past the write's
+            version were loaded after it and are left alone.
+        """
+        tallies = {}
+        for division, version in versions.items():
+            tally = self._divisions.get(division)
+            if tally is None:
+                continue
+            if tally.version == version - 1:
+                tally.version = version
+                tallies[division] = tally
+            elif tally.version < version:
+                self._forget(division)
+        return tallies
+
+    def _install(self, tally: DivisionTally) -> None:
+        self._forget(tally.division)
+        self._divisions[tally.division] = tally
+        for result_id in tally.booths:
+            self._result_divisions[result_id] = tally.division
+
+    def _forget(self, division: str) -> None:
+        tally = self._divisions.pop(division, None)
+        if tally is not None:
+            for result_id in tally.booths:
+                if self._result_divisions.get(result_id) == division:
+                    del self._result_divisions[result_id]
@@ -0,0 +1,56 @@
+"""
+Fast JSON
+
+orjson-backed JSON rendering for the API responses. ``FastJSONResponse`` is
+the app's default response class; endpoints with large payloads return it
+directly so FastAPI's ``jsonable_encoder`` pass is skipped as well.
+
+JSON already stored as text (the ``data`` columns) is wrapped with
+``raw_json`` and written into the response as is, instead of being decoded
+only to be encoded again.
+"""
+
+from typing import Any, Optional
+
+import orjson
+from starlette.responses import JSONResponse
+
+# Same handling as FastAPI's ORJSONResponse: non-string keys become strings
+# like the stdlib, and numpy values serialize natively
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+# orjson < 3.9 has no Fragment; stored JSON is then decoded by orjson instead
+_Fragment = getattr(orjson, "Fragment", None)
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize a payload to JSON bytes."""
+    return orjson.dumps(content, option=ORJSON_OPTIONS)
+
+
+def raw_json(text: Optional[str], empty: Any = None) -> Any:
+    """
+    Embed stored JSON text in a payload without decoding it.
+
+    The text must be valid JSON, as written by ``json.dumps``; it is not
+    checked. Only ``dumps`` and ``FastJSONResponse`` can serialize the result.
+
+    Args:
+        text: JSON text from the database
+        empty: Value to use when there is no text
+
+    Returns:
+        A value that serializes to exactly ``text``
+    """
+    if not text:
+        return empty
+    if _Fragment is None:
+        return orjson.loads(text)
+    return _Fragment(text)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
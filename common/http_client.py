@@ -0,0 +1,134 @@
+"""
+HTTP Client
+
+One long-lived, connection-pooled ``httpx.AsyncClient`` for the app's
+outbound requests, so repeated requests to the same host reuse connections
+and TLS sessions instead of opening new ones, plus a streamed download that
+stops at a size limit and retries transient failures.
+"""
+
+import asyncio
+import os
+import random
+from typing import Optional
+
+import httpx
+
+HTTP_TIMEOUT_SECONDS = float(os.environ.get("HTTP_TIMEOUT_SECONDS", "15"))
+HTTP_CONNECT_TIMEOUT_SECONDS = float(
+    os.environ.get("HTTP_CONNECT_TIMEOUT_SECONDS", "5")
+)
+HTTP_MAX_CONNECTIONS = int(os.environ.get("HTTP_MAX_CONNECTIONS", "20"))
+# Attempts after the first for failed connections, 5xx and 429 responses
+HTTP_RETRIES = int(os.environ.get("HTTP_RETRIES", "2"))
+HTTP_RETRY_BASE_SECONDS = float(os.environ.get("HTTP_RETRY_BASE_SECONDS", "0.5"))
+# Largest image accepted from an SMS media URL
+SMS_MEDIA_MAX_BYTES = int(os.environ.get("SMS_MEDIA_MAX_BYTES", str(20 * 2**20)))
+
+
+class DownloadTooLarge(Exception):
+    """The response body is bigger than the download limit."""
+
+
+class SharedHTTPClient:
+    """Lazily created ``httpx.AsyncClient``, closed by the app lifespan."""
+
+    def __init__(
+        self,
+        timeout: float = HTTP_TIMEOUT_SECONDS,
+        connect_timeout: float = HTTP_CONNECT_TIMEOUT_SECONDS,
+        max_connections: int = HTTP_MAX_CONNECTIONS,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        """
+        Args:
+            timeout: Read, write and pool timeout in seconds
+            connect_timeout: Connection timeout in seconds
+            max_connections: Connections open at once, across hosts
+            transport: Transport to use instead of the network, for tests
+        """
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+        )
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def get(self) -> httpx.AsyncClient:
+        """Get the client, creating it on first use in this event loop."""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._loop is not loop:
+            # Pooled connections belong to the loop that opened them
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=self.limits,
+                transport=self.transport
+                or httpx.AsyncHTTPTransport(retries=HTTP_RETRIES),
+                follow_redirects=True,
+            )
+            self._loop = loop
+        return self._client
+
+    async def aclose(self) -> None:
+        """Close the client and its pooled connections."""
+        client, self._client = self._client, None
+        if client is not None and self._loop is asyncio.get_running_loop():
+            await client.aclose()
+
+
+def _retryable(error: Exception) -> bool:
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status == 429 or status >= 500
+    return isinstance(error, httpx.TransportError)
+
+
+async def download(
+    client: httpx.AsyncClient,
+    url: str,
+    max_bytes: int = SMS_MEDIA_MAX_BYTES,
+    retries: int = HTTP_RETRIES,
+    retry_base: float = HTTP_RETRY_BASE_SECONDS,
+) -> bytes:
+    """
+    Download a URL in one streamed request, refusing bodies over a limit.
+
+    Args:
+        client: The client to send the request with
+        url: URL to fetch
+        max_bytes: Largest body to accept
+        retries: Attempts after the first for connection errors, timeouts,
+            5xx and 429 responses, with jittered exponential backoff
+        retry_base: Backoff ceiling for the first retry, doubling after
+
+    Returns:
+        The response body
+
+    Raises:
+        DownloadTooLarge: If the body is over ``max_bytes``
+        httpx.HTTPStatusError: For an error status, once retries run out
+        httpx.TransportError: If the request fails, once retries run out
+    """
+    for attempt in range(retries + 1):
+        try:
+            async with client.stream("GET", url) as response:
+                response.raise_for_status()
+                length = response.headers.get("content-length")
+                if length and length.isdigit() and int(length) > max_bytes:
+                    raise DownloadTooLarge(
+                        f"{url} is {length} bytes, over the {max_bytes} byte limit"
+                    )
+                body = bytearray()
+                async for chunk in response.aiter_bytes():
+                    body.extend(chunk)
+                    if len(body) > max_bytes:
+                        raise DownloadTooLarge(
+                            f"{url} is over the {max_bytes} byte limit"
+                        )
+                return bytes(body)
+        except (httpx.HTTPStatusError, httpx.TransportError) as e:
+            if attempt == retries or not _retryable(e):
+                raise
+            await asyncio.sleep(random.uniform(0, retry_base * 2**attempt))
@@ -0,0 +1,202 @@
+"""
+Image Preprocessing
+
+Prepares tally sheet photos for Textract: applies the EXIF orientation,
+scales large photos down, converts to grayscale, stretches the contrast and
+encodes as PNG, or as JPEG when the PNG would be too big. Phone photos
+re-encoded as lossless PNG are often larger than the original, slower to
+send and can exceed Textract's synchronous payload limit.
+
+The PIL work runs in a process pool so it never holds up the event loop, and
+each run reports the byte counts before and after and the time spent in each
+stage.
+"""
+
+import asyncio
+import io
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+# Largest image AnalyzeDocument accepts as bytes
+TEXTRACT_MAX_BYTES = 10 * 2**20
+
+IMAGE_PREPROCESS_WORKERS = int(os.environ.get("IMAGE_PREPROCESS_WORKERS", "2"))
+
+
+@dataclass(frozen=True)
+class PreprocessConfig:
+    """Preprocessing settings; the defaults come from the environment."""
+
+    # Longest side in pixels; larger images are scaled down (0 keeps the size)
+    max_dimension: int = int(os.environ.get("IMAGE_MAX_DIMENSION", "3000"))
+    grayscale: bool = os.environ.get("IMAGE_GRAYSCALE", "1") != "0"
+    autocontrast: bool = os.environ.get("IMAGE_AUTOCONTRAST", "1") != "0"
+    # PNG up to this size, JPEG above it
+    png_max_bytes: int = int(os.environ.get("IMAGE_PNG_MAX_BYTES", str(2**20)))
+    jpeg_quality: int = int(os.environ.get("IMAGE_JPEG_QUALITY", "90"))
+    max_bytes: int = TEXTRACT_MAX_BYTES
+
+
+def _encode(
+    image: Image.Image, config: PreprocessConfig
+) -> Tuple[bytes, str, Tuple[int, int]]:
+    """
+    Encode as PNG if small enough, else as JPEG, shrinking to fit the limit.
+
+    Returns:
+        Tuple of (encoded image, format, final dimensions)
+    """
+    png = io.BytesIO()
+    image.save(png, format="PNG")
+    if png.tell() <= config.png_max_bytes:
+        return png.getvalue(), "PNG", image.size
+    while True:
+        jpeg = io.BytesIO()
+        image.save(jpeg, format="JPEG", quality=config.jpeg_quality)
+        if jpeg.tell() <= config.max_bytes or min(image.size) < 100:
+            return jpeg.getvalue(), "JPEG", image.size
+        image = image.resize(
+            (image.width * 3 // 4, image.height * 3 // 4), Image.LANCZOS
+        )
+
+
+def preprocess_image(
+    image_data: bytes, config: PreprocessConfig
+) -> Tuple[bytes, Dict[str, Any]]:
+    """
+    Run an image through the preprocessing stages.
+
+    Args:
+        image_data: The image as uploaded
+        config: Which stages to run and how to encode the output
+
+    Returns:
+        Tuple of (encoded image, report with the byte counts, dimensions,
+        output format and per-stage timings in milliseconds)
+
+    Raises:
+        PIL.UnidentifiedImageError or OSError if the image can't be decoded
+    """
+    timings = {}
+    started = time.perf_counter()
+
+    def stage(name: str) -> None:
+        nonlocal started
+        now = time.perf_counter()
+        timings[name] = round((now - started) * 1000, 2)
+        started = now
+
+    image = Image.open(io.BytesIO(image_data))
+    image.load()
+    original_size = image.size
+    stage("decode")
+
+    image = ImageOps.exif_transpose(image)
+    stage("auto_rotate")
+
+    if config.max_dimension and max(image.size) > config.max_dimension:
+        image.thumbnail((config.max_dimension, config.max_dimension), Image.LANCZOS)
+    stage("downscale")
+
+    if config.grayscale:
+        image = image.convert("L")
+    elif image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    stage("grayscale")
+
+    if config.autocontrast:
+        image = ImageOps.autocontrast(image, cutoff=1)
+    stage("autocontrast")
+
+    output, output_format, output_size = _encode(image, config)
+    stage("encode")
+
+    return output, {
+        "bytes_in": len(image_data),
+        "bytes_out": len(output),
+        "size_in": list(original_size),
+        "size_out": list(output_size),
+        "format": output_format,
+        "timings_ms": timings,
+    }
+
+
+class ImagePreprocessor:
+    """Runs ``preprocess_image`` on a pool of worker processes."""
+
+    def __init__(
+        self,
+        config: Optional[PreprocessConfig] = None,
+        workers: int = IMAGE_PREPROCESS_WORKERS,
+    ):
+        """
+        Args:
+            config: Preprocessing settings, default from the environment
+            workers: Worker processes; 0 runs in a thread of this process
+        """
+        self.config = config or PreprocessConfig()
+        self.workers = workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> Optional[ProcessPoolExecutor]:
+        """Start the worker processes on first use."""
+        if self.workers <= 0:
+            return None
+        with self._lock:
+            if self._pool is None:
+                # Spawned rather than forked: the server has threads running
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._pool
+
+    def _discard_pool(self, pool: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False)
+
+    async def preprocess(self, image_data: bytes) -> Tuple[bytes, Dict[str, Any]]:
+        """
+        Preprocess an image without blocking the event loop.
+
+        Returns:
+            Tuple of (encoded image, report), as from ``preprocess_image``
+        """
+        loop = asyncio.get_running_loop()
+        pool = self._get_pool()
+        try:
+            return await loop.run_in_executor(
+                pool, preprocess_image, image_data, self.config
+            )
+        except BrokenProcessPool:
+            # A worker died (out of memory on a huge image, say); start afresh
+            self._discard_pool(pool)
+            raise
+
+    def shutdown(self) -> None:
+        """Stop the worker processes."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool:
+            pool.shutdown(wait=True)
+
+
+def report_summary(report: Dict[str, Any]) -> str:
+    """Describe a preprocessing report in one log line."""
+    stages = ", ".join(f"{name} {ms}ms" for name, ms in report["timings_ms"].items())
+    return (
+        f"{report['bytes_in']} -> {report['bytes_out']} bytes "
+        f"({report['format']}, {report['size_out'][0]}x{report['size_out'][1]}); "
+        f"{stages}"
+    )
@@ -1,148 +1,185 @@
 import logging
-import io
 import json
-from typing import Dict, List, Optional, Any, Tuple
+from pathlib import Path
+from typing import Dict, List, Optional, Any, Sequence, Tuple, Union
 from fastapi import HTTPException
-from PIL import Image
 import boto3
+from botocore.config import Config
 import httpx
 from datetime import datetime
 
+from common.http_client import DownloadTooLarge, download
+from common.image_preprocessing import ImagePreprocessor, report_summary
+from common.ocr_cache import OCRCache, image_key
+from common.ocr_engines import (
+    OCR_ENGINES,
+    NoTableFound,
+    OCREngine,
+    OCRRouter,
+    OCRUnavailable,
+    create_ocr_engines,
+)
+from common.textract_executor import TEXTRACT_READ_TIMEOUT_SECONDS, TextractExecutor
+
 logger = logging.getLogger(__name__)
 
 
 class ImageProcessor:
-    def __init__(self, region_name: str = "ap-southeast-2"):
-        self.textract_client = boto3.client("textract", region_name=region_name)
+    def __init__(
+        self,
+        region_name: str = "ap-southeast-2",
+        executor: Optional[TextractExecutor] = None,
+        cache: Optional[OCRCache] = None,
+        preprocessor: Optional[ImagePreprocessor] = None,
+        engines: Optional[Sequence[OCREngine]] = None,
+        recordings_dir: Optional[Union[str, Path]] = None,
+    ):
+        if executor is None:
+            # Throttled calls are retried by the executor, not by botocore
+            client = boto3.client(
+                "textract",
+                region_name=region_name,
+                config=Config(
+                    retries={"mode": "standard", "max_attempts": 1},
+                    read_timeout=TEXTRACT_READ_TIMEOUT_SECONDS,
+                ),
+            )
+            executor = TextractExecutor(client)
+        self.textract = executor
+        self.cache = cache
+        self.preprocessor = preprocessor or ImagePreprocessor()
+        if engines is None:
+            engines = create_ocr_engines(
+                OCR_ENGINES.split(","), executor, recordings_dir
+            )
+        self.ocr = OCRRouter(engines)
 
     async def process_image(
         self, image_data: bytes, source: str = "upload"
     ) -> Dict[str, Any]:
         """
-        Process an image using Amazon Textract to extract table data and booth name.
+        Process an image using the OCR engines to extract table data and booth name.
 
         Args:
             image_data: Raw image data in bytes
             source: Source of the image ("upload" or "sms")
 
         Returns:
-            Dictionary containing extracted data including tables and booth name
+            Dictionary containing the extracted table cells and booth name, the
+            OCR engine that read them, the image's SHA-256, the id of the result
+            already saved from the same image if it was scanned before, and the
+            preprocessing report for a new image
+
+        Raises:
+            HTTPException: 400 if the image cannot be decoded, 500 on other errors
+            NoTableFound: If the engines that ran found no table
+            OCRUnavailable: If every engine failed or was skipped
         """
         try:
             logger.info(f"Processing image from {source}")
 
+            key = image_key(image_data)
+            cached = self.cache.get(key) if self.cache else None
+            if (
+                cached
+                and cached.get("result_id") is None
+                and cached.get("engine") not in (None, self.ocr.primary)
+                and self.ocr.available(self.ocr.primary)
+            ):
+                # A fallback engine's read that was never saved as a result:
+                # read the image again now the primary engine is available
+                logger.info(
+                    f"Image {key[:12]} was read by {cached['engine']}; "
+                    f"reading it again with {self.ocr.primary}"
+                )
+                cached = None
+            if cached:
+                logger.info(f"Image {key[:12]} was scanned before; skipping OCR")
+                return {
+                    "extracted_rows": cached["extracted_rows"],
+                    "booth_name": cached["booth_name"],
+                    "engine": cached.get("engine"),
+                    "source": source,
+                    "image_sha256": key,
+                    "result_id": cached.get("result_id"),
+                }
+
             # Validate and preprocess image
             try:
-                image = Image.open(io.BytesIO(image_data))
-                # Convert to RGB if needed
-                if image.mode not in ("RGB", "L"):
-                    image = image.convert("RGB")
-                # Convert back to bytes in PNG format
-                img_byte_arr = io.BytesIO()
-                image.save(img_byte_arr, format="PNG")
-                image_data = img_byte_arr.getvalue()
+                image_data, preprocessing = await self.preprocessor.preprocess(
+                    image_data
+                )
+                logger.info(f"Preprocessed image: {report_summary(preprocessing)}")
             except Exception as e:
                 logger.error(f"Error preprocessing image: {e}")
                 raise HTTPException(status_code=400, detail="Invalid image format")
 
-            # Send image to Textract with TABLES + QUERIES
-            logger.info("Sending image to Amazon Textract...")
-            response = self.textract_client.analyze_document(
-                Document={"Bytes": image_data},
-                FeatureTypes=["TABLES", "QUERIES"],
-                QueriesConfig={
-                    "Queries": [
-                        {"Text": "What is the BOOTH NAME?", "Alias": "BoothName"}
-                    ]
-                },
+            result = await self.ocr.recognize(image_data, key)
+            extracted_rows = result["extracted_rows"]
+            booth_name = result["booth_name"]
+            logger.info(
+                f"{result['engine']} extracted {len(extracted_rows)} cells, "
+                f"booth name: {booth_name}"
             )
-            logger.info("Received response from Textract.")
-
-            blocks_map = {block["Id"]: block for block in response["Blocks"]}
-            tables = []
-            booth_name = None
-
-            for block in response["Blocks"]:
-                if block["BlockType"] == "TABLE":
-                    tables.append(block)
-                if block["BlockType"] == "QUERY_RESULT":
-                    booth_name = block.get("Text", "").strip()
-
-            logger.info(f"Found {len(tables)} tables.")
-            logger.info(f"Extracted booth name: {booth_name}")
-
-            # Pick the second table if available
-            if len(tables) >= 2:
-                target_table = tables[1]
-            elif len(tables) == 1:
-                target_table = tables[0]
-            else:
-                raise Exception("No tables found in document.")
 
-            # Extract table cells
-            extracted_rows = self._extract_table(target_table, blocks_map)
-            logger.info(f"Extracted {len(extracted_rows)} cells from the target table.")
+            if self.cache:
+                self.cache.put(
+                    key,
+                    {
+                        "extracted_rows": extracted_rows,
+                        "booth_name": booth_name,
+                        "engine": result["engine"],
+                    },
+                )
 
             return {
                 "extracted_rows": extracted_rows,
                 "booth_name": booth_name,
-                "tables": tables,
+                "engine": result["engine"],
                 "source": source,
+                "image_sha256": key,
+                "result_id": None,
+                "preprocessing": preprocessing,
             }
 
+        except (HTTPException, NoTableFound, OCRUnavailable):
+            raise
         except Exception as e:
             logger.error(f"Error processing image: {e}", exc_info=True)
             raise HTTPException(status_code=500, detail=str(e))
 
-    def _extract_table(self, table_block: Dict, blocks_map: Dict) -> List[Dict]:
-        """
-        Extract data from a table block.
-
-        Args:
-            table_block: The table block from Textract
-            blocks_map: Map of all blocks from Textract
+    def link_result(self, image_sha256: Optional[str], result_id: int) -> None:
+        """Record the result saved from a scanned image, for repeat submissions."""
+        if self.cache and image_sha256:
+            self.cache.link(image_sha256, result_id)
 
-        Returns:
-            List of extracted cells with row and column indices
-        """
-        table_data = []
-        for relationship in table_block.get("Relationships", []):
-            if relationship["Type"] == "CHILD":
-                for child_id in relationship["Ids"]:
-                    child = blocks_map[child_id]
-                    if child["BlockType"] == "CELL":
-                        text = ""
-                        for rel in child.get("Relationships", []):
-                            for grandchild_id in rel["Ids"]:
-                                word = blocks_map[grandchild_id]
-                                if word["BlockType"] == "WORD":
-                                    text += word["Text"] + " "
-                        table_data.append(
-                            {
-                                "RowIndex": child["RowIndex"],
-                                "ColumnIndex": child["ColumnIndex"],
-                                "Text": text.strip(),
-                            }
-                        )
-        return table_data
-
-    async def process_sms_image(self, media_url: str) -> Dict[str, Any]:
+    async def process_sms_image(
+        self, media_url: str, client: httpx.AsyncClient
+    ) -> Dict[str, Any]:
         """
         Process an image from an SMS media URL.
 
+        The image is downloaded once, streamed up to SMS_MEDIA_MAX_BYTES, and
+        its bytes go straight to ``process_image``.
+
         Args:
             media_url: URL of the image to process
+            client: Shared HTTP client to download it with
 
         Returns:
             Dictionary containing extracted data
         """
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(media_url)
-                image_data = response.content
+            try:
+                image_data = await download(client, media_url)
+            except DownloadTooLarge as e:
+                raise HTTPException(status_code=413, detail=str(e))
+            logger.info(f"Downloaded {len(image_data)} bytes from {media_url}")
 
             return await self.process_image(image_data, source="sms")
 
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"Error processing SMS image: {e}", exc_info=True)
             raise HTTPException(status_code=500, detail=str(e))
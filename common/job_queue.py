@@ -0,0 +1,431 @@
+"""
+Job Queue
+
+Durable queue for work that outlives the request that submitted it, such as
+scanning an uploaded tally sheet. Jobs are rows in the ``jobs`` table of the
+results database (the SQLite file by default), so they survive restarts and
+are shared by every app process.
+
+Workers claim a job by leasing it with a conditional UPDATE, so only one
+worker wins each job, and a job whose worker died is claimed again once its
+lease runs out. Failed jobs are retried with exponential backoff until they
+run out of attempts, then parked in the ``dead`` state until an admin
+requeues them. A handler raises PermanentJobError for a failure that retrying
+cannot fix, such as an unreadable upload, and the job is parked at once.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.engine import Connection
+
+from common.db_utils import primary_key_column
+
+logger = logging.getLogger(__name__)
+
+
+class PermanentJobError(Exception):
+    """A job failed in a way that retrying will not fix."""
+
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+DEAD = "dead"
+
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", "3"))
+# How long a worker may hold a job before another worker may take it over
+JOB_LEASE_SECONDS = float(os.environ.get("JOB_LEASE_SECONDS", "300"))
+# Delay before the first retry, doubled for every attempt after that
+JOB_RETRY_DELAY_SECONDS = float(os.environ.get("JOB_RETRY_DELAY_SECONDS", "5"))
+# How often idle workers look for jobs queued by other processes or retries
+JOB_POLL_SECONDS = float(os.environ.get("JOB_POLL_SECONDS", "2"))
+
+# Claimable: queued and due, or running under a lease that has run out
+_CLAIMABLE = (
+    "((status = 'queued' AND run_after <= :now) "
+    "OR (status = 'running' AND lease_expires_at <= :now "
+    "AND attempts < max_attempts))"
+)
+
+SELECT_CLAIMABLE_SQL = text(
+    f"SELECT id FROM jobs WHERE kind IN :kinds AND {_CLAIMABLE} ORDER BY id LIMIT 1"
+).bindparams(bindparam("kinds", expanding=True))
+
+# The claimable check is repeated so a worker that lost the race updates nothing
+CLAIM_SQL = text(
+    f"""
+    UPDATE jobs
+    SET status = 'running', attempts = attempts + 1, lease_expires_at = :lease,
+        updated_at = :now
+    WHERE id = :id AND {_CLAIMABLE}
+    """
+)
+
+# Jobs whose worker died on their last attempt
+EXPIRE_SQL = text(
+    """
+    UPDATE jobs
+    SET status = 'dead', error = 'Lease expired on the last attempt',
+        updated_at = :now
+    WHERE status = 'running' AND lease_expires_at <= :now
+      AND attempts >= max_attempts
+    """
+)
+
+
+def create_jobs_table(conn: Connection) -> None:
+    """Create the jobs table if it doesn't exist."""
+    pk = primary_key_column(conn)
+    conn.execute(
+        text(
+            f"""
+    CREATE TABLE IF NOT EXISTS jobs (
+        {pk},
+        kind VARCHAR NOT NULL,
+        status VARCHAR NOT NULL,
+        payload TEXT NOT NULL,
+        result TEXT,
+        error TEXT,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        max_attempts INTEGER NOT NULL,
+        run_after DOUBLE PRECISION NOT NULL,
+        lease_expires_at DOUBLE PRECISION,
+        created_at DOUBLE PRECISION NOT NULL,
+        updated_at DOUBLE PRECISION NOT NULL
+    )
+    """
+        )
+    )
+    conn.execute(
+        text("CREATE INDEX IF NOT EXISTS ix_jobs_status_kind ON jobs (status, kind)")
+    )
+
+
+def _iso(timestamp: Optional[float]) -> Optional[str]:
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+
+@dataclass
+class Job:
+    id: int
+    kind: str
+    status: str
+    payload: Dict[str, Any]
+    result: Optional[Dict[str, Any]]
+    error: Optional[str]
+    attempts: int
+    max_attempts: int
+    run_after: float
+    created_at: float
+    updated_at: float
+
+    @classmethod
+    def from_row(cls, row) -> "Job":
+        return cls(
+            id=row.id,
+            kind=row.kind,
+            status=row.status,
+            payload=json.loads(row.payload),
+            result=json.loads(row.result) if row.result else None,
+            error=row.error,
+            attempts=row.attempts,
+            max_attempts=row.max_attempts,
+            run_after=row.run_after,
+            created_at=row.created_at,
+            updated_at=row.updated_at,
+        )
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "attempts": self.attempts,
+            "max_attempts": self.max_attempts,
+            "result": self.result,
+            "error": self.error,
+            "next_attempt_at": (
+                _iso(self.run_after) if self.status == QUEUED else None
+            ),
+            "created_at": _iso(self.created_at),
+            "updated_at": _iso(self.updated_at),
+        }
+
+
+class JobQueue:
+    """Jobs stored in the database, claimed by leasing."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Any],
+        lease_seconds: float = JOB_LEASE_SECONDS,
+        retry_delay: float = JOB_RETRY_DELAY_SECONDS,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Args:
+            session_factory: Callable returning a new async session
+            lease_seconds: How long a claimed job is held by its worker
+            retry_delay: Delay before the first retry, doubled per attempt
+            clock: Time source, in seconds since the epoch
+        """
+        self.session_factory = session_factory
+        self.lease_seconds = lease_seconds
+        self.retry_delay = retry_delay
+        self.clock = clock
+
+    async def _read(self, db, job_id: int) -> Optional[Job]:
+        row = (
+            await db.execute(text("SELECT * FROM jobs WHERE id = :id"), {"id": job_id})
+        ).first()
+        return Job.from_row(row) if row else None
+
+    async def enqueue(
+        self,
+        kind: str,
+        payload: Dict[str, Any],
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+    ) -> Job:
+        """Add a job, due straight away."""
+        now = self.clock()
+        db = self.session_factory()
+        try:
+            params = {
+                "kind": kind,
+                "status": QUEUED,
+                "payload": json.dumps(payload),
+                "max_attempts": max_attempts,
+                "now": now,
+            }
+            job_id = (
+                await db.execute(
+                    text(
+                        """
+                INSERT INTO jobs (kind, status, payload, attempts, max_attempts,
+                                  run_after, created_at, updated_at)
+                VALUES (:kind, :status, :payload, 0, :max_attempts, :now, :now, :now)
+                RETURNING id
+                """
+                    ),
+                    params,
+                )
+            ).scalar_one()
+            await db.commit()
+            return await self._read(db, job_id)
+        finally:
+            await db.close()
+
+    async def get(self, job_id: int) -> Optional[Job]:
+        """Get a job by id."""
+        db = self.session_factory()
+        try:
+            return await self._read(db, job_id)
+        finally:
+            await db.close()
+
+    async def claim(self, kinds: List[str]) -> Optional[Job]:
+        """
+        Lease the oldest due job of the given kinds.
+
+        Returns:
+            The claimed job, with its attempt counted, or None if none is due
+        """
+        db = self.session_factory()
+        try:
+            now = self.clock()
+            await db.execute(EXPIRE_SQL, {"now": now})
+            await db.commit()
+            # Another worker may take the job between the select and the
+            # update; try the next one then
+            for _ in range(5):
+                job_id = (
+                    await db.execute(SELECT_CLAIMABLE_SQL, {"kinds": kinds, "now": now})
+                ).scalar()
+                if job_id is None:
+                    return None
+                claimed = await db.execute(
+                    CLAIM_SQL,
+                    {"id": job_id, "now": now, "lease": now + self.lease_seconds},
+                )
+                await db.commit()
+                if claimed.rowcount == 1:
+                    return await self._read(db, job_id)
+            return None
+        finally:
+            await db.close()
+
+    async def _finish(self, job: Job, values: Dict[str, Any]) -> bool:
+        """Update a running job, unless its lease was taken over by another worker."""
+        db = self.session_factory()
+        try:
+            assignments = ", ".join(f"{column} = :{column}" for column in values)
+            updated = await db.execute(
+                text(
+                    f"UPDATE jobs SET {assignments}, lease_expires_at = NULL "
+                    "WHERE id = :id AND status = 'running' AND attempts = :attempts"
+                ),
+                {**values, "id": job.id, "attempts": job.attempts},
+            )
+            await db.commit()
+            return updated.rowcount == 1
+        finally:
+            await db.close()
+
+    async def complete(self, job: Job, result: Dict[str, Any]) -> bool:
+        """Mark a claimed job succeeded with its result."""
+        return await self._finish(
+            job,
+            {
+                "status": SUCCEEDED,
+                "result": json.dumps(result),
+                "error": None,
+                "updated_at": self.clock(),
+            },
+        )
+
+    async def fail(self, job: Job, error: str, permanent: bool = False) -> bool:
+        """
+        Schedule a retry of a claimed job, or park it as dead.
+
+        Args:
+            job: The claimed job
+            error: Why it failed
+            permanent: Park the job even if it has attempts left
+        """
+        now = self.clock()
+        if permanent or job.attempts >= job.max_attempts:
+            values = {"status": DEAD}
+        else:
+            delay = self.retry_delay * 2 ** (job.attempts - 1)
+            values = {"status": QUEUED, "run_after": now + delay}
+        return await self._finish(job, {**values, "error": error, "updated_at": now})
+
+    async def requeue(self, job_id: int) -> Optional[Job]:
+        """
+        Give a dead job a fresh set of attempts.
+
+        Returns:
+            The requeued job, or None if there is no dead job with that id
+        """
+        now = self.clock()
+        db = self.session_factory()
+        try:
+            updated = await db.execute(
+                text(
+                    "UPDATE jobs SET status = 'queued', attempts = 0, run_after = :now, "
+                    "updated_at = :now WHERE id = :id AND status = 'dead'"
+                ),
+                {"id": job_id, "now": now},
+            )
+            await db.commit()
+            if updated.rowcount != 1:
+                return None
+            return await self._read(db, job_id)
+        finally:
+            await db.close()
+
+
+class WorkerPool:
+    """asyncio workers running queued jobs through per-kind handlers."""
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        handlers: Dict[str, Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]],
+        workers: int,
+        poll_seconds: float = JOB_POLL_SECONDS,
+    ):
+        """
+        Args:
+            queue: Queue to drain
+            handlers: {job kind: async callable taking the payload and
+                returning the result}; an exception fails the attempt
+            workers: Number of concurrent workers, 0 to run none
+            poll_seconds: How long an idle worker waits before looking again
+        """
+        self.queue = queue
+        self.handlers = handlers
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def start(self) -> None:
+        """Start the workers on the running event loop."""
+        self._wakeup = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._work(), name=f"job-worker-{n}")
+            for n in range(self.workers)
+        ]
+        if self._tasks:
+            logger.info(f"Started {len(self._tasks)} job workers")
+
+    async def stop(self) -> None:
+        """Stop the workers. A job cut short is retried once its lease runs out."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def wake(self) -> None:
+        """Tell idle workers a job has just been queued."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def run_once(self) -> bool:
+        """
+        Claim and run one job.
+
+        Returns:
+            Whether a job was run
+        """
+        job = await self.queue.claim(list(self.handlers))
+        if job is None:
+            return False
+        logger.info(f"Running {job.kind} job {job.id}, attempt {job.attempts}")
+        try:
+            result = await self.handlers[job.kind](job.payload)
+        except PermanentJobError as e:
+            logger.error(f"{job.kind} job {job.id} failed permanently: {e}")
+            await self.queue.fail(job, str(e) or type(e).__name__, permanent=True)
+        except Exception as e:
+            logger.error(
+                f"{job.kind} job {job.id} failed on attempt {job.attempts}: {e}",
+                exc_info=True,
+            )
+            await self.queue.fail(job, str(e) or type(e).__name__)
+        else:
+            await self.queue.complete(job, result)
+        return True
+
+    async def drain(self) -> int:
+        """Run jobs until none is due. Returns the number run."""
+        count = 0
+        while await self.run_once():
+            count += 1
+        return count
+
+    async def _work(self) -> None:
+        while True:
+            try:
+                if await self.run_once():
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job worker error: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
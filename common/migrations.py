@@ -0,0 +1,380 @@
+"""
+Schema Migrations
+
+Ordered, versioned schema migrations for the results database. Applied
+versions are recorded in ``schema_migrations`` and each migration runs under
+a database-wide lock, so several app processes or replicas starting at once
+apply every migration exactly once. Migrations run on both SQLite and
+PostgreSQL.
+
+To change the schema, append a new ``Migration`` to ``MIGRATIONS`` with the
+next version number. Never edit or reorder a migration that has shipped.
+"""
+
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Callable, List, NamedTuple, Optional
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import OperationalError
+
+from common.bulk_loader import create_reference_sources_table
+from common.data_versions import create_data_versions_table
+from common.job_queue import create_jobs_table
+from common.db_utils import get_connection, primary_key_column
+from common.result_votes import backfill_result_votes
+
+logger = logging.getLogger(__name__)
+
+# How long a starting process waits for another one to finish migrating
+MIGRATION_LOCK_TIMEOUT_SECONDS = 300
+
+# Arbitrary application-wide key for the PostgreSQL advisory lock
+MIGRATION_LOCK_KEY = 727_2025
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    apply: Callable[[Connection], None]
+
+
+def _table_columns(conn: Connection, table: str) -> set:
+    inspector = inspect(conn)
+    if not inspector.has_table(table):
+        return set()
+    return {column["name"] for column in inspector.get_columns(table)}
+
+
+def _baseline_tables(conn: Connection) -> None:
+    """Create the reference and results tables and bring old layouts up to date."""
+    pk = primary_key_column(conn)
+    conn.execute(
+        text(
+            f"""
+    CREATE TABLE IF NOT EXISTS results (
+        {pk},
+        electorate VARCHAR,
+        booth_name VARCHAR,
+        aec_booth_name VARCHAR,
+        timestamp TIMESTAMP,
+        image_url VARCHAR,
+        is_reviewed INTEGER DEFAULT 0,
+        reviewer VARCHAR,
+        data VARCHAR
+    )
+    """
+        )
+    )
+    columns = _table_columns(conn, "results")
+    for column, ddl in (
+        ("is_reviewed", "is_reviewed INTEGER DEFAULT 0"),
+        ("reviewer", "reviewer VARCHAR"),
+        ("aec_booth_name", "aec_booth_name VARCHAR"),
+    ):
+        if column not in columns:
+            logger.info(f"Adding missing '{column}' column to results")
+            conn.execute(text(f"ALTER TABLE results ADD COLUMN {ddl}"))
+    for column in ("id", "electorate", "booth_name", "image_url"):
+        conn.execute(
+            text(f"CREATE INDEX IF NOT EXISTS ix_results_{column} ON results ({column})")
+        )
+
+    # Older polling_places tables predate the address/status columns and hold
+    # nothing that isn't reloaded from the AEC file, so they are rebuilt
+    columns = _table_columns(conn, "polling_places")
+    missing_columns = {
+        "status",
+        "wheelchair_access",
+        "address",
+        "latitude",
+        "longitude",
+    } - columns
+    if columns and missing_columns:
+        logger.info(
+            f"Polling places table is missing columns {missing_columns}, recreating it"
+        )
+        conn.execute(text("DROP TABLE polling_places"))
+
+    conn.execute(
+        text(
+            f"""
+    CREATE TABLE IF NOT EXISTS polling_places (
+        {pk},
+        state TEXT NOT NULL,
+        division_id INTEGER NOT NULL,
+        division_name TEXT NOT NULL,
+        polling_place_id INTEGER NOT NULL,
+        polling_place_name TEXT NOT NULL,
+        address TEXT,
+        latitude REAL,
+        longitude REAL,
+        status TEXT,
+        wheelchair_access TEXT,
+        data TEXT
+    )
+    """
+        )
+    )
+    conn.execute(
+        text(
+            f"""
+    CREATE TABLE IF NOT EXISTS candidates (
+        {pk},
+        candidate_name TEXT NOT NULL,
+        party TEXT,
+        electorate TEXT NOT NULL,
+        ballot_position INTEGER,
+        candidate_type TEXT NOT NULL,
+        state TEXT,
+        data TEXT
+    )
+    """
+        )
+    )
+    conn.execute(
+        text(
+            f"""
+    CREATE TABLE IF NOT EXISTS booth_results_2022 (
+        {pk},
+        division_name TEXT NOT NULL,
+        polling_place_name TEXT NOT NULL,
+        liberal_national_percentage REAL,
+        labor_percentage REAL,
+        total_votes INTEGER,
+        data TEXT
+    )
+    """
+        )
+    )
+    conn.execute(
+        text(
+            f"""
+    CREATE TABLE IF NOT EXISTS tcp_candidates (
+        {pk},
+        electorate VARCHAR,
+        candidate_name VARCHAR,
+        party VARCHAR
+    )
+    """
+        )
+    )
+
+
+# Composite indexes for the hot query paths, shared with the bulk loaders
+# which drop and rebuild them around a full reload
+HOT_PATH_INDEXES = {
+    "ix_results_electorate_reviewed_timestamp": (
+        "results",
+        "electorate, is_reviewed, timestamp",
+    ),
+    "ix_polling_places_division_name": (
+        "polling_places",
+        "division_name, polling_place_name",
+    ),
+    "ix_booth_results_2022_division_name": (
+        "booth_results_2022",
+        "division_name, polling_place_name",
+    ),
+    "ix_candidates_electorate_type_position": (
+        "candidates",
+        "electorate, candidate_type, ballot_position",
+    ),
+}
+
+
+def create_index_sql(index_name: str) -> str:
+    """Get the CREATE INDEX statement for one of the hot-path indexes."""
+    table, columns = HOT_PATH_INDEXES[index_name]
+    return f"CREATE INDEX IF NOT EXISTS {index_name} ON {table} ({columns})"
+
+
+def _hot_path_indexes(conn: Connection) -> None:
+    """Add composite indexes for the division, booth and candidate lookups."""
+    for index_name in HOT_PATH_INDEXES:
+        conn.execute(text(create_index_sql(index_name)))
+    conn.execute(text("ANALYZE"))
+
+
+def _normalized_result_votes(conn: Connection) -> None:
+    """Create the normalized vote tables and backfill them from results.data."""
+    backfill_result_votes(conn)
+
+
+def _reference_row_hashes(conn: Connection) -> None:
+    """Track content hashes so reference refreshes only write what changed."""
+    for table in ("polling_places", "candidates", "booth_results_2022"):
+        if "row_hash" not in _table_columns(conn, table):
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN row_hash TEXT"))
+    conn.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_polling_places_polling_place_id "
+            "ON polling_places (polling_place_id)"
+        )
+    )
+    create_reference_sources_table(conn)
+
+
+def _data_versions(conn: Connection) -> None:
+    """Add the per-scope data version counters behind the ETags."""
+    create_data_versions_table(conn)
+
+
+def _results_feed_index(conn: Connection) -> None:
+    """Index reviewed results by (timestamp, id) for keyset-paginated /results."""
+    conn.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_results_reviewed_timestamp_id "
+            "ON results (is_reviewed, timestamp, id)"
+        )
+    )
+
+
+def _result_changes(conn: Connection) -> None:
+    """Add the change log behind the /results/changes feed."""
+    pk = primary_key_column(conn)
+    conn.execute(
+        text(
+            f"""
+    CREATE TABLE IF NOT EXISTS result_changes (
+        {pk},
+        seq INTEGER NOT NULL,
+        result_id INTEGER NOT NULL,
+        electorate VARCHAR,
+        deleted INTEGER NOT NULL DEFAULT 0,
+        changed_at VARCHAR NOT NULL
+    )
+    """
+        )
+    )
+    conn.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_result_changes_seq ON result_changes (seq)"
+        )
+    )
+
+
+def _jobs(conn: Connection) -> None:
+    """Add the durable background job queue."""
+    create_jobs_table(conn)
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "baseline_tables", _baseline_tables),
+    Migration(2, "hot_path_indexes", _hot_path_indexes),
+    Migration(3, "normalized_result_votes", _normalized_result_votes),
+    Migration(4, "reference_row_hashes", _reference_row_hashes),
+    Migration(5, "data_versions", _data_versions),
+    Migration(6, "results_feed_index", _results_feed_index),
+    Migration(7, "result_changes", _result_changes),
+    Migration(8, "jobs", _jobs),
+]
+
+
+def _lock(conn: Connection, timeout: float) -> None:
+    """
+    Start a transaction holding the migration lock.
+
+    SQLite takes the database write lock with ``BEGIN IMMEDIATE``; PostgreSQL
+    takes a transaction-scoped advisory lock so ordinary traffic carries on
+    while another replica migrates.
+    """
+    if conn.dialect.name == "postgresql":
+        conn.execute(text(f"SET LOCAL lock_timeout = '{int(timeout * 1000)}ms'"))
+        conn.execute(
+            text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY}
+        )
+        return
+
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+            return
+        except OperationalError as e:
+            conn.rollback()
+            if "locked" not in str(e) or time.monotonic() > deadline:
+                raise
+            logger.info("Waiting for another process to finish migrating")
+            time.sleep(0.5)
+
+
+def get_applied_versions(conn: Connection) -> set:
+    """Get the set of migration versions already applied to the database."""
+    conn.execute(
+        text(
+            """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        applied_at TEXT NOT NULL
+    )
+    """
+        )
+    )
+    return {
+        row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))
+    }
+
+
+def run_migrations(
+    migrations: Optional[List[Migration]] = None,
+    lock_timeout: float = MIGRATION_LOCK_TIMEOUT_SECONDS,
+) -> List[int]:
+    """
+    Apply every pending migration in version order.
+
+    Each migration and its bookkeeping row commit in one transaction taken
+    under the migration lock, and applied versions are re-read after the lock
+    is held, so a concurrent start simply finds the work already done.
+
+    Returns:
+        List of versions applied by this call
+    """
+    migrations = sorted(migrations or MIGRATIONS, key=lambda m: m.version)
+    applied_now = []
+
+    with get_connection() as conn:
+        for migration in migrations:
+            _lock(conn, lock_timeout)
+            try:
+                if migration.version in get_applied_versions(conn):
+                    conn.commit()
+                    continue
+
+                logger.info(f"Applying migration {migration.version}: {migration.name}")
+                started = time.perf_counter()
+                migration.apply(conn)
+                conn.execute(
+                    text(
+                        "INSERT INTO schema_migrations (version, name, applied_at) "
+                        "VALUES (:version, :name, :applied_at)"
+                    ),
+                    {
+                        "version": migration.version,
+                        "name": migration.name,
+                        "applied_at": datetime.now(timezone.utc).isoformat(),
+                    },
+                )
+                conn.commit()
+                applied_now.append(migration.version)
+                logger.info(
+                    f"Applied migration {migration.version} in {time.perf_counter() - started:.3f}s"
+                )
+            except Exception:
+                conn.rollback()
+                logger.error(f"Migration {migration.version} failed, rolled back")
+                raise
+
+    if applied_now:
+        logger.info(f"Applied migrations: {applied_now}")
+    else:
+        logger.info("Database schema is up to date")
+    return applied_now
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    run_migrations()
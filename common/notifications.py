@@ -0,0 +1,216 @@
+"""
+Notifications
+
+Delivers result notifications to the Flask app in the background, so API
+responses return as soon as the database commit lands. Notifications wait in
+a bounded in-memory queue, coalesced per electorate: the Flask app only uses
+the electorate to tell dashboards to refresh, so a burst of writes to one
+division becomes a single POST carrying the latest payload. Delivery uses the
+app's pooled HTTP client and retries failures with backoff.
+
+Notifications are best effort; pending ones are lost if the process dies.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Electorates with a notification waiting; the oldest is dropped past this
+NOTIFY_QUEUE_MAX = int(os.environ.get("NOTIFY_QUEUE_MAX", "1000"))
+NOTIFY_WORKERS = int(os.environ.get("NOTIFY_WORKERS", "2"))
+NOTIFY_RETRIES = int(os.environ.get("NOTIFY_RETRIES", "5"))
+NOTIFY_RETRY_BASE_SECONDS = float(os.environ.get("NOTIFY_RETRY_BASE_SECONDS", "0.5"))
+NOTIFY_RETRY_MAX_SECONDS = float(os.environ.get("NOTIFY_RETRY_MAX_SECONDS", "30"))
+# How long shutdown waits for pending notifications to go out
+NOTIFY_SHUTDOWN_SECONDS = float(os.environ.get("NOTIFY_SHUTDOWN_SECONDS", "5"))
+
+# Delivery latencies kept for the percentiles in the stats
+LATENCY_SAMPLES = 1000
+
+
+class NotificationDispatcher:
+    """Coalescing, retrying background delivery of notifications."""
+
+    def __init__(
+        self,
+        url: str,
+        client: Callable[[], httpx.AsyncClient],
+        workers: int = NOTIFY_WORKERS,
+        max_pending: int = NOTIFY_QUEUE_MAX,
+        retries: int = NOTIFY_RETRIES,
+        retry_base: float = NOTIFY_RETRY_BASE_SECONDS,
+        retry_max: float = NOTIFY_RETRY_MAX_SECONDS,
+    ):
+        """
+        Args:
+            url: Where to POST notifications
+            client: Returns the HTTP client to send with
+            workers: Concurrent deliveries, 0 to leave them for ``drain``
+            max_pending: Electorates that can have a notification waiting
+            retries: Attempts after the first before a notification is dropped
+            retry_base: Backoff ceiling for the first retry, doubling after
+            retry_max: Largest backoff ceiling
+        """
+        self.url = url
+        self.client = client
+        self.workers = workers
+        self.max_pending = max_pending
+        self.retries = retries
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        # {electorate: (latest payload, when the first unsent one was queued)}
+        self._pending: "OrderedDict[Optional[str], Tuple[Dict[str, Any], float]]" = (
+            OrderedDict()
+        )
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._latencies: Deque[float] = deque(maxlen=LATENCY_SAMPLES)
+        self.in_flight = 0
+        self.queued = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.delivered = 0
+        self.retried = 0
+        self.failed = 0
+
+    def notify(self, payload: Dict[str, Any]) -> None:
+        """
+        Queue a notification without waiting for it to be sent.
+
+        A notification still waiting for the same electorate is replaced by
+        this one.
+        """
+        key = payload.get("electorate")
+        self.queued += 1
+        if key in self._pending:
+            _, queued_at = self._pending[key]
+            self._pending[key] = (payload, queued_at)
+            self.coalesced += 1
+        else:
+            if len(self._pending) >= self.max_pending:
+                dropped, _ = self._pending.popitem(last=False)
+                self.dropped += 1
+                logger.warning(f"Notification queue full; dropped one for {dropped}")
+            self._pending[key] = (payload, time.monotonic())
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def start(self) -> None:
+        """Start the delivery workers on the running event loop."""
+        self._wakeup = asyncio.Event()
+        if self._pending:
+            self._wakeup.set()
+        self._tasks = [
+            asyncio.create_task(self._work(), name=f"notifier-{n}")
+            for n in range(self.workers)
+        ]
+
+    async def stop(self, timeout: float = NOTIFY_SHUTDOWN_SECONDS) -> None:
+        """Give pending notifications ``timeout`` seconds to go out, then stop."""
+        deadline = time.monotonic() + timeout
+        while (
+            self._tasks
+            and (self._pending or self.in_flight)
+            and time.monotonic() < deadline
+        ):
+            await asyncio.sleep(0.05)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._wakeup = None
+
+    async def send_once(self) -> bool:
+        """
+        Deliver the oldest pending notification, retrying as needed.
+
+        Returns:
+            Whether there was one to deliver
+        """
+        if not self._pending:
+            return False
+        key, (payload, queued_at) = self._pending.popitem(last=False)
+        self.in_flight += 1
+        try:
+            await self._deliver(payload, queued_at)
+        finally:
+            self.in_flight -= 1
+        return True
+
+    async def drain(self) -> int:
+        """Deliver notifications until none is pending. Returns the number sent."""
+        count = 0
+        while await self.send_once():
+            count += 1
+        return count
+
+    async def _deliver(self, payload: Dict[str, Any], queued_at: float) -> None:
+        for attempt in range(self.retries + 1):
+            try:
+                response = await self.client().post(self.url, json=payload)
+                response.raise_for_status()
+            except Exception as e:
+                retryable = not isinstance(e, httpx.HTTPStatusError) or (
+                    e.response.status_code == 429 or e.response.status_code >= 500
+                )
+                if attempt == self.retries or not retryable:
+                    self.failed += 1
+                    logger.error(
+                        f"Failed to notify Flask app about "
+                        f"{payload.get('electorate')}: {e!r}"
+                    )
+                    return
+                self.retried += 1
+                ceiling = min(self.retry_max, self.retry_base * 2**attempt)
+                await asyncio.sleep(random.uniform(0, ceiling))
+            else:
+                self.delivered += 1
+                self._latencies.append(time.monotonic() - queued_at)
+                return
+
+    async def _work(self) -> None:
+        while True:
+            try:
+                if await self.send_once():
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Notification worker error: {e}")
+            await self._wakeup.wait()
+            self._wakeup.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get queue depth, delivery counters and latency percentiles (ms)."""
+        latencies = sorted(self._latencies)
+
+        def percentile(share: float) -> Optional[float]:
+            if not latencies:
+                return None
+            index = min(len(latencies) - 1, int(share * len(latencies)))
+            return round(latencies[index] * 1000, 1)
+
+        return {
+            "pending": len(self._pending),
+            "in_flight": self.in_flight,
+            "max_pending": self.max_pending,
+            "queued": self.queued,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "delivered": self.delivered,
+            "retried": self.retried,
+            "failed": self.failed,
+            "latency_ms": {
+                "p50": percentile(0.5),
+                "p95": percentile(0.95),
+                "max": percentile(1.0),
+            },
+        }
@@ -0,0 +1,128 @@
+"""
+OCR Cache
+
+Content-addressed cache of Textract results on disk. Entries are keyed by the
+SHA-256 of the submitted image bytes and hold only what scanning uses: the
+cells of the results table and the booth name query answer. Once a scan is
+saved, its entry also records the result id, so the same photo submitted again
+(uploaded twice, or texted and uploaded) links to the existing result instead
+of being scanned again.
+
+Entries are JSON files, evicted least recently used first once the directory
+grows past its size limit.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+OCR_CACHE_MAX_BYTES = int(os.environ.get("OCR_CACHE_MAX_BYTES", str(64 * 2**20)))
+
+
+def image_key(image_data: bytes) -> str:
+    """Get the cache key for an image: the SHA-256 of its bytes."""
+    return hashlib.sha256(image_data).hexdigest()
+
+
+class OCRCache:
+    """Thread-safe, size-bounded cache of parsed Textract results."""
+
+    def __init__(
+        self, directory: Union[str, Path], max_bytes: int = OCR_CACHE_MAX_BYTES
+    ):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # Entry sizes, least recently used first; read from disk on first use
+        self._sizes: Optional["OrderedDict[str, int]"] = None
+        self._total = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def _index(self) -> "OrderedDict[str, int]":
+        """Load the entry sizes from disk, oldest first, if not yet loaded."""
+        if self._sizes is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            entries = []
+            for path in self.directory.glob("*.json"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, path.stem, stat.st_size))
+            self._sizes = OrderedDict((key, size) for _, key, size in sorted(entries))
+            self._total = sum(self._sizes.values())
+        return self._sizes
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get an entry, counting the hit or miss."""
+        with self._lock:
+            sizes = self._index()
+            entry = None
+            if key in sizes:
+                try:
+                    entry = json.loads(self._path(key).read_text())
+                    sizes.move_to_end(key)
+                    os.utime(self._path(key))
+                except (OSError, ValueError):
+                    self._forget(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return entry
+
+    def put(self, key: str, entry: Dict[str, Any]) -> None:
+        """Store an entry, evicting the least recently used past the limit."""
+        body = json.dumps(entry, separators=(",", ":")).encode()
+        with self._lock:
+            sizes = self._index()
+            # Write then rename so readers never see a partial file
+            path = self._path(key)
+            partial = path.with_suffix(f".{threading.get_ident()}.tmp")
+            partial.write_bytes(body)
+            os.replace(partial, path)
+            self._total += len(body) - sizes.pop(key, 0)
+            sizes[key] = len(body)
+            while self._total > self.max_bytes and len(sizes) > 1:
+                oldest = next(iter(sizes))
+                self._forget(oldest)
+                self.evictions += 1
+
+    def link(self, key: str, result_id: int) -> None:
+        """Record the result saved from an image's scan in its entry."""
+        with self._lock:
+            try:
+                entry = json.loads(self._path(key).read_text())
+            except (OSError, ValueError):
+                return
+        if entry.get("result_id") != result_id:
+            self.put(key, {**entry, "result_id": result_id})
+
+    def _forget(self, key: str) -> None:
+        self._total -= self._sizes.pop(key, 0)
+        try:
+            self._path(key).unlink()
+        except FileNotFoundError:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        """Get entry, size and hit/miss counters."""
+        with self._lock:
+            sizes = self._index()
+            return {
+                "entries": len(sizes),
+                "bytes": self._total,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,543 @@
+"""
+OCR Engines
+
+Interchangeable engines that read a tally sheet image into table cells and a
+booth name:
+
+- ``textract``: Amazon Textract's table and query features
+- ``tesseract``: local Tesseract OCR, with the table found from the ruled
+  lines of the grid and each word placed in the cell it falls in
+- ``recorded``: responses recorded as JSON files, for running the pipeline
+  offline in tests and load tests
+
+``OCRRouter`` tries the configured engines in order, moving on to the next
+when one fails, times out or finds no table. Each engine has a circuit
+breaker, so an engine that keeps failing (Textract being throttled, say) is
+skipped for a while instead of being waited on for every image.
+"""
+
+import asyncio
+import io
+import json
+import logging
+import os
+import re
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+import pytesseract
+from PIL import Image
+
+from common.circuit_breaker import OPEN, CircuitBreaker
+from common.textract_executor import is_throttling_error
+
+logger = logging.getLogger(__name__)
+
+# Engines to try, in order
+OCR_ENGINES = os.environ.get("OCR_ENGINES", "textract,tesseract")
+OCR_ENGINE_TIMEOUT_SECONDS = float(os.environ.get("OCR_ENGINE_TIMEOUT_SECONDS", "60"))
+# Consecutive failures that open an engine's circuit, and for how long
+OCR_BREAKER_FAILURES = int(os.environ.get("OCR_BREAKER_FAILURES", "3"))
+OCR_BREAKER_RESET_SECONDS = float(os.environ.get("OCR_BREAKER_RESET_SECONDS", "60"))
+TESSERACT_WORKERS = int(os.environ.get("TESSERACT_WORKERS", "2"))
+# Sparse text: find words anywhere on the sheet, the grid gives the layout
+TESSERACT_CONFIG = os.environ.get("TESSERACT_CONFIG", "--psm 11")
+
+BOOTH_NAME_LABEL = re.compile(r"BOOTH\s*NAME\s*[:\-]?\s*(.*)", re.IGNORECASE)
+
+
+class NoTableFound(Exception):
+    """The engine read the image but found no table in it."""
+
+
+class OCRUnavailable(Exception):
+    """No engine could read the image."""
+
+    def __init__(self, message: str, transient: bool = False):
+        """
+        Args:
+            message: What each engine reported
+            transient: Whether an engine was throttled, timed out, lost its
+                connection or was skipped by an open circuit, so that trying
+                again later may succeed
+        """
+        super().__init__(message)
+        self.transient = transient
+
+
+# botocore errors that mean the service was not reached, not that it refused
+CONNECTION_ERRORS = {
+    "EndpointConnectionError",
+    "ConnectTimeoutError",
+    "ReadTimeoutError",
+    "ConnectionClosedError",
+}
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """Check whether an engine error may go away if the call is retried later."""
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    if is_throttling_error(error):
+        return True
+    return any(cls.__name__ in CONNECTION_ERRORS for cls in type(error).__mro__)
+
+
+class OCREngine(ABC):
+    """Reads a tally sheet image into table cells and a booth name."""
+
+    name = "engine"
+
+    @abstractmethod
+    async def recognize(self, image_data: bytes, image_sha256: str) -> Dict[str, Any]:
+        """
+        Read an image.
+
+        Args:
+            image_data: The preprocessed image
+            image_sha256: SHA-256 of the image as submitted
+
+        Returns:
+            Dictionary with extracted_rows (cells with RowIndex, ColumnIndex
+            and Text) and booth_name
+
+        Raises:
+            NoTableFound: If the image has no table
+        """
+
+
+class TextractEngine(OCREngine):
+    """Amazon Textract, called through a ``TextractExecutor``."""
+
+    name = "textract"
+
+    def __init__(self, executor: Any):
+        self.executor = executor
+
+    async def recognize(self, image_data: bytes, image_sha256: str) -> Dict[str, Any]:
+        logger.info("Sending image to Amazon Textract...")
+        response = await self.executor.analyze_document(
+            Document={"Bytes": image_data},
+            FeatureTypes=["TABLES", "QUERIES"],
+            QueriesConfig={
+                "Queries": [{"Text": "What is the BOOTH NAME?", "Alias": "BoothName"}]
+            },
+        )
+        logger.info("Received response from Textract.")
+
+        blocks_map = {block["Id"]: block for block in response["Blocks"]}
+        tables = []
+        booth_name = None
+
+        for block in response["Blocks"]:
+            if block["BlockType"] == "TABLE":
+                tables.append(block)
+            if block["BlockType"] == "QUERY_RESULT":
+                booth_name = block.get("Text", "").strip()
+
+        logger.info(f"Found {len(tables)} tables.")
+        logger.info(f"Extracted booth name: {booth_name}")
+
+        # Pick the second table if available
+        if len(tables) >= 2:
+            target_table = tables[1]
+        elif len(tables) == 1:
+            target_table = tables[0]
+        else:
+            raise NoTableFound("No tables found in document.")
+
+        return {
+            "extracted_rows": self._extract_table(target_table, blocks_map),
+            "booth_name": booth_name,
+        }
+
+    def _extract_table(self, table_block: Dict, blocks_map: Dict) -> List[Dict]:
+        """
+        Extract data from a table block.
+
+        Args:
+            table_block: The table block from Textract
+            blocks_map: Map of all blocks from Textract
+
+        Returns:
+            List of extracted cells with row and column indices
+        """
+        table_data = []
+        for relationship in table_block.get("Relationships", []):
+            if relationship["Type"] == "CHILD":
+                for child_id in relationship["Ids"]:
+                    child = blocks_map[child_id]
+                    if child["BlockType"] == "CELL":
+                        text = ""
+                        for rel in child.get("Relationships", []):
+                            for grandchild_id in rel["Ids"]:
+                                word = blocks_map[grandchild_id]
+                                if word["BlockType"] == "WORD":
+                                    text += word["Text"] + " "
+                        table_data.append(
+                            {
+                                "RowIndex": child["RowIndex"],
+                                "ColumnIndex": child["ColumnIndex"],
+                                "Text": text.strip(),
+                            }
+                        )
+        return table_data
+
+
+def find_grid_lines(dark: np.ndarray, axis: int) -> List[float]:
+    """
+    Find the ruled lines of a table in a thresholded image.
+
+    Args:
+        dark: Boolean image, True where the pixel is ink
+        axis: 1 for horizontal lines (rows of pixels), 0 for vertical ones
+
+    Returns:
+        Positions of the line centres, top to bottom or left to right
+    """
+    counts = dark.sum(axis=axis)
+    if not counts.size or not counts.max():
+        return []
+    # Ruled lines are far longer than any run of ink across text
+    is_line = (counts >= counts.max() * 0.6) & (counts >= dark.shape[axis] * 0.25)
+    positions = np.flatnonzero(is_line)
+    if not positions.size:
+        return []
+    runs = np.split(positions, np.flatnonzero(np.diff(positions) > 1) + 1)
+    return [float(run.mean()) for run in runs]
+
+
+def group_lines(words: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """Group words into lines of text by their vertical position."""
+    lines: List[List[Dict[str, Any]]] = []
+    for word in sorted(words, key=lambda w: w["top"] + w["height"] / 2):
+        middle = word["top"] + word["height"] / 2
+        if lines:
+            last = lines[-1][-1]
+            if abs(middle - (last["top"] + last["height"] / 2)) <= last["height"] / 2:
+                lines[-1].append(word)
+                continue
+        lines.append([word])
+    return [sorted(line, key=lambda w: w["left"]) for line in lines]
+
+
+def find_booth_name(lines: List[List[Dict[str, Any]]]) -> Optional[str]:
+    """Read the booth name from the line labelled BOOTH NAME, or the one after."""
+    texts = [" ".join(word["text"] for word in line) for line in lines]
+    for n, text in enumerate(texts):
+        match = BOOTH_NAME_LABEL.search(text)
+        if match:
+            if match.group(1).strip():
+                return match.group(1).strip()
+            if n + 1 < len(texts):
+                return texts[n + 1].strip()
+    return None
+
+
+def words_to_cells(
+    words: List[Dict[str, Any]], rows: List[float], columns: List[float]
+) -> List[Dict[str, Any]]:
+    """
+    Place words in the cells of a ruled grid.
+
+    Args:
+        words: Words with text, left, top, width and height
+        rows: Horizontal line positions
+        columns: Vertical line positions
+
+    Returns:
+        Every cell of the grid with RowIndex, ColumnIndex (from 1) and the
+        text of the words whose centres fall in it
+    """
+    cells: Dict[tuple, List[Dict[str, Any]]] = {
+        (row, column): []
+        for row in range(1, len(rows))
+        for column in range(1, len(columns))
+    }
+    for word in words:
+        row = int(np.searchsorted(rows, word["top"] + word["height"] / 2))
+        column = int(np.searchsorted(columns, word["left"] + word["width"] / 2))
+        if (row, column) in cells:
+            cells[(row, column)].append(word)
+    return [
+        {
+            "RowIndex": row,
+            "ColumnIndex": column,
+            "Text": " ".join(
+                " ".join(word["text"] for word in line) for line in group_lines(found)
+            ),
+        }
+        for (row, column), found in cells.items()
+    ]
+
+
+def lines_to_cells(lines: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Split lines of text into cells at wide gaps, for tables without rules."""
+    cells = []
+    for row, line in enumerate(lines, start=1):
+        gap = 1.5 * float(np.median([word["height"] for word in line]))
+        column, text, right = 1, [], None
+        for word in line:
+            if right is not None and word["left"] - right > gap:
+                cells.append(
+                    {"RowIndex": row, "ColumnIndex": column, "Text": " ".join(text)}
+                )
+                column, text = column + 1, []
+            text.append(word["text"])
+            right = word["left"] + word["width"]
+        cells.append({"RowIndex": row, "ColumnIndex": column, "Text": " ".join(text)})
+    return cells
+
+
+class TesseractEngine(OCREngine):
+    """Local Tesseract OCR with table-grid detection."""
+
+    name = "tesseract"
+
+    def __init__(
+        self,
+        workers: int = TESSERACT_WORKERS,
+        config: str = TESSERACT_CONFIG,
+        image_to_data: Optional[Callable[..., Dict[str, List[Any]]]] = None,
+    ):
+        """
+        Args:
+            workers: Tesseract processes run at once
+            config: Tesseract command-line options
+            image_to_data: Word finder with pytesseract's ``image_to_data``
+                signature, to swap Tesseract out in tests
+        """
+        self.config = config
+        self.image_to_data = image_to_data or pytesseract.image_to_data
+        self._pool = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="tesseract"
+        )
+
+    def read(self, image_data: bytes) -> Dict[str, Any]:
+        """Read an image on the calling thread."""
+        image = Image.open(io.BytesIO(image_data)).convert("L")
+        data = self.image_to_data(
+            image, config=self.config, output_type=pytesseract.Output.DICT
+        )
+        words = [
+            {
+                "text": str(text).strip(),
+                "left": int(left),
+                "top": int(top),
+                "width": int(width),
+                "height": int(height),
+            }
+            for text, left, top, width, height, conf in zip(
+                data["text"],
+                data["left"],
+                data["top"],
+                data["width"],
+                data["height"],
+                data["conf"],
+            )
+            if str(text).strip() and float(conf) >= 0
+        ]
+
+        dark = np.asarray(image) < 128
+        rows = find_grid_lines(dark, axis=1)
+        columns = []
+        if len(rows) >= 2:
+            table = dark[int(rows[0]) : int(rows[-1]) + 1]
+            columns = find_grid_lines(table, axis=0)
+
+        if len(rows) >= 2 and len(columns) >= 2:
+            inside, outside = [], []
+            for word in words:
+                in_table = (
+                    rows[0] <= word["top"] + word["height"] / 2 <= rows[-1]
+                    and columns[0] <= word["left"] + word["width"] / 2 <= columns[-1]
+                )
+                (inside if in_table else outside).append(word)
+            cells = words_to_cells(inside, rows, columns)
+            booth_name = find_booth_name(group_lines(outside))
+        elif words:
+            lines = group_lines(words)
+            cells = lines_to_cells(lines)
+            booth_name = find_booth_name(lines)
+        else:
+            raise NoTableFound("Tesseract found no text in the image.")
+
+        logger.info(
+            f"Tesseract read {len(words)} words into {len(cells)} cells "
+            f"({len(rows)} x {len(columns)} grid lines)"
+        )
+        return {"extracted_rows": cells, "booth_name": booth_name}
+
+    async def recognize(self, image_data: bytes, image_sha256: str) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, self.read, image_data)
+
+
+class RecordedEngine(OCREngine):
+    """
+    Replays recorded responses: ``<sha256>.json`` for a known image, else
+    ``default.json``. The files have the OCR cache's format, so a copy of the
+    cache directory from a real run can be replayed.
+    """
+
+    name = "recorded"
+
+    def __init__(self, directory: Union[str, Path]):
+        self.directory = Path(directory)
+
+    async def recognize(self, image_data: bytes, image_sha256: str) -> Dict[str, Any]:
+        for name in (image_sha256, "default"):
+            path = self.directory / f"{name}.json"
+            if path.exists():
+                recorded = json.loads(path.read_text())
+                return {
+                    "extracted_rows": recorded["extracted_rows"],
+                    "booth_name": recorded.get("booth_name"),
+                }
+        raise LookupError(f"No recorded OCR response for image {image_sha256[:12]}")
+
+
+class OCRRouter:
+    """Tries OCR engines in order, skipping those whose circuit is open."""
+
+    def __init__(
+        self,
+        engines: Sequence[OCREngine],
+        timeout: Optional[float] = OCR_ENGINE_TIMEOUT_SECONDS,
+        breaker_factory: Callable[[], CircuitBreaker] = lambda: CircuitBreaker(
+            OCR_BREAKER_FAILURES, OCR_BREAKER_RESET_SECONDS
+        ),
+    ):
+        """
+        Args:
+            engines: Engines in the order to try them
+            timeout: Seconds to wait for an engine before moving on
+            breaker_factory: Makes each engine's circuit breaker
+        """
+        self.engines = list(engines)
+        self.timeout = timeout
+        self.breakers = {engine.name: breaker_factory() for engine in self.engines}
+        self._lock = threading.Lock()
+        self._counts = {
+            engine.name: {"calls": 0, "failures": 0, "no_table": 0, "skipped": 0}
+            for engine in self.engines
+        }
+
+    @property
+    def primary(self) -> Optional[str]:
+        """Get the name of the engine tried first."""
+        return self.engines[0].name if self.engines else None
+
+    def available(self, name: str) -> bool:
+        """Check whether an engine's circuit would let a call through."""
+        return self.breakers[name].state != OPEN
+
+    def _count(self, engine: OCREngine, name: str) -> None:
+        with self._lock:
+            self._counts[engine.name][name] += 1
+
+    async def recognize(self, image_data: bytes, image_sha256: str) -> Dict[str, Any]:
+        """
+        Read an image with the first engine that can.
+
+        Returns:
+            The engine's result, with the engine's name under "engine"
+
+        Raises:
+            NoTableFound: If the engines that ran found no table
+            OCRUnavailable: If every engine failed or was skipped
+        """
+        errors = []
+        # Whether an engine failed or was skipped, rather than finding no table
+        unavailable = False
+        # Whether a failure or skip may clear up if the image is tried again
+        transient = False
+        for engine in self.engines:
+            breaker = self.breakers[engine.name]
+            if not breaker.allow():
+                self._count(engine, "skipped")
+                unavailable = True
+                transient = True
+                errors.append(f"{engine.name}: circuit open")
+                continue
+            self._count(engine, "calls")
+            try:
+                # A timeout cancels the engine's coroutine, but not a thread it
+                # is blocked on: see TextractExecutor for how those are bounded
+                result = await asyncio.wait_for(
+                    engine.recognize(image_data, image_sha256), self.timeout
+                )
+            except NoTableFound as e:
+                # The engine works; the image just has no table it can see
+                breaker.record_success()
+                self._count(engine, "no_table")
+                errors.append(f"{engine.name}: {e}")
+                continue
+            except Exception as e:
+                breaker.record_failure()
+                self._count(engine, "failures")
+                unavailable = True
+                transient = transient or is_transient_error(e)
+                logger.warning(f"OCR engine {engine.name} failed: {e!r}")
+                errors.append(f"{engine.name}: {e!r}")
+                continue
+            except BaseException:
+                # Cancelled: no verdict on the engine, but free a half-open trial
+                breaker.release()
+                raise
+            breaker.record_success()
+            return {**result, "engine": engine.name}
+        if errors and not unavailable:
+            raise NoTableFound("; ".join(errors))
+        raise OCRUnavailable(
+            "; ".join(errors) or "No OCR engines configured", transient=transient
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """Get per-engine call counters and circuit state, in routing order."""
+        with self._lock:
+            counts = {name: dict(count) for name, count in self._counts.items()}
+        return {
+            "engines": [
+                {
+                    "name": engine.name,
+                    **counts[engine.name],
+                    **self.breakers[engine.name].stats(),
+                }
+                for engine in self.engines
+            ]
+        }
+
+
+def create_ocr_engines(
+    names: Sequence[str],
+    textract_executor: Any = None,
+    recordings_dir: Optional[Union[str, Path]] = None,
+) -> List[OCREngine]:
+    """
+    Create engines by name, as listed in ``OCR_ENGINES``.
+
+    Args:
+        names: Engine names: textract, tesseract or recorded
+        textract_executor: Executor for Textract calls, needed for textract
+        recordings_dir: Directory of recorded responses, needed for recorded
+
+    Returns:
+        The engines in the same order
+    """
+    engines: List[OCREngine] = []
+    for name in names:
+        name = name.strip().lower()
+        if name == "textract":
+            engines.append(TextractEngine(textract_executor))
+        elif name == "tesseract":
+            engines.append(TesseractEngine())
+        elif name == "recorded":
+            engines.append(RecordedEngine(recordings_dir))
+        elif name:
+            raise ValueError(f"Unknown OCR engine: {name}")
+    return engines
@@ -0,0 +1,141 @@
+"""
+Response Cache
+
+Bounded LRU cache of pre-serialized response bodies for the reference-data
+endpoints. Entries are keyed on the endpoint path plus its query parameters,
+tagged with the data version scopes they were built from, and expire after a
+TTL. Writers invalidate the scopes they change, and each lookup passes the
+ETag of the current data versions, so an entry built before a change made by
+another process is never served.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+RESPONSE_CACHE_TTL_SECONDS = float(os.environ.get("RESPONSE_CACHE_TTL_SECONDS", "300"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", "512"))
+# How long browsers and proxies may reuse a response before revalidating
+RESPONSE_CACHE_MAX_AGE_SECONDS = int(
+    os.environ.get("RESPONSE_CACHE_MAX_AGE_SECONDS", "60")
+)
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    etag: str
+    scopes: Tuple[str, ...]
+    expires_at: float
+
+
+class ResponseCache:
+    """Thread-safe LRU of serialized responses with TTL and scope invalidation."""
+
+    def __init__(
+        self,
+        max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+        ttl: float = RESPONSE_CACHE_TTL_SECONDS,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        # Bumped on every invalidation so a build racing a write isn't stored
+        self._generation = 0
+
+    def generation(self) -> int:
+        """Get the invalidation counter, taken before building a response."""
+        return self._generation
+
+    def get(self, key: str, etag: Optional[str] = None) -> Optional[CachedResponse]:
+        """
+        Get a live entry, counting the hit or miss.
+
+        If ``etag`` is given, an entry built from other data versions is
+        dropped and counted as a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (
+                entry.expires_at <= time.monotonic()
+                or (etag is not None and entry.etag != etag)
+            ):
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(
+        self,
+        key: str,
+        body: bytes,
+        etag: str,
+        scopes: Iterable[str],
+        generation: Optional[int] = None,
+    ) -> CachedResponse:
+        """
+        Store a serialized response, evicting the least recently used.
+
+        The response is only stored if nothing has been invalidated since
+        ``generation`` was taken; it is returned either way.
+        """
+        entry = CachedResponse(
+            body=body,
+            etag=etag,
+            scopes=tuple(scopes),
+            expires_at=time.monotonic() + self.ttl,
+        )
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return entry
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return entry
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return entry
+
+    def invalidate(self, *scopes: str) -> None:
+        """Drop every entry built from any of the given scopes (all if none given)."""
+        with self._lock:
+            self._generation += 1
+            if not scopes:
+                stale = list(self._entries)
+            else:
+                stale = [
+                    key
+                    for key, entry in self._entries.items()
+                    if set(entry.scopes) & set(scopes)
+                ]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,229 @@
+"""
+Result Votes
+
+Normalized storage for the vote counts held in the ``results.data`` JSON blob.
+Primary votes and two-candidate-preferred (TCP) distributions are stored one
+row per candidate so division totals can be computed with indexed SQL
+``GROUP BY`` queries instead of decoding every blob in Python.
+"""
+
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+from common.db_utils import primary_key_column
+
+logger = logging.getLogger(__name__)
+
+PrimaryVoteRow = Tuple[str, int]
+TCPVoteRow = Tuple[str, str, int]
+
+# Totals are kept as plain columns on the results table
+TOTALS_COLUMNS = {
+    "formal": "formal_votes",
+    "informal": "informal_votes",
+    "total": "total_votes",
+}
+
+
+def vote_count(value: Any) -> int:
+    """Coerce a vote count from OCR or form input to an integer (0 if invalid)."""
+    if isinstance(value, bool):
+        return int(value)
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        try:
+            return int(float(value))
+        except (TypeError, ValueError):
+            return 0
+
+
+def normalize_votes(
+    data: Optional[Dict[str, Any]],
+) -> Tuple[List[PrimaryVoteRow], List[TCPVoteRow]]:
+    """
+    Flatten a result's vote dictionaries into rows.
+
+    Args:
+        data: Parsed result data with ``primary_votes`` ({candidate: votes}) and
+            ``two_candidate_preferred`` ({tcp_candidate: {candidate: votes}})
+
+    Returns:
+        Tuple of (primary rows as (candidate, votes),
+        TCP rows as (tcp_candidate, candidate, votes))
+    """
+    primary_rows: List[PrimaryVoteRow] = []
+    tcp_rows: List[TCPVoteRow] = []
+    if not data:
+        return primary_rows, tcp_rows
+
+    primary_votes = data.get("primary_votes") or {}
+    if isinstance(primary_votes, dict):
+        for candidate, votes in primary_votes.items():
+            primary_rows.append((str(candidate), vote_count(votes)))
+
+    tcp_votes = data.get("two_candidate_preferred") or {}
+    if isinstance(tcp_votes, dict):
+        for tcp_candidate, distribution in tcp_votes.items():
+            if not isinstance(distribution, dict):
+                continue
+            for candidate, votes in distribution.items():
+                tcp_rows.append((str(tcp_candidate), str(candidate), vote_count(votes)))
+
+    return primary_rows, tcp_rows
+
+
+def normalize_totals(data: Optional[Dict[str, Any]]) -> Dict[str, Optional[int]]:
+    """Map a result's ``totals`` dictionary onto the results totals columns."""
+    totals = (data or {}).get("totals") or {}
+    if not isinstance(totals, dict):
+        totals = {}
+    return {
+        column: (vote_count(totals[key]) if totals.get(key) is not None else None)
+        for key, column in TOTALS_COLUMNS.items()
+    }
+
+
+def create_result_vote_tables(conn: Connection) -> None:
+    """Create the normalized vote tables and their indexes if they don't exist."""
+    pk = primary_key_column(conn)
+    conn.execute(
+        text(
+            f"""
+    CREATE TABLE IF NOT EXISTS result_primary_votes (
+        {pk},
+        result_id INTEGER NOT NULL,
+        candidate TEXT NOT NULL,
+        votes INTEGER NOT NULL DEFAULT 0
+    )
+    """
+        )
+    )
+    conn.execute(
+        text(
+            f"""
+    CREATE TABLE IF NOT EXISTS result_tcp_votes (
+        {pk},
+        result_id INTEGER NOT NULL,
+        tcp_candidate TEXT NOT NULL,
+        candidate TEXT NOT NULL,
+        votes INTEGER NOT NULL DEFAULT 0
+    )
+    """
+        )
+    )
+    # Covering indexes: the division aggregates only ever read these columns
+    conn.execute(
+        text(
+            """
+    CREATE INDEX IF NOT EXISTS ix_result_primary_votes_result
+    ON result_primary_votes (result_id, candidate, votes)
+    """
+        )
+    )
+    conn.execute(
+        text(
+            """
+    CREATE INDEX IF NOT EXISTS ix_result_tcp_votes_result
+    ON result_tcp_votes (result_id, tcp_candidate, candidate, votes)
+    """
+        )
+    )
+
+
+def backfill_result_votes(conn: Connection, batch_size: int = 500) -> int:
+    """
+    Populate the normalized vote tables from existing ``results.data`` blobs.
+
+    Adds the totals columns to an older results table, then backfills every
+    result that has no vote rows yet. The caller owns the transaction.
+
+    Returns:
+        Number of results backfilled
+    """
+    create_result_vote_tables(conn)
+    inspector = inspect(conn)
+    if not inspector.has_table("results"):
+        logger.info("No results table yet, nothing to backfill")
+        return 0
+    columns = {column["name"] for column in inspector.get_columns("results")}
+    for column in TOTALS_COLUMNS.values():
+        if column not in columns:
+            logger.info(f"Adding missing '{column}' column to results")
+            conn.execute(text(f"ALTER TABLE results ADD COLUMN {column} INTEGER"))
+
+    backfilled = 0
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            text(
+                """
+        SELECT r.id, r.data FROM results r
+        WHERE r.id > :last_id
+          AND r.data IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM result_primary_votes p WHERE p.result_id = r.id)
+          AND NOT EXISTS (SELECT 1 FROM result_tcp_votes t WHERE t.result_id = r.id)
+        ORDER BY r.id
+        LIMIT :batch_size
+        """
+            ),
+            {"last_id": last_id, "batch_size": batch_size},
+        ).fetchall()
+        if not rows:
+            break
+
+        primary_params = []
+        tcp_params = []
+        totals_params = []
+        for result_id, raw in rows:
+            last_id = result_id
+            try:
+                data = json.loads(raw) if raw else {}
+            except json.JSONDecodeError as e:
+                logger.error(f"Error decoding JSON for result {result_id}: {e}")
+                continue
+            primary_rows, tcp_rows = normalize_votes(data)
+            primary_params.extend(
+                {"result_id": result_id, "candidate": c, "votes": v}
+                for c, v in primary_rows
+            )
+            tcp_params.extend(
+                {"result_id": result_id, "tcp_candidate": t, "candidate": c, "votes": v}
+                for t, c, v in tcp_rows
+            )
+            totals_params.append({"id": result_id, **normalize_totals(data)})
+            backfilled += 1
+
+        # Executing with a list of parameter sets runs as one executemany
+        if primary_params:
+            conn.execute(
+                text(
+                    "INSERT INTO result_primary_votes (result_id, candidate, votes) "
+                    "VALUES (:result_id, :candidate, :votes)"
+                ),
+                primary_params,
+            )
+        if tcp_params:
+            conn.execute(
+                text(
+                    "INSERT INTO result_tcp_votes (result_id, tcp_candidate, candidate, votes) "
+                    "VALUES (:result_id, :tcp_candidate, :candidate, :votes)"
+                ),
+                tcp_params,
+            )
+        if totals_params:
+            conn.execute(
+                text(
+                    "UPDATE results SET formal_votes = :formal_votes, "
+                    "informal_votes = :informal_votes, total_votes = :total_votes "
+                    "WHERE id = :id"
+                ),
+                totals_params,
+            )
+
+    logger.info(f"Backfilled normalized votes for {backfilled} results")
+    return backfilled
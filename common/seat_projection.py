@@ -0,0 +1,146 @@
+"""
+Seat Projection
+
+Projects each division's final two-candidate-preferred (TCP) result from the
+booths counted so far. Every 2022 booth is weighted by its 2022 total votes:
+counted booths contribute their current TCP share, and uncounted booths their
+2022 share moved by the division's weighted average booth swing. All
+divisions are projected together in one vectorized pass over the booths.
+"""
+
+import threading
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class ProjectionBaseline:
+    """The 2022 booth results as arrays, indexed by division and booth name."""
+
+    def __init__(
+        self,
+        booths: Iterable[Tuple[str, str, Optional[float], Optional[int]]],
+    ):
+        """
+        Args:
+            booths: (division, polling place name, Liberal/National %, total
+                votes) for each 2022 booth
+        """
+        rows = [
+            (division, name, liberal, votes)
+            for division, name, liberal, votes in booths
+            if division and name and liberal is not None
+        ]
+        self.divisions = sorted({division for division, _, _, _ in rows})
+        self.division_numbers = {d: n for n, d in enumerate(self.divisions)}
+        self.division_index = np.array(
+            [self.division_numbers[division] for division, _, _, _ in rows],
+            dtype=np.intp,
+        )
+        self.liberal_pct = np.array([liberal for _, _, liberal, _ in rows], dtype=float)
+        self.weights = np.array([votes or 0 for _, _, _, votes in rows], dtype=float)
+        self.booths: Dict[Tuple[str, str], int] = {}
+        for n, (division, name, _, _) in enumerate(rows):
+            self.booths.setdefault((division, name.upper()), n)
+
+    def __len__(self) -> int:
+        return len(self.weights)
+
+
+def project_tcp(
+    baseline: ProjectionBaseline,
+    current_pct1: np.ndarray,
+    liberal_first: Sequence[bool],
+) -> Dict[str, np.ndarray]:
+    """
+    Project every division's final TCP share for its TCP candidate 1.
+
+    Args:
+        baseline: The 2022 booths
+        current_pct1: Current TCP candidate 1 percentage at each baseline
+            booth, NaN where the booth hasn't been counted
+        liberal_first: Per division, whether TCP candidate 1 is the Liberal
+            candidate (their 2022 share is then the Liberal/National share)
+
+    Returns:
+        Per-division arrays: booths_counted, total_booths, counted_share (% of
+        2022 votes at counted booths), swing (to candidate 1) and
+        projected_pct1; swing and projection are NaN where nothing is counted
+    """
+    divisions = len(baseline.divisions)
+    index = baseline.division_index
+    weights = baseline.weights
+    current_pct1 = np.asarray(current_pct1, dtype=float)
+    liberal_first = np.asarray(liberal_first, dtype=bool).reshape(-1)
+
+    previous_pct1 = np.where(
+        liberal_first[index], baseline.liberal_pct, 100 - baseline.liberal_pct
+    )
+    counted = ~np.isnan(current_pct1)
+    booth_swing = np.where(counted, current_pct1 - previous_pct1, 0.0)
+
+    def per_division(values: np.ndarray) -> np.ndarray:
+        return np.bincount(index, weights=values, minlength=divisions)
+
+    total_weight = per_division(weights)
+    counted_weight = per_division(weights * counted)
+    booths_counted = per_division(counted.astype(float))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        swing = np.where(
+            counted_weight > 0,
+            per_division(weights * booth_swing) / counted_weight,
+            np.nan,
+        )
+        projected_booths = np.where(
+            counted, current_pct1, np.clip(previous_pct1 + swing[index], 0, 100)
+        )
+        projected_pct1 = np.where(
+            (counted_weight > 0) & (total_weight > 0),
+            per_division(weights * np.nan_to_num(projected_booths)) / total_weight,
+            np.nan,
+        )
+        counted_share = np.where(
+            total_weight > 0, counted_weight / total_weight * 100, 0.0
+        )
+
+    return {
+        "booths_counted": booths_counted.astype(int),
+        "total_booths": np.bincount(index, minlength=divisions),
+        "counted_share": counted_share,
+        "swing": swing,
+        "projected_pct1": projected_pct1,
+    }
+
+
+class BaselineCache:
+    """The projection baseline, keyed on the reference data version."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._baseline: Optional[ProjectionBaseline] = None
+        self._version: Optional[int] = None
+
+    def get(self, version: int) -> Optional[ProjectionBaseline]:
+        """
+        Get the baseline if it was built from ``version`` of the reference
+        data, or None if it hasn't been loaded or is out of date.
+        """
+        with self._lock:
+            if self._version != version:
+                return None
+            return self._baseline
+
+    def install(self, baseline: ProjectionBaseline, version: int) -> ProjectionBaseline:
+        """
+        Keep a baseline built from ``version`` of the reference data, read
+        before the 2022 booths, unless one from a later version is kept.
+        """
+        with self._lock:
+            if self._version is None or self._version <= version:
+                self._baseline, self._version = baseline, version
+        return baseline
+
+    def clear(self) -> None:
+        """Forget the baseline; it is reloaded on next use."""
+        with self._lock:
+            self._baseline = self._version = None
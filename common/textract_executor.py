@@ -0,0 +1,259 @@
+"""
+Textract Executor
+
+Runs the blocking boto3 Textract calls on a dedicated thread pool so they
+don't stall the event loop. The pool size bounds how many calls are in
+flight, a token bucket keeps the call rate under the account's Textract TPS
+quota, and throttling errors are retried with full-jitter exponential
+backoff. Each throttle halves the bucket's rate and each success wins a bit
+of it back, so the executor settles just under the quota actually granted.
+
+A pool thread can't be interrupted, so a caller that gives up (the OCR
+router's timeout, say) doesn't stop a call already sent: it runs until
+Textract answers or ``TEXTRACT_READ_TIMEOUT_SECONDS`` passes. Calls given up
+while still queued or waiting for the rate limit are skipped instead.
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+# Calls to Textract in flight at once, across the whole process
+TEXTRACT_MAX_CONCURRENCY = int(os.environ.get("TEXTRACT_MAX_CONCURRENCY", "4"))
+# The account's AnalyzeDocument transactions per second quota in the region
+TEXTRACT_TPS = float(os.environ.get("TEXTRACT_TPS", "1"))
+TEXTRACT_MAX_RETRIES = int(os.environ.get("TEXTRACT_MAX_RETRIES", "5"))
+TEXTRACT_RETRY_BASE_SECONDS = float(
+    os.environ.get("TEXTRACT_RETRY_BASE_SECONDS", "0.5")
+)
+TEXTRACT_RETRY_MAX_SECONDS = float(os.environ.get("TEXTRACT_RETRY_MAX_SECONDS", "20"))
+# How long a pool thread waits on Textract's answer to one request
+TEXTRACT_READ_TIMEOUT_SECONDS = float(
+    os.environ.get("TEXTRACT_READ_TIMEOUT_SECONDS", "60")
+)
+
+# Error codes Textract answers with when over quota
+THROTTLING_ERRORS = {
+    "ProvisionedThroughputExceededException",
+    "ThrottlingException",
+    "LimitExceededException",
+}
+
+
+def is_throttling_error(error: BaseException) -> bool:
+    """Check whether a boto3 error means the call was throttled."""
+    response = getattr(error, "response", None)
+    if isinstance(response, dict):
+        code = response.get("Error", {}).get("Code")
+        if code in THROTTLING_ERRORS:
+            return True
+    return type(error).__name__ in THROTTLING_ERRORS
+
+
+class TokenBucket:
+    """Thread-safe token bucket whose rate can be lowered and raised."""
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            rate: Tokens added per second
+            capacity: Most tokens held at once (the burst size), default 1
+            clock: Monotonic time source
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else 1.0
+        self.clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def reserve(self) -> float:
+        """
+        Take a token, going into debt if none is left.
+
+        Returns:
+            Seconds to wait before using the token; callers reserving later
+            wait behind earlier ones
+        """
+        with self._lock:
+            self._refill(self.clock())
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def set_rate(self, rate: float) -> None:
+        """Change the refill rate from now on."""
+        with self._lock:
+            self._refill(self.clock())
+            self.rate = rate
+
+
+class TextractExecutor:
+    """Runs Textract calls with bounded concurrency, rate limiting and retries."""
+
+    def __init__(
+        self,
+        client: Any,
+        max_concurrency: int = TEXTRACT_MAX_CONCURRENCY,
+        tps: float = TEXTRACT_TPS,
+        max_retries: int = TEXTRACT_MAX_RETRIES,
+        retry_base: float = TEXTRACT_RETRY_BASE_SECONDS,
+        retry_max: float = TEXTRACT_RETRY_MAX_SECONDS,
+        min_tps: Optional[float] = None,
+        rng: Optional[random.Random] = None,
+    ):
+        """
+        Args:
+            client: A boto3 Textract client, or anything with the same methods
+            max_concurrency: Calls in flight at once
+            tps: Calls started per second, at most
+            max_retries: Retries of a throttled call before giving up
+            retry_base: Backoff ceiling for the first retry, doubling after
+            retry_max: Largest backoff ceiling
+            min_tps: Lowest rate throttling can push the bucket down to,
+                default a tenth of ``tps``
+            rng: Random source for the backoff jitter
+        """
+        self.client = client
+        self.max_concurrency = max_concurrency
+        self.tps = tps
+        self.min_tps = min_tps if min_tps is not None else tps / 10
+        self.max_retries = max_retries
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.rng = rng or random.Random()
+        self.bucket = TokenBucket(tps)
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="textract"
+        )
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.in_flight = 0
+        self.peak_queued = 0
+        self.calls = 0
+        self.throttled = 0
+        self.retries = 0
+        self.failed = 0
+        self.abandoned = 0
+
+    def _count(self, **changes: int) -> None:
+        with self._lock:
+            for name, change in changes.items():
+                setattr(self, name, getattr(self, name) + change)
+            self.peak_queued = max(self.peak_queued, self.queued)
+
+    def _call(self, method: str, kwargs: Dict[str, Any], state: Dict[str, bool]) -> Any:
+        """Make one call on a pool thread, once the bucket allows it."""
+        with self._lock:
+            if state["abandoned"]:
+                return None
+            state["started"] = True
+            self.queued -= 1
+            self.in_flight += 1
+        try:
+            wait = self.bucket.reserve()
+            if wait > 0:
+                time.sleep(wait)
+            if state["abandoned"]:
+                return None
+            self._count(calls=1)
+            return getattr(self.client, method)(**kwargs)
+        finally:
+            self._count(in_flight=-1)
+
+    def backoff(self, retry: int) -> float:
+        """Get the full-jitter delay before a retry (numbered from 0)."""
+        ceiling = min(self.retry_max, self.retry_base * 2**retry)
+        return self.rng.uniform(0, ceiling)
+
+    def _throttled(self) -> None:
+        with self._lock:
+            self.throttled += 1
+            rate = max(self.min_tps, self.bucket.rate / 2)
+        self.bucket.set_rate(rate)
+
+    def _succeeded(self) -> None:
+        if self.bucket.rate < self.tps:
+            self.bucket.set_rate(min(self.tps, self.bucket.rate + self.tps / 10))
+
+    async def call(self, method: str, **kwargs: Any) -> Any:
+        """
+        Call a Textract client method without blocking the event loop.
+
+        Args:
+            method: Client method name, such as "analyze_document"
+            **kwargs: The method's arguments
+
+        Returns:
+            The method's response
+
+        Raises:
+            The client's error, once retries of a throttled call run out or
+            straight away for any other error
+        """
+        loop = asyncio.get_running_loop()
+        for retry in range(self.max_retries + 1):
+            self._count(queued=1)
+            state = {"started": False, "abandoned": False}
+            try:
+                response = await loop.run_in_executor(
+                    self._pool, self._call, method, kwargs, state
+                )
+            except asyncio.CancelledError:
+                # The caller gave up; skip the call if it hasn't been sent
+                with self._lock:
+                    state["abandoned"] = True
+                    self.abandoned += 1
+                    if not state["started"]:
+                        self.queued -= 1
+                raise
+            except Exception as e:
+                if not is_throttling_error(e):
+                    self._count(failed=1)
+                    raise
+                self._throttled()
+                if retry == self.max_retries:
+                    self._count(failed=1)
+                    raise
+                self._count(retries=1)
+                await asyncio.sleep(self.backoff(retry))
+            else:
+                self._succeeded()
+                return response
+
+    async def analyze_document(self, **kwargs: Any) -> Dict[str, Any]:
+        """Run ``analyze_document`` through the executor."""
+        return await self.call("analyze_document", **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get queue depth, concurrency and throttling counters."""
+        with self._lock:
+            return {
+                "queued": self.queued,
+                "in_flight": self.in_flight,
+                "peak_queued": self.peak_queued,
+                "max_concurrency": self.max_concurrency,
+                "tps": self.tps,
+                "current_tps": self.bucket.rate,
+                "calls": self.calls,
+                "throttled": self.throttled,
+                "retries": self.retries,
+                "failed": self.failed,
+                "abandoned": self.abandoned,
+            }
@@ -0,0 +1,221 @@
+"""
+Serialization benchmark
+
+Times the large read endpoints against a scratch SQLite database seeded with
+a full count's worth of results, polling places and candidates, and reports
+the share of each request spent serializing the response:
+
+- before: the stdlib path the endpoints used to take (decode the stored JSON
+  columns, jsonable_encoder, json.dumps)
+- after: the orjson path they take now (stored JSON passed through as raw
+  fragments, rendered by FastJSONResponse)
+
+The "after" serialization time is measured inside the running app. The
+"before" request time is estimated by swapping it for the stdlib
+serialization of the same payload.
+
+Usage:
+    cd fastapi_app
+    python benchmark_serialization.py [--results 3000] [--repeat 20]
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.testclient import TestClient
+
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+from common.result_votes import backfill_result_votes
+
+# Raw OCR rows make the stored result data much larger than the vote counts
+CANDIDATES = ["SMITH", "JONES", "BROWN", "NGUYEN", "TAYLOR", "WILSON", "PATEL"]
+DIVISION = "Benchdiv"
+
+
+def result_data(rng: random.Random, booth: str) -> dict:
+    primary = {name: rng.randint(0, 900) for name in CANDIDATES}
+    return {
+        "booth_name": booth,
+        "electorate": DIVISION,
+        "primary_votes": primary,
+        "two_candidate_preferred": {
+            "SMITH": {name: votes // 2 for name, votes in primary.items()},
+            "JONES": {name: votes - votes // 2 for name, votes in primary.items()},
+        },
+        "totals": {"formal": sum(primary.values()), "informal": rng.randint(0, 50)},
+        "raw_rows": [
+            [f"{rng.random():.6f}" for _ in range(8)]
+            for _ in range(len(CANDIDATES) + 6)
+        ],
+        "reviewed": True,
+        "approved": True,
+    }
+
+
+def seed(main, results: int) -> None:
+    """Fill the scratch database with one big division and every candidate."""
+    rng = random.Random(2025)
+    booths = [f"Booth {n}" for n in range(max(1, results // 25))]
+    db = main.SessionLocal()
+    try:
+        for n, booth in enumerate(booths):
+            db.add(
+                main.PollingPlace(
+                    state="NSW",
+                    division_id=1,
+                    division_name=DIVISION,
+                    polling_place_id=n,
+                    polling_place_name=booth,
+                    address=f"{n} Example Street",
+                    status="Current",
+                    wheelchair_access="Full",
+                    data=json.dumps(
+                        {"PremisesName": booth, "Latitude": -33.8, "Longitude": 151.2}
+                    ),
+                )
+            )
+        for n in range(150 * len(CANDIDATES)):
+            db.add(
+                main.Candidate(
+                    candidate_name=f"CANDIDATE {n}",
+                    party=rng.choice(["Labor", "Liberal", "Greens", "Independent"]),
+                    electorate=f"Division {n // len(CANDIDATES)}",
+                    ballot_position=n % len(CANDIDATES) + 1,
+                    candidate_type="house",
+                    state="NSW",
+                    data=json.dumps(
+                        {"surname": f"CANDIDATE {n}", "ballotGivenName": "Alex"}
+                    ),
+                )
+            )
+        for name, party in (("SMITH", "Liberal"), ("JONES", "Labor")):
+            db.add(
+                main.TCPCandidate(electorate=DIVISION, candidate_name=name, party=party)
+            )
+        for n in range(results):
+            booth = booths[n % len(booths)]
+            db.add(
+                main.Result(
+                    electorate=DIVISION,
+                    booth_name=booth,
+                    is_reviewed=1,
+                    reviewer="Benchmark",
+                    data=json.dumps(result_data(rng, booth)),
+                )
+            )
+        db.commit()
+    finally:
+        db.close()
+    with main.engine.begin() as conn:
+        backfill_result_votes(conn)
+
+
+# Endpoint, whether it used to go through jsonable_encoder, and the stored
+# JSON columns it used to decode (/results sent its data as a string)
+ENDPOINTS = [
+    ("/results", True, None),
+    (f"/results/division/{DIVISION}", True, None),
+    (f"/booth-results?division={DIVISION}", True, "booth_results"),
+    ("/candidates", False, "candidates"),
+]
+
+
+def stdlib_serialize(payload: dict, encoder: bool, decoded: str) -> float:
+    """Time the old serialization of a payload, decoding its data columns."""
+    payload = json.loads(json.dumps(payload))
+    if "results" in payload and not decoded:
+        for result in payload["results"]:
+            result["data"] = json.dumps(result["data"])
+    stored = [json.dumps(row["data"]) for row in payload.get(decoded, [])]
+
+    start = time.perf_counter()
+    for row, text in zip(payload.get(decoded, []), stored):
+        row["data"] = json.loads(text)
+    if encoder:
+        payload = jsonable_encoder(payload)
+    # Starlette's JSONResponse.render
+    json.dumps(
+        payload, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+    return time.perf_counter() - start
+
+
+def main_benchmark(results: int, repeat: int) -> None:
+    """Seed the database and print the serialization share per endpoint."""
+    import main
+    from common import fast_json
+    from common.response_cache import ResponseCache
+
+    seed(main, results)
+    # Build /candidates on every request rather than serving the cached body
+    main.response_cache = ResponseCache(ttl=0)
+
+    # Time the orjson rendering inside the app
+    render_times = []
+    render = fast_json.FastJSONResponse.render
+    dumps = main.dumps
+
+    def timed(function):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                render_times.append(time.perf_counter() - start)
+
+        return wrapper
+
+    fast_json.FastJSONResponse.render = timed(render)
+    main.dumps = timed(dumps)
+
+    print(f"{results} results, median of {repeat} requests")
+    print(
+        f"{'endpoint':<36}{'bytes':>10}{'request ms':>12}"
+        f"{'before ser':>12}{'after ser':>11}"
+    )
+    with TestClient(main.app) as client:
+        for path, encoder, decoded in ENDPOINTS:
+            request_times, after_times, before_times = [], [], []
+            for _ in range(repeat):
+                render_times.clear()
+                start = time.perf_counter()
+                response = client.get(path)
+                request_times.append(time.perf_counter() - start)
+                after_times.append(sum(render_times))
+                before_times.append(
+                    stdlib_serialize(response.json(), encoder, decoded)
+                )
+            request = statistics.median(request_times)
+            after = statistics.median(after_times)
+            before = statistics.median(before_times)
+            # The same request with the old serialization swapped back in
+            before_request = request - after + before
+            print(
+                f"{path:<36}{len(response.content):>10}{request * 1000:>12.1f}"
+                f"{before / before_request:>12.0%}{after / request:>11.0%}"
+            )
+
+    fast_json.FastJSONResponse.render = render
+    main.dumps = dumps
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--results", type=int, default=3000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        # main connects to DATABASE_URL when it is imported
+        os.environ["DATABASE_URL"] = f"sqlite:///{scratch}/results.db"
+        main_benchmark(args.results, args.repeat)
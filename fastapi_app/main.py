@@ -1,18 +1,27 @@
 import os
 import re
-import sqlite3
 from pathlib import Path
-from fastapi import FastAPI, UploadFile, File, HTTPException, Request, Form
+from fastapi import (
+    FastAPI,
+    UploadFile,
+    File,
+    HTTPException,
+    Request,
+    Form,
+    Query,
+    Response,
+)
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.staticfiles import StaticFiles
-import httpx
+import numpy as np
 from PIL import Image
-import pytesseract
 import io
 import json
+import base64
+import binascii
 from datetime import datetime, timezone
 from sqlalchemy import (
-    create_engine,
     Column,
     Integer,
     String,
@@ -20,10 +29,21 @@ from sqlalchemy import (
     JSON,
     Float,
     Boolean,
+    Index,
+    and_,
+    event,
+    or_,
+    delete,
+    func,
+    select,
     text,
 )
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from starlette.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 import logging
 from typing import Dict, List, Optional, Any, Tuple
@@ -39,20 +59,83 @@ if parent_dir not in sys.path:
     sys.path.append(parent_dir)
 
 from common.image_processor import ImageProcessor
-from common.db_utils import get_sqlalchemy_url, ensure_database_exists
+from common.db_utils import (
+    get_sqlalchemy_url,
+    get_async_sqlalchemy_url,
+    ensure_database_exists,
+    get_connection,
+    get_engine,
+    engine_options,
+    configure_sqlite_connection,
+    primary_key_column,
+)
 from common.booth_results_processor import (
     process_and_load_booth_results,
     create_polling_places_table,
     get_polling_places_for_division,
 )
 from common.candidate_data_loader import process_and_load_candidate_data
+from common.result_votes import normalize_votes, normalize_totals
+from common.migrations import run_migrations
+from common.bulk_loader import get_load_reports
+from common.division_tally import BoothTally, TallyCache
+from common.booth_matcher import BoothMatch, BoothNameIndex
+from common.booth_swing import (
+    PREVIOUS_TCP_NAMES,
+    liberal_side,
+    tcp_percentages,
+    tcp_swings,
+)
+from common.seat_projection import BaselineCache, ProjectionBaseline, project_tcp
+from common.data_versions import (
+    BUMP_DIVISION_VERSIONS_SQL,
+    BUMP_VERSION_SQL,
+    DIVISION_SCOPE_PREFIX,
+    REFERENCE_SCOPE,
+    RESULTS_SCOPE,
+    SELECT_DIVISION_VERSIONS_SQL,
+    SELECT_VERSIONS_SQL,
+    add_change_listener,
+    bump_params,
+    division_scope,
+    etag_matches,
+    make_etag,
+    notify_changed,
+)
+from common.response_cache import ResponseCache, RESPONSE_CACHE_MAX_AGE_SECONDS
+from common.fast_json import FastJSONResponse, dumps, raw_json
+from common.job_queue import JobQueue, PermanentJobError, WorkerPool
+from common.ocr_engines import NoTableFound, OCRUnavailable
+from common.ocr_cache import OCRCache
+from common.http_client import SharedHTTPClient
+from common.notifications import NotificationDispatcher
 
 load_dotenv()
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Tally Sheet Scanner API")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await rebuild_division_tallies()
+    scan_workers.start()
+    notifier.start()
+    yield
+    await scan_workers.stop()
+    await notifier.stop()
+    image_processor.preprocessor.shutdown()
+    await http_client.aclose()
+    # Close pooled aiosqlite connections (and their worker threads) cleanly
+    await async_engine.dispose()
+
+
+app = FastAPI(
+    title="Tally Sheet Scanner API",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -66,7 +149,7 @@ is_docker = os.path.exists("/.dockerenv") or os.path.isdir("/app/data")
 data_dir_path = "/app/data" if is_docker else str(Path(__file__).parent.parent / "data")
 SQLALCHEMY_DATABASE_URL = get_sqlalchemy_url()
 logger.info(f"Running in {'Docker' if is_docker else 'local'} environment")
-logger.info(f"Using database path: {SQLALCHEMY_DATABASE_URL}")
+logger.info(f"Using database: {make_url(SQLALCHEMY_DATABASE_URL)!r}")
 logger.info(f"Database file exists: {os.path.exists(f'{data_dir_path}/results.db')}")
 
 data_dir = Path(data_dir_path)
@@ -89,12 +172,42 @@ SQLALCHEMY_DATABASE_URL = get_sqlalchemy_url()
 logger.error(
     f"ABSOLUTE DB PATH: {os.path.abspath(SQLALCHEMY_DATABASE_URL.replace('sqlite:////', ''))}"
 )
-logger.error(f"DB URL BEING USED: {SQLALCHEMY_DATABASE_URL}")
+logger.error(f"DB URL BEING USED: {make_url(SQLALCHEMY_DATABASE_URL)!r}")
 logger.error(f"CURRENT WORKING DIR: {os.getcwd()}")
 
-# Create database engine and session
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+# Create database engine and session. The engine is shared with the common
+# loaders so the whole process uses one tuned pool.
+engine = get_engine()
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Request handlers use the async engine so a slow query only suspends its own
+# request instead of blocking the event loop. The sync engine above is kept
+# for schema setup at import time and for scripts.
+ASYNC_DATABASE_URL = get_async_sqlalchemy_url()
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL)
+)
+
+if async_engine.dialect.name == "sqlite":
+
+    @event.listens_for(async_engine.sync_engine, "connect")
+    def _configure_async_sqlite(dbapi_connection, connection_record):
+        configure_sqlite_connection(dbapi_connection)
+
+
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False
+)
+
+# Running per-division totals of reviewed results, see update_division_tally
+division_tallies = TallyCache()
+# Serialized reference-data responses, see serve_cached
+response_cache = ResponseCache()
+# Polling place names per division for resolving scanned booth names
+booth_index = BoothNameIndex()
+# 2022 booth results arranged for seat projections, see project_divisions
+projection_baselines = BaselineCache()
 Base = declarative_base()
 
 
@@ -112,6 +225,53 @@ class Result(Base):
     aec_booth_name = Column(
         String, nullable=True
     )  # Optional until migration is complete
+    # Totals are copied out of data so aggregates never need to decode it
+    formal_votes = Column(Integer, nullable=True)
+    informal_votes = Column(Integer, nullable=True)
+    total_votes = Column(Integer, nullable=True)
+
+    __table_args__ = (
+        Index(
+            "ix_results_electorate_reviewed_timestamp",
+            "electorate",
+            "is_reviewed",
+            "timestamp",
+        ),
+        Index("ix_results_reviewed_timestamp_id", "is_reviewed", "timestamp", "id"),
+    )
+
+
+class ResultPrimaryVote(Base):
+    __tablename__ = "result_primary_votes"
+
+    id = Column(Integer, primary_key=True)
+    result_id = Column(Integer, nullable=False)
+    candidate = Column(String, nullable=False)
+    votes = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_result_primary_votes_result", "result_id", "candidate", "votes"),
+    )
+
+
+class ResultTCPVote(Base):
+    __tablename__ = "result_tcp_votes"
+
+    id = Column(Integer, primary_key=True)
+    result_id = Column(Integer, nullable=False)
+    tcp_candidate = Column(String, nullable=False)
+    candidate = Column(String, nullable=False)
+    votes = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index(
+            "ix_result_tcp_votes_result",
+            "result_id",
+            "tcp_candidate",
+            "candidate",
+            "votes",
+        ),
+    )
 
 
 class PollingPlace(Base):
@@ -129,6 +289,12 @@ class PollingPlace(Base):
     status = Column(String)
     wheelchair_access = Column(String)
     data = Column(String)  # SQLite stores JSON as TEXT
+    row_hash = Column(String)
+
+    __table_args__ = (
+        Index("ix_polling_places_division_name", "division_name", "polling_place_name"),
+        Index("ix_polling_places_polling_place_id", "polling_place_id"),
+    )
 
 
 class TCPCandidate(Base):
@@ -153,6 +319,46 @@ class TCPCandidateResponse(BaseModel):
     party: str
 
 
+class DataVersion(Base):
+    __tablename__ = "data_versions"
+
+    scope = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False)
+    updated_at = Column(String, nullable=False)
+
+
+class ResultChange(Base):
+    __tablename__ = "result_changes"
+
+    id = Column(Integer, primary_key=True)
+    # The results data version of the write that logged it
+    seq = Column(Integer, nullable=False, index=True)
+    result_id = Column(Integer, nullable=False)
+    electorate = Column(String)
+    deleted = Column(Integer, nullable=False, default=0)
+    changed_at = Column(String, nullable=False)
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String, nullable=False)
+    status = Column(String, nullable=False)
+    payload = Column(String, nullable=False)
+    result = Column(String)
+    error = Column(String)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False)
+    # Seconds since the epoch
+    run_after = Column(Float, nullable=False)
+    lease_expires_at = Column(Float)
+    created_at = Column(Float, nullable=False)
+    updated_at = Column(Float, nullable=False)
+
+    __table_args__ = (Index("ix_jobs_status_kind", "status", "kind"),)
+
+
 class ResultResponse(BaseModel):
     id: int
     image_url: Optional[str] = None
@@ -173,50 +379,67 @@ class Candidate(Base):
     candidate_type = Column(String)
     state = Column(String)
     data = Column(String)  # JSON data as string
+    row_hash = Column(String)
+
+    __table_args__ = (
+        Index(
+            "ix_candidates_electorate_type_position",
+            "electorate",
+            "candidate_type",
+            "ballot_position",
+        ),
+    )
 
 
-# Create database tables
+# Bring an existing database up to the current schema, then create any
+# tables that are still missing
+run_migrations()
 Base.metadata.create_all(bind=engine)
 
 # Create polling places table
 create_polling_places_table()
 
-# Initialize image processor
-image_processor = ImageProcessor()
+# Pooled client for outbound requests, closed with the app
+http_client = SharedHTTPClient()
+
+# Initialize image processor, remembering OCR results by image hash
+image_processor = ImageProcessor(
+    cache=OCRCache(data_dir / "ocr_cache"),
+    recordings_dir=os.environ.get("OCR_RECORDINGS_DIR", data_dir / "ocr_recordings"),
+)
 
 
 def create_candidates_table() -> None:
     """Create the candidates table in the SQLite database if it doesn't exist."""
     try:
         logger.info(
-            f"Creating candidates table in database at: {SQLALCHEMY_DATABASE_URL}"
+            f"Creating candidates table in database at: {engine.url!r}"
         )
-        db_path = SQLALCHEMY_DATABASE_URL.replace("sqlite:///", "")
-        logger.info(f"Database file exists: {os.path.exists(db_path)}")
-        if os.path.exists(db_path):
-            logger.info(f"File permissions: {oct(os.stat(db_path).st_mode)}")
-            logger.info(f"File owner: {os.stat(db_path).st_uid}")
-
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-
-        cursor.execute(
+        if engine.dialect.name == "sqlite":
+            db_path = engine.url.database
+            logger.info(f"Database file exists: {os.path.exists(db_path)}")
+            if os.path.exists(db_path):
+                logger.info(f"File permissions: {oct(os.stat(db_path).st_mode)}")
+                logger.info(f"File owner: {os.stat(db_path).st_uid}")
+
+        with get_connection() as conn:
+            conn.execute(
+                text(
+                    f"""
+            CREATE TABLE IF NOT EXISTS candidates (
+                {primary_key_column(conn)},
+                candidate_name TEXT NOT NULL,
+                party TEXT,
+                electorate TEXT NOT NULL,
+                ballot_position INTEGER,
+                candidate_type TEXT NOT NULL,
+                state TEXT,
+                data TEXT
+            )
             """
-        CREATE TABLE IF NOT EXISTS candidates (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            candidate_name TEXT NOT NULL,
-            party TEXT,
-            electorate TEXT NOT NULL,
-            ballot_position INTEGER,
-            candidate_type TEXT NOT NULL,
-            state TEXT,
-            data JSON
-        )
-        """
-        )
-
-        conn.commit()
-        conn.close()
+                )
+            )
+            conn.commit()
         logger.info("Successfully created candidates table")
     except Exception as e:
         logger.error(f"Error creating candidates table: {e}")
@@ -235,9 +458,6 @@ except Exception as e:
 
     logger.error(f"Traceback: {traceback.format_exc()}")
 
-import re
-from typing import List, Dict, Any
-
 
 def extract_tally_sheet_data(
     extracted_rows: List[Dict[str, Any]], booth_name: str
@@ -361,325 +581,893 @@ def extract_tally_sheet_data(
 
 
 FLASK_APP_URL = os.environ.get("FLASK_APP_URL", "http://localhost:5000/api/notify")
+# Result notifications go to the Flask app in the background, through the
+# shared client
+notifier = NotificationDispatcher(FLASK_APP_URL, http_client.get)
 
+# Largest page of /results a client can ask for, and the batch size when
+# streaming results as NDJSON
+RESULTS_PAGE_MAX = int(os.environ.get("RESULTS_PAGE_MAX", "500"))
+RESULTS_STREAM_BATCH = int(os.environ.get("RESULTS_STREAM_BATCH", "200"))
 
-@app.get("/test")
-async def test_endpoint():
-    """
-    Simple test endpoint to verify API is working
-    """
-    return {"status": "ok", "message": "API is working"}
+RESULT_FIELDS = ("id", "timestamp", "electorate", "booth_name", "image_url", "data")
 
 
-@app.get("/health")
-async def health_check():
-    """Health check endpoint for connectivity testing"""
-    return {"status": "ok"}
+async def sync_result_votes(db, result: Result, data: Dict[str, Any]) -> None:
+    """
+    Rewrite the normalized vote rows and totals for a result from its data.
 
+    Must be called whenever result.data changes, inside the same session
+    so the rows are committed together with the blob.
+    """
+    if result.id is None:
+        await db.flush()
+
+    await db.execute(
+        delete(ResultPrimaryVote).where(ResultPrimaryVote.result_id == result.id)
+    )
+    await db.execute(delete(ResultTCPVote).where(ResultTCPVote.result_id == result.id))
+
+    primary_rows, tcp_rows = normalize_votes(data)
+    db.add_all(
+        [
+            ResultPrimaryVote(result_id=result.id, candidate=candidate, votes=votes)
+            for candidate, votes in primary_rows
+        ]
+        + [
+            ResultTCPVote(
+                result_id=result.id,
+                tcp_candidate=tcp_candidate,
+                candidate=candidate,
+                votes=votes,
+            )
+            for tcp_candidate, candidate, votes in tcp_rows
+        ]
+    )
 
-from fastapi import UploadFile, File, HTTPException
-import io
-import os
-import json
-from PIL import Image
-import pytesseract
-import httpx
+    for column, value in normalize_totals(data).items():
+        setattr(result, column, value)
 
 
-from fastapi import UploadFile, File, HTTPException
-import boto3
-import json
-import io
+async def delete_result_votes(db, result_filter) -> None:
+    """Delete the normalized vote rows for the results matching a filter."""
+    ids = select(Result.id).where(result_filter).scalar_subquery()
+    await db.execute(
+        delete(ResultPrimaryVote).where(ResultPrimaryVote.result_id.in_(ids))
+    )
+    await db.execute(delete(ResultTCPVote).where(ResultTCPVote.result_id.in_(ids)))
 
 
-@app.post("/scan-image")
-async def scan_image(file: UploadFile = File(...)):
-    """
-    Scan uploaded tally sheet image using Amazon Textract, extract table and booth name via query.
+async def read_booth_tallies(
+    db, division: Optional[str] = None
+) -> List[Tuple[str, BoothTally]]:
     """
-    try:
-        logger.info(f"Received image upload: {file.filename}")
-        contents = await file.read()
+    Read reviewed results and their vote rows as per-booth tallies.
 
-        # Process the image using the shared processor
-        result = await image_processor.process_image(contents, source="upload")
+    Args:
+        db: Async database session
+        division: Only read this division (default: every division)
 
-        # Now pass extracted_rows to your existing extract_tally_sheet_data function
-        tally_data = extract_tally_sheet_data(
-            result["extracted_rows"], result.get("booth_name", None)
+    Returns:
+        List of (division, booth tally) in the order their votes were
+        entered, so candidate totals keep the order candidates first appeared
+    """
+    reviewed = select(Result.id).where(Result.is_reviewed == 1)
+    if division is not None:
+        reviewed = reviewed.where(Result.electorate == division)
+    reviewed_ids = reviewed.scalar_subquery()
+
+    booths = {}
+    for result in (
+        await db.execute(
+            select(Result).where(Result.id.in_(reviewed_ids)).order_by(Result.id)
         )
-        logger.info(
-            f"Extracted tally data: electorate={tally_data.get('electorate')}, booth={tally_data.get('booth_name')}"
+    ).scalars():
+        booths[result.id] = (result.electorate, BoothTally.from_result(result, None))
+
+    entered = {}
+    for result_id, candidate, votes in await db.execute(
+        select(
+            ResultPrimaryVote.result_id,
+            ResultPrimaryVote.candidate,
+            ResultPrimaryVote.votes,
         )
+        .where(ResultPrimaryVote.result_id.in_(reviewed_ids))
+        .order_by(ResultPrimaryVote.id)
+    ):
+        if result_id in booths:
+            entered.setdefault(result_id, booths[result_id])
+            booths[result_id][1].primary[candidate] = votes
+
+    for result_id, tcp_candidate, candidate, votes in await db.execute(
+        select(
+            ResultTCPVote.result_id,
+            ResultTCPVote.tcp_candidate,
+            ResultTCPVote.candidate,
+            ResultTCPVote.votes,
+        )
+        .where(ResultTCPVote.result_id.in_(reviewed_ids))
+        .order_by(ResultTCPVote.id)
+    ):
+        if result_id in booths:
+            booths[result_id][1].tcp.setdefault(tcp_candidate, {})[candidate] = votes
 
-        # Save to database
-        db = SessionLocal()
-        try:
-            # Store the image in the uploads directory
-            image_filename = f"{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}_{file.filename}"
-            image_path = uploads_dir / image_filename
+    return list(entered.values()) + [
+        booth for result_id, booth in booths.items() if result_id not in entered
+    ]
 
-            # Save the image file
-            with open(image_path, "wb") as f:
-                f.write(contents)
 
-            # Use the FastAPI endpoint URL
-            image_url = f"/uploads/{image_filename}"
+async def read_division_summaries(
+    db, divisions: Optional[List[str]] = None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Read vote totals and booth counts for many divisions with grouped queries.
 
-            data_json = json.dumps(
-                {
-                    "raw_rows": result["extracted_rows"],
-                    "primary_votes": tally_data.get("primary_votes"),
-                    "two_candidate_preferred": tally_data.get(
-                        "two_candidate_preferred"
-                    ),
-                    "totals": tally_data.get("totals"),
-                }
-            )
+    Args:
+        db: Async session
+        divisions: Divisions to read, or None for every division with
+            polling places or results
 
-            # Check for existing result for this booth
-            existing_result = (
-                db.query(Result)
-                .filter_by(
-                    electorate=tally_data.get("electorate"),
-                    booth_name=result["booth_name"] or tally_data.get("booth_name"),
-                )
-                .first()
+    Returns:
+        {division: summary} with primary and TCP totals, the number of
+        reviewed booths and the number of polling places
+    """
+
+    def in_divisions(column):
+        return column.in_(divisions) if divisions is not None else True
+
+    reviewed = (Result.is_reviewed == 1) & in_divisions(Result.electorate)
+    primary_totals = await db.execute(
+        select(
+            Result.electorate,
+            ResultPrimaryVote.candidate,
+            func.sum(ResultPrimaryVote.votes),
+        )
+        .join(Result, Result.id == ResultPrimaryVote.result_id)
+        .where(reviewed)
+        .group_by(Result.electorate, ResultPrimaryVote.candidate)
+    )
+    tcp_totals = await db.execute(
+        select(
+            Result.electorate,
+            ResultTCPVote.tcp_candidate,
+            func.sum(ResultTCPVote.votes),
+        )
+        .join(Result, Result.id == ResultTCPVote.result_id)
+        .where(reviewed)
+        .group_by(Result.electorate, ResultTCPVote.tcp_candidate)
+    )
+    booth_counts = await db.execute(
+        select(Result.electorate, func.count(Result.id), func.sum(Result.total_votes))
+        .where(reviewed)
+        .group_by(Result.electorate)
+    )
+    total_booths = await db.execute(
+        select(PollingPlace.division_name, func.count(PollingPlace.id))
+        .where(in_divisions(PollingPlace.division_name))
+        .group_by(PollingPlace.division_name)
+    )
+
+    summaries = {}
+
+    def summary(division: str) -> Dict[str, Any]:
+        if division not in summaries:
+            summaries[division] = {
+                "booth_count": 0,
+                "total_booths": 0,
+                "total_votes": 0,
+                "primary_votes": {},
+                "tcp_votes": {},
+            }
+        return summaries[division]
+
+    for division in divisions or []:
+        summary(division)
+    for division, candidate, votes in primary_totals:
+        summary(division)["primary_votes"][candidate] = votes or 0
+    for division, tcp_candidate, votes in tcp_totals:
+        summary(division)["tcp_votes"][tcp_candidate] = votes or 0
+    for division, count, votes in booth_counts:
+        summary(division).update(booth_count=count, total_votes=votes or 0)
+    for division, count in total_booths:
+        if division:
+            summary(division)["total_booths"] = count
+
+    def vote_array(totals: Dict[str, int]) -> List[Dict[str, Any]]:
+        total = sum(totals.values())
+        return [
+            {
+                "candidate": candidate,
+                "votes": votes,
+                "percentage": (votes / total) * 100 if total > 0 else None,
+            }
+            for candidate, votes in sorted(
+                totals.items(), key=lambda item: (-item[1], item[0])
             )
+        ]
 
-            if existing_result:
-                # Update existing result
-                existing_result.image_url = image_url
-                existing_result.data = data_json
-                existing_result.timestamp = datetime.now(timezone.utc)
-                existing_result.is_reviewed = 0  # Reset review status
-                existing_result.reviewer = None
-                db_result = existing_result
-                logger.info(f"Updated existing result with ID: {db_result.id}")
-            else:
-                # Create new result
-                db_result = Result(
-                    image_url=image_url,
-                    electorate=tally_data.get("electorate"),
-                    booth_name=result["booth_name"] or tally_data.get("booth_name"),
-                    data=data_json,
-                )
-                db.add(db_result)
-                logger.info(f"Created new result with ID: {db_result.id}")
+    for division_summary in summaries.values():
+        division_summary["primary_votes"] = vote_array(
+            division_summary["primary_votes"]
+        )
+        division_summary["tcp_votes"] = vote_array(division_summary["tcp_votes"])
+    return dict(sorted(summaries.items()))
 
-            db.commit()
-            db.refresh(db_result)
 
-            # Notify Flask app if needed
-            try:
-                logger.info(f"Notifying Flask app at {FLASK_APP_URL}")
-                async with httpx.AsyncClient() as client:
-                    response = await client.post(
-                        FLASK_APP_URL,
-                        json={
-                            "result_id": db_result.id,
-                            "timestamp": db_result.timestamp.isoformat(),
-                            "electorate": tally_data.get("electorate"),
-                            "booth_name": result["booth_name"]
-                            or tally_data.get("booth_name"),
-                        },
-                    )
-                    logger.info(
-                        f"Flask app notification response: {response.status_code}"
-                    )
-            except Exception as notify_err:
-                logger.error(f"Failed to notify Flask app: {notify_err}")
+async def rebuild_division_tallies() -> None:
+    """Rebuild the division tally cache from the database."""
+    db = AsyncSessionLocal()
+    try:
+        versions = {
+            row.scope[len(DIVISION_SCOPE_PREFIX) :]: row.version
+            for row in await db.execute(SELECT_DIVISION_VERSIONS_SQL)
+        }
+        booths = await read_booth_tallies(db)
+    finally:
+        await db.close()
+    division_tallies.rebuild(booths, versions)
+    logger.info(f"Division tally cache rebuilt from {len(booths)} reviewed results")
 
-            return {
-                "status": "success",
-                "result_id": db_result.id,
-                "electorate": tally_data.get("electorate"),
-                "booth_name": result["booth_name"] or tally_data.get("booth_name"),
-                "primary_votes": tally_data.get("primary_votes"),
-                "two_candidate_preferred": tally_data.get("two_candidate_preferred"),
-                "totals": tally_data.get("totals"),
-            }
-        finally:
-            db.close()
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error processing image: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
+async def bump_result_versions(db, *divisions: Optional[str]) -> Dict[str, int]:
+    """
+    Bump the data versions for a change to results in the given divisions.
 
+    Must be called inside the session making the change, before commit. The
+    bump holds the version rows until commit, so the versions read back are
+    the ones this change commits as.
 
-@app.post("/inbound-sms")
-async def inbound_sms(
-    request: Request,
-    from_number: str = Form(..., alias="from"),
-    to_number: str = Form(..., alias="to"),
-    body: str = Form(...),
-    timestamp: str = Form(...),
-    media: str = Form(None),
-):
-    logger.info(f"Received SMS from {from_number} to {to_number} at {timestamp}")
-    logger.info(f"Message body: {body}")
-    logger.info(f"Media URL: {media}")
+    Returns:
+        {division: new version}, for update_division_tally
+    """
+    scopes = {division_scope(d): d for d in divisions if d}
+    await db.execute(BUMP_VERSION_SQL, bump_params([RESULTS_SCOPE, *scopes]))
+    if not scopes:
+        return {}
+    rows = await db.execute(SELECT_VERSIONS_SQL, {"scopes": list(scopes)})
+    return {scopes[row.scope]: row.version for row in rows}
 
-    # Determine the image URL
-    image_url = media
-    if not image_url:
-        # Extract URL from message body if no media parameter
-        url_match = re.search(r"https?://[^\s]+", body)
-        if url_match:
-            image_url = url_match.group(0)
-            logger.info(f"Extracted URL from message body: {image_url}")
-        else:
-            logger.error("No image URL found in message")
-            raise HTTPException(status_code=400, detail="No image URL found in message")
 
-    try:
-        # For AWS S3 URLs, we need to preserve the exact URL structure
-        if (
-            "s3.amazonaws.com" in image_url
-            or "s3.ap-southeast-2.amazonaws.com" in image_url
-        ):
-            # Clean the URL by removing any non-printable characters but preserve the structure
-            cleaned_url = "".join(c for c in image_url if c.isprintable())
-            logger.info(f"Using cleaned S3 URL: {cleaned_url}")
+async def log_result_changes(
+    db, results: List[Tuple[int, Optional[str]]], deleted: bool = False
+) -> None:
+    """
+    Log saved or deleted results for the /results/changes feed.
 
-            # Download the image
-            async with httpx.AsyncClient() as client:
-                response = await client.get(cleaned_url)
-                response.raise_for_status()
-                image_data = response.content
-        else:
-            # For non-S3 URLs, we can use standard URL parsing
-            parsed_url = urllib.parse.urlparse(image_url)
-            encoded_url = urllib.parse.urlunparse(
-                (
-                    parsed_url.scheme,
-                    parsed_url.netloc,
-                    parsed_url.path,
-                    parsed_url.params,
-                    parsed_url.query,
-                    parsed_url.fragment,
-                )
+    Must be called after bump_result_versions, inside the same session. The
+    changes are logged under the new results version as their sequence
+    number; the bump holds that version's row until commit, so sequence
+    numbers become visible in order.
+
+    Args:
+        db: Async session
+        results: (result id, electorate) pairs
+        deleted: Whether the results were deleted
+    """
+    if not results:
+        return
+    seq = (
+        await db.execute(
+            select(DataVersion.version).where(DataVersion.scope == RESULTS_SCOPE)
+        )
+    ).scalar_one()
+    changed_at = datetime.now(timezone.utc).isoformat()
+    db.add_all(
+        [
+            ResultChange(
+                seq=seq,
+                result_id=result_id,
+                electorate=electorate,
+                deleted=int(deleted),
+                changed_at=changed_at,
             )
-            logger.info(f"Using encoded URL: {encoded_url}")
+            for result_id, electorate in results
+        ]
+    )
 
-            # Download the image
-            async with httpx.AsyncClient() as client:
-                response = await client.get(encoded_url)
-                response.raise_for_status()
-                image_data = response.content
 
-        # Process the image
-        result = await image_processor.process_sms_image(image_url)
+async def read_data_versions(
+    db, scopes: List[str]
+) -> Tuple[str, Dict[str, Dict[str, Any]]]:
+    """
+    Read the versions of the data a response depends on.
 
-        # Save to database
-        db = SessionLocal()
-        try:
-            data_json = json.dumps(
-                {
-                    "raw_rows": result["extracted_rows"],
-                    "primary_votes": result.get("primary_votes", {}),
-                    "two_candidate_preferred": result.get(
-                        "two_candidate_preferred", {}
-                    ),
-                    "totals": result.get("totals", {}),
-                    "text": body,
-                    "from_number": from_number,
-                    "to_number": to_number,
-                    "timestamp": timestamp,
-                    "media_url": image_url,
-                }
-            )
+    Read them before the data itself: a write landing in between then leaves
+    the response with an older tag, which just fails the next revalidation.
 
-            # Check for existing result for this booth
-            existing_result = (
-                db.query(Result)
-                .filter_by(
-                    electorate=result.get("electorate", "Warringah"),
-                    booth_name=result.get("booth_name", "Unknown Booth"),
-                )
-                .first()
-            )
+    Returns:
+        Tuple of (strong ETag, {scope: {"version", "updated_at"}})
+    """
+    versions = {
+        row.scope: {"version": row.version, "updated_at": row.updated_at}
+        for row in await db.execute(SELECT_VERSIONS_SQL, {"scopes": scopes})
+    }
+    return make_etag(scopes, versions), versions
 
-            if existing_result:
-                # Update existing result
-                existing_result.image_url = image_url
-                existing_result.data = data_json
-                existing_result.timestamp = datetime.now(timezone.utc)
-                existing_result.is_reviewed = 0  # Reset review status
-                existing_result.reviewer = None
-                db_result = existing_result
-                logger.info(f"Updated existing result with ID: {db_result.id}")
-            else:
-                # Create new result
-                db_result = Result(
-                    image_url=image_url,
-                    electorate=result.get("electorate", "Warringah"),
-                    booth_name=result.get("booth_name", "Unknown Booth"),
-                    data=data_json,
-                )
-                db.add(db_result)
-                logger.info(f"Created new result with ID: {db_result.id}")
 
-            db.commit()
-            db.refresh(db_result)
-            logger.info(f"Saved SMS result to database with ID: {db_result.id}")
+def not_modified(
+    request: Request, response: Response, etag: str
+) -> Optional[Response]:
+    """
+    Tag a response with its ETag and check the client's cached copy.
 
-            # Notify Flask app
-            try:
-                logger.info(f"Notifying Flask app at {FLASK_APP_URL}")
-                async with httpx.AsyncClient() as client:
-                    await client.post(
-                        FLASK_APP_URL,
-                        json={
-                            "result_id": db_result.id,
-                            "timestamp": db_result.timestamp.isoformat(),
-                            "electorate": db_result.electorate,
-                            "booth_name": db_result.booth_name,
-                        },
-                    )
-            except Exception as notify_err:
-                logger.error(f"Failed to notify Flask app: {notify_err}")
+    Returns:
+        A 304 response if the client's If-None-Match matches, otherwise None
+    """
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    response.headers.update(headers)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return None
 
-            return {
-                "status": "success",
-                "result_id": db_result.id,
-                "electorate": db_result.electorate,
-                "booth_name": db_result.booth_name,
-                "primary_votes": result.get("primary_votes", {}),
-                "two_candidate_preferred": result.get("two_candidate_preferred", {}),
-                "totals": result.get("totals", {}),
-            }
-        finally:
-            db.close()
-    except Exception as e:
-        logger.error(f"Error processing image: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
 
+def invalidate_cached_responses(scopes: List[str]) -> None:
+    """Drop cached responses built from data that has just changed."""
+    response_cache.invalidate(*scopes)
 
-@app.get("/admin/load-reference-data")
-async def load_reference_data():
+
+add_change_listener(invalidate_cached_responses)
+
+
+def reset_reference_indexes(scopes: List[str]) -> None:
     """
-    Master admin endpoint to load all reference data (candidates, polling booths, 2022 results)
+    Drop in-memory reference indexes straight away after a reload here.
+
+    The booth index and projection baseline are keyed on the reference data
+    version, so reloads made by other processes are picked up when the
+    version is next read.
     """
-    try:
-        logger.info("Loading all reference data...")
+    if REFERENCE_SCOPE in scopes:
+        booth_index.clear()
+        projection_baselines.clear()
 
-        import sys
-        import os
-        from pathlib import Path
-        from sqlalchemy import text
 
-        # Get the parent directory of the current file's directory
-        parent_dir = str(Path(__file__).parent.parent)
-        if parent_dir not in sys.path:
-            logger.info(f"Adding parent directory to Python path: {parent_dir}")
-            sys.path.append(parent_dir)
+add_change_listener(reset_reference_indexes)
 
-        logger.info(f"Current directory: {os.getcwd()}")
-        logger.info(f"Parent directory: {parent_dir}")
-        logger.info(f"Files in parent directory: {os.listdir(parent_dir)}")
+
+async def read_reference_version(db) -> int:
+    """Get the current version of the reference data."""
+    _, versions = await read_data_versions(db, [REFERENCE_SCOPE])
+    return versions.get(REFERENCE_SCOPE, {}).get("version", 0)
+
+
+async def match_booth(
+    db, division: Optional[str], booth_name: Optional[str]
+) -> Tuple[Optional[BoothMatch], List[BoothMatch]]:
+    """
+    Match a booth name read from a tally sheet to the division's polling places.
+
+    Returns:
+        Tuple of (polling place to use as the AEC booth, or None if no match
+        is good enough; candidate matches for reviewers)
+    """
+    if not division or not booth_name:
+        return None, []
+    version = await read_reference_version(db)
+    index = booth_index.get(division, version)
+    if index is None:
+        polling_places = (
+            await db.execute(
+                select(
+                    PollingPlace.polling_place_id, PollingPlace.polling_place_name
+                ).where(PollingPlace.division_name == division)
+            )
+        ).all()
+        index = booth_index.install(division, polling_places, version)
+    return booth_index.resolve(index, booth_name)
+
+
+async def get_linked_result(db, scan: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Get the result already saved from a scanned image, if it was seen before.
+
+    Args:
+        db: Database session
+        scan: The image processor's output, with the linked result id, if any
+
+    Returns:
+        The existing result's id, booth, matches and votes, or None if the
+        image is new or its result has since been deleted
+    """
+    if scan.get("result_id") is None:
+        return None
+    db_result = await db.get(Result, scan["result_id"])
+    if not db_result:
+        return None
+    data = json.loads(db_result.data) if db_result.data else {}
+    _, booth_matches = await match_booth(
+        db, db_result.electorate, db_result.booth_name
+    )
+    return {
+        "result_id": db_result.id,
+        "electorate": db_result.electorate,
+        "booth_name": db_result.booth_name,
+        "aec_booth_name": db_result.aec_booth_name,
+        "booth_matches": [match.as_dict() for match in booth_matches],
+        "primary_votes": data.get("primary_votes"),
+        "two_candidate_preferred": data.get("two_candidate_preferred"),
+        "totals": data.get("totals"),
+        "duplicate": True,
+    }
+
+
+async def serve_cached(request: Request, scopes: List[str], build) -> Response:
+    """
+    Serve a read-only response from the response cache.
+
+    The cache is keyed on the path and query parameters and holds the
+    serialized body with its ETag. The versions of ``scopes`` are read on
+    every request, so an entry is only served while its ETag is current,
+    whichever process changed the data. On a miss ``build(db)`` produces the
+    payload; only successful payloads are cached.
+
+    Args:
+        request: The incoming request
+        scopes: Data version scopes the response depends on
+        build: Async callable taking a session and returning the payload
+
+    Returns:
+        The cached or freshly built response, or a 304 if the client's copy
+        is current
+    """
+    key = request.url.path
+    if request.query_params:
+        key += "?" + urllib.parse.urlencode(sorted(request.query_params.multi_items()))
+    headers = {"Cache-Control": f"public, max-age={RESPONSE_CACHE_MAX_AGE_SECONDS}"}
+
+    db = AsyncSessionLocal()
+    try:
+        etag, _ = await read_data_versions(db, scopes)
+        headers["ETag"] = etag
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        entry = response_cache.get(key, etag)
+        if entry is None:
+            generation = response_cache.generation()
+            payload = await build(db)
+            body = dumps(payload)
+            if payload.get("status") != "success":
+                return Response(body, media_type="application/json")
+            entry = response_cache.put(key, body, etag, scopes, generation)
+    finally:
+        await db.close()
+    return Response(entry.body, media_type="application/json", headers=headers)
+
+
+def update_division_tally(
+    result: Result, data: Optional[Dict[str, Any]], versions: Dict[str, int]
+) -> None:
+    """
+    Apply a committed change to a result to the division tally cache.
+
+    Reviewed results replace their booth's counts; anything else is taken
+    out of the totals. ``versions`` are the division versions the change
+    committed as, from bump_result_versions. If the cache can't be updated
+    it is cleared so the divisions reload from the database. Cached
+    responses that depend on results are dropped either way.
+    """
+    notify_changed([RESULTS_SCOPE])
+    try:
+        if result.is_reviewed:
+            division_tallies.upsert(
+                result.electorate, BoothTally.from_result(result, data), versions
+            )
+        else:
+            division_tallies.remove([result.id], versions)
+    except Exception as e:
+        logger.error(f"Failed to update division tally for result {result.id}: {e}")
+        division_tallies.clear()
+
+
+@app.get("/test")
+async def test_endpoint():
+    """
+    Simple test endpoint to verify API is working
+    """
+    return {"status": "ok", "message": "API is working"}
+
+
+@app.get("/health")
+async def health_check():
+    """Health check endpoint for connectivity testing"""
+    return {"status": "ok"}
+
+
+SCAN_IMAGE_JOB = "scan_image"
+# Workers scanning uploaded images in this process; 0 leaves the queue to
+# other processes
+SCAN_WORKERS = int(os.environ.get("SCAN_WORKERS", "2"))
+
+
+async def process_scanned_image(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Scan a queued tally sheet image and save the result.
+
+    Args:
+        payload: The scan job payload: the uploaded file name and the name of
+            the saved copy in the uploads directory
+
+    Returns:
+        The saved result's id, booth, matches and votes
+
+    Raises:
+        PermanentJobError: If the image cannot be decoded or has no table any
+            engine can read, so scanning it again would fail the same way
+    """
+    filename = payload["filename"]
+    image_filename = payload["image_filename"]
+    contents = (uploads_dir / image_filename).read_bytes()
+
+    # Process the image using the shared processor
+    try:
+        result = await image_processor.process_image(contents, source="upload")
+    except HTTPException as e:
+        if e.status_code == 400:
+            raise PermanentJobError(e.detail) from e
+        raise
+    except NoTableFound as e:
+        raise PermanentJobError(f"No table found: {e}") from e
+    except OCRUnavailable as e:
+        if not e.transient:
+            raise PermanentJobError(f"OCR failed: {e}") from e
+        raise
+
+    db = AsyncSessionLocal()
+    try:
+        linked = await get_linked_result(db, result)
+    finally:
+        await db.close()
+    if linked:
+        logger.info(f"{filename} was already saved as result {linked['result_id']}")
+        return linked
+
+    # Now pass extracted_rows to your existing extract_tally_sheet_data function
+    tally_data = extract_tally_sheet_data(
+        result["extracted_rows"], result.get("booth_name", None)
+    )
+    logger.info(
+        f"Extracted tally data from {filename}: electorate={tally_data.get('electorate')}, booth={tally_data.get('booth_name')}"
+    )
+
+    # Save to database
+    db = AsyncSessionLocal()
+    try:
+        # Use the FastAPI endpoint URL
+        image_url = f"/uploads/{image_filename}"
+
+        booth_match, booth_matches = await match_booth(
+            db,
+            tally_data.get("electorate"),
+            result["booth_name"] or tally_data.get("booth_name"),
+        )
+        result_data = {
+            "raw_rows": result["extracted_rows"],
+            "primary_votes": tally_data.get("primary_votes"),
+            "two_candidate_preferred": tally_data.get("two_candidate_preferred"),
+            "totals": tally_data.get("totals"),
+            "booth_match": booth_match.as_dict() if booth_match else None,
+        }
+        data_json = json.dumps(result_data)
+
+        # Check for existing result for this booth
+        existing_result = (
+            await db.execute(
+                select(Result).filter_by(
+                    electorate=tally_data.get("electorate"),
+                    booth_name=result["booth_name"] or tally_data.get("booth_name"),
+                )
+            )
+        ).scalars().first()
+
+        if existing_result:
+            # Update existing result
+            existing_result.image_url = image_url
+            existing_result.data = data_json
+            # Naive UTC like the column default; PostgreSQL TIMESTAMP rejects aware values
+            existing_result.timestamp = datetime.utcnow()
+            existing_result.is_reviewed = 0  # Reset review status
+            existing_result.reviewer = None
+            db_result = existing_result
+            logger.info(f"Updated existing result with ID: {db_result.id}")
+        else:
+            # Create new result
+            db_result = Result(
+                image_url=image_url,
+                electorate=tally_data.get("electorate"),
+                booth_name=result["booth_name"] or tally_data.get("booth_name"),
+                data=data_json,
+            )
+            db.add(db_result)
+            logger.info(f"Created new result with ID: {db_result.id}")
+        if booth_match:
+            db_result.aec_booth_name = booth_match.polling_place_name
+
+        await sync_result_votes(db, db_result, result_data)
+        versions = await bump_result_versions(db, db_result.electorate)
+        await log_result_changes(db, [(db_result.id, db_result.electorate)])
+        await db.commit()
+        await db.refresh(db_result)
+        update_division_tally(db_result, result_data, versions)
+        image_processor.link_result(result.get("image_sha256"), db_result.id)
+
+        # Notify Flask app in the background
+        notifier.notify(
+            {
+                "result_id": db_result.id,
+                "timestamp": db_result.timestamp.isoformat(),
+                "electorate": tally_data.get("electorate"),
+                "booth_name": result["booth_name"] or tally_data.get("booth_name"),
+            }
+        )
+
+        return {
+            "result_id": db_result.id,
+            "electorate": tally_data.get("electorate"),
+            "booth_name": result["booth_name"] or tally_data.get("booth_name"),
+            "aec_booth_name": db_result.aec_booth_name,
+            "booth_matches": [match.as_dict() for match in booth_matches],
+            "primary_votes": tally_data.get("primary_votes"),
+            "two_candidate_preferred": tally_data.get("two_candidate_preferred"),
+            "totals": tally_data.get("totals"),
+        }
+    finally:
+        await db.close()
+
+
+job_queue = JobQueue(lambda: AsyncSessionLocal())
+scan_workers = WorkerPool(
+    job_queue, {SCAN_IMAGE_JOB: process_scanned_image}, workers=SCAN_WORKERS
+)
+
+
+@app.post("/scan-image", status_code=202)
+async def scan_image(file: UploadFile = File(...)):
+    """
+    Queue an uploaded tally sheet image for scanning.
+
+    The image is saved and a scan job queued straight away; poll
+    /jobs/{job_id} for the result. Scanning extracts the table and booth name
+    using Amazon Textract.
+    """
+    try:
+        logger.info(f"Received image upload: {file.filename}")
+        contents = await file.read()
+
+        # Store the image in the uploads directory
+        image_filename = f"{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}_{file.filename}"
+        with open(uploads_dir / image_filename, "wb") as f:
+            f.write(contents)
+
+        job = await job_queue.enqueue(
+            SCAN_IMAGE_JOB,
+            {"filename": file.filename, "image_filename": image_filename},
+        )
+        scan_workers.wake()
+        logger.info(f"Queued scan job {job.id} for {image_filename}")
+
+        return {
+            "status": "queued",
+            "job_id": job.id,
+            "status_url": f"/jobs/{job.id}",
+        }
+    except Exception as e:
+        logger.error(f"Error queueing image: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: int):
+    """
+    Get the status of a background job, with its result once it succeeded.
+
+    Status is queued, running, succeeded or dead (out of attempts).
+    """
+    try:
+        job = await job_queue.get(job_id)
+        if not job:
+            raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+        return {"status": "success", "job": job.as_dict()}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting job {job_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/admin/jobs/{job_id}/retry")
+async def retry_job(job_id: int):
+    """Requeue a dead job with a fresh set of attempts."""
+    try:
+        job = await job_queue.requeue(job_id)
+        if not job:
+            raise HTTPException(
+                status_code=400, detail=f"Job {job_id} is not a dead job"
+            )
+        scan_workers.wake()
+        return {"status": "success", "job": job.as_dict()}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error retrying job {job_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/inbound-sms")
+async def inbound_sms(
+    request: Request,
+    from_number: str = Form(..., alias="from"),
+    to_number: str = Form(..., alias="to"),
+    body: str = Form(...),
+    timestamp: str = Form(...),
+    media: str = Form(None),
+):
+    logger.info(f"Received SMS from {from_number} to {to_number} at {timestamp}")
+    logger.info(f"Message body: {body}")
+    logger.info(f"Media URL: {media}")
+
+    # Determine the image URL
+    image_url = media
+    if not image_url:
+        # Extract URL from message body if no media parameter
+        url_match = re.search(r"https?://[^\s]+", body)
+        if url_match:
+            image_url = url_match.group(0)
+            logger.info(f"Extracted URL from message body: {image_url}")
+        else:
+            logger.error("No image URL found in message")
+            raise HTTPException(status_code=400, detail="No image URL found in message")
+
+    try:
+        # For AWS S3 URLs, we need to preserve the exact URL structure
+        if (
+            "s3.amazonaws.com" in image_url
+            or "s3.ap-southeast-2.amazonaws.com" in image_url
+        ):
+            # Clean the URL by removing any non-printable characters but preserve the structure
+            cleaned_url = "".join(c for c in image_url if c.isprintable())
+            logger.info(f"Using cleaned S3 URL: {cleaned_url}")
+            fetch_url = cleaned_url
+        else:
+            # For non-S3 URLs, we can use standard URL parsing
+            parsed_url = urllib.parse.urlparse(image_url)
+            encoded_url = urllib.parse.urlunparse(
+                (
+                    parsed_url.scheme,
+                    parsed_url.netloc,
+                    parsed_url.path,
+                    parsed_url.params,
+                    parsed_url.query,
+                    parsed_url.fragment,
+                )
+            )
+            logger.info(f"Using encoded URL: {encoded_url}")
+            fetch_url = encoded_url
+
+        # Download the image once and process it
+        result = await image_processor.process_sms_image(fetch_url, http_client.get())
+
+        # Save to database
+        db = AsyncSessionLocal()
+        try:
+            linked = await get_linked_result(db, result)
+            if linked:
+                logger.info(
+                    f"SMS image was already saved as result {linked['result_id']}"
+                )
+                return {"status": "success", **linked}
+
+            booth_match, booth_matches = await match_booth(
+                db,
+                result.get("electorate", "Warringah"),
+                result.get("booth_name", "Unknown Booth"),
+            )
+            result_data = {
+                "raw_rows": result["extracted_rows"],
+                "primary_votes": result.get("primary_votes", {}),
+                "two_candidate_preferred": result.get("two_candidate_preferred", {}),
+                "totals": result.get("totals", {}),
+                "text": body,
+                "from_number": from_number,
+                "to_number": to_number,
+                "timestamp": timestamp,
+                "media_url": image_url,
+                "booth_match": booth_match.as_dict() if booth_match else None,
+            }
+            data_json = json.dumps(result_data)
+
+            # Check for existing result for this booth
+            existing_result = (
+                await db.execute(
+                    select(Result).filter_by(
+                        electorate=result.get("electorate", "Warringah"),
+                        booth_name=result.get("booth_name", "Unknown Booth"),
+                    )
+                )
+            ).scalars().first()
+
+            if existing_result:
+                # Update existing result
+                existing_result.image_url = image_url
+                existing_result.data = data_json
+                existing_result.timestamp = datetime.utcnow()
+                existing_result.is_reviewed = 0  # Reset review status
+                existing_result.reviewer = None
+                db_result = existing_result
+                logger.info(f"Updated existing result with ID: {db_result.id}")
+            else:
+                # Create new result
+                db_result = Result(
+                    image_url=image_url,
+                    electorate=result.get("electorate", "Warringah"),
+                    booth_name=result.get("booth_name", "Unknown Booth"),
+                    data=data_json,
+                )
+                db.add(db_result)
+                logger.info(f"Created new result with ID: {db_result.id}")
+            if booth_match:
+                db_result.aec_booth_name = booth_match.polling_place_name
+
+            await sync_result_votes(db, db_result, result_data)
+            versions = await bump_result_versions(db, db_result.electorate)
+            await log_result_changes(db, [(db_result.id, db_result.electorate)])
+            await db.commit()
+            await db.refresh(db_result)
+            update_division_tally(db_result, result_data, versions)
+            image_processor.link_result(result.get("image_sha256"), db_result.id)
+            logger.info(f"Saved SMS result to database with ID: {db_result.id}")
+
+            # Notify Flask app in the background
+            notifier.notify(
+                {
+                    "result_id": db_result.id,
+                    "timestamp": db_result.timestamp.isoformat(),
+                    "electorate": db_result.electorate,
+                    "booth_name": db_result.booth_name,
+                }
+            )
+
+            return {
+                "status": "success",
+                "result_id": db_result.id,
+                "electorate": db_result.electorate,
+                "booth_name": db_result.booth_name,
+                "aec_booth_name": db_result.aec_booth_name,
+                "booth_matches": [match.as_dict() for match in booth_matches],
+                "primary_votes": result.get("primary_votes", {}),
+                "two_candidate_preferred": result.get("two_candidate_preferred", {}),
+                "totals": result.get("totals", {}),
+            }
+        finally:
+            await db.close()
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error processing image: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/admin/load-reference-data")
+async def load_reference_data():
+    """
+    Master admin endpoint to load all reference data (candidates, polling booths, 2022 results)
+    """
+    try:
+        logger.info("Loading all reference data...")
+
+        import sys
+        import os
+        from pathlib import Path
+        from sqlalchemy import text
+
+        # Get the parent directory of the current file's directory
+        parent_dir = str(Path(__file__).parent.parent)
+        if parent_dir not in sys.path:
+            logger.info(f"Adding parent directory to Python path: {parent_dir}")
+            sys.path.append(parent_dir)
+
+        logger.info(f"Current directory: {os.getcwd()}")
+        logger.info(f"Parent directory: {parent_dir}")
+        logger.info(f"Files in parent directory: {os.listdir(parent_dir)}")
 
         if os.path.exists("/.dockerenv"):
             import shutil
@@ -707,20 +1495,20 @@ async def load_reference_data():
 
             # Load candidate data
             logger.info("Loading candidate data...")
-            candidates_result = download_and_process_aec_data()
+            candidates_result = await run_in_threadpool(download_and_process_aec_data)
 
             # Load booth results
             logger.info("Loading booth results...")
-            booth_results = process_and_load_booth_results()
+            booth_results = await run_in_threadpool(process_and_load_booth_results)
 
             # Get the current count of polling places
             logger.info("Getting polling places count...")
-            db = SessionLocal()
+            db = AsyncSessionLocal()
             try:
-                result = db.execute(text("SELECT COUNT(*) FROM polling_places"))
+                result = await db.execute(text("SELECT COUNT(*) FROM polling_places"))
                 polling_places_count = result.scalar() or 0
             finally:
-                db.close()
+                await db.close()
 
             return {
                 "status": "success",
@@ -731,6 +1519,7 @@ async def load_reference_data():
                     "polling_places_loaded": True,
                     "polling_places_count": polling_places_count,
                 },
+                "load_report": [report.as_dict() for report in get_load_reports()],
             }
         except ImportError as ie:
             logger.error(f"Import error: {ie}")
@@ -746,8 +1535,69 @@ async def load_reference_data():
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/admin/booth-matches/division/{division}")
+async def get_booth_matches(division: str, name: str):
+    """
+    Get the polling places in a division that best match a booth name
+    """
+    try:
+        db = AsyncSessionLocal()
+        try:
+            booth_match, booth_matches = await match_booth(db, division, name)
+        finally:
+            await db.close()
+        return {
+            "status": "success",
+            "match": booth_match.as_dict() if booth_match else None,
+            "matches": [match.as_dict() for match in booth_matches],
+        }
+    except Exception as e:
+        logger.error(f"Error matching booth {name} in division {division}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/admin/response-cache")
+async def get_response_cache_stats():
+    """
+    Get hit/miss counters for the reference-data response cache
+    """
+    return {"status": "success", "response_cache": response_cache.stats()}
+
+
+@app.get("/admin/ocr-cache")
+async def get_ocr_cache_stats():
+    """
+    Get size and hit/miss counters for the cache of Textract results
+    """
+    return {"status": "success", "ocr_cache": image_processor.cache.stats()}
+
+
+@app.get("/admin/notifications")
+async def get_notification_stats():
+    """
+    Get queue depth, delivery counters and latency for Flask notifications
+    """
+    return {"status": "success", "notifications": notifier.stats()}
+
+
+@app.get("/admin/ocr")
+async def get_ocr_stats():
+    """
+    Get call counters and circuit breaker state for each OCR engine
+    """
+    return {"status": "success", "ocr": image_processor.ocr.stats()}
+
+
+@app.get("/admin/textract")
+async def get_textract_stats():
+    """
+    Get queue depth, concurrency and throttling counters for Textract calls
+    """
+    return {"status": "success", "textract": image_processor.textract.stats()}
+
+
 @app.get("/admin/polling-places/division/{division}")
-async def get_admin_polling_places(division: str):
+async def get_admin_polling_places(division: str, request: Request):
     """
     Get polling places for a specific division (admin endpoint)
     """
@@ -763,186 +1613,457 @@ async def get_admin_polling_places(division: str):
 
         from common.booth_results_processor import get_polling_places_for_division
 
-        polling_places = get_polling_places_for_division(division)
-        logger.info(
-            f"Retrieved {len(polling_places)} polling places for division {division}"
-        )
+        async def build(db):
+            polling_places = await run_in_threadpool(
+                get_polling_places_for_division, division
+            )
+            logger.info(
+                f"Retrieved {len(polling_places)} polling places for division {division}"
+            )
 
-        return {
-            "status": "success",
-            "polling_places": [
-                {
-                    "id": p["id"],
-                    "polling_place_id": p["polling_place_id"],
-                    "polling_place_name": p["polling_place_name"],
-                    "address": p["address"],
-                    "status": p["status"],
-                    "wheelchair_access": p["wheelchair_access"],
-                    "data": json.loads(p["data"]) if p["data"] else {},
-                }
-                for p in polling_places
-            ],
-        }
+            return {
+                "status": "success",
+                "polling_places": [
+                    {
+                        "id": p["id"],
+                        "polling_place_id": p["polling_place_id"],
+                        "polling_place_name": p["polling_place_name"],
+                        "address": p["address"],
+                        "status": p["status"],
+                        "wheelchair_access": p["wheelchair_access"],
+                        "data": raw_json(p["data"], {}),
+                    }
+                    for p in polling_places
+                ],
+            }
+
+        return await serve_cached(request, [REFERENCE_SCOPE], build)
     except Exception as e:
         logger.error(f"Error getting polling places for division {division}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def read_tcp_candidates(
+    db, division_name: Optional[str] = None
+) -> Dict[str, List[TCPCandidate]]:
+    """Read the TCP candidates of one or every division in the order they were set."""
+    tcp_names = defaultdict(list)
+    query = select(TCPCandidate).order_by(TCPCandidate.id)
+    if division_name:
+        query = query.where(TCPCandidate.electorate == division_name)
+    for tcp_candidate in (await db.execute(query)).scalars():
+        tcp_names[tcp_candidate.electorate].append(tcp_candidate)
+    return tcp_names
+
+
+def tcp_name_pair(
+    candidates: List[TCPCandidate],
+) -> Tuple[Tuple[str, str], Tuple[str, str]]:
+    """
+    Get a division's TCP candidate names.
+
+    Returns:
+        Tuple of (names to report, defaulting to generic terms if not set;
+        names to compute swings with, which include the party so Liberal
+        candidates are matched on name or party)
+    """
+    candidates = candidates[:2]
+    names = [c.candidate_name for c in candidates]
+    names += ["TCP Candidate 1", "TCP Candidate 2"][len(names) :]
+    if len(candidates) < 2:
+        return tuple(names), tuple(names)
+    return tuple(names), tuple(
+        f"{c.candidate_name} ({c.party})" if c.party else c.candidate_name
+        for c in candidates
+    )
+
+
+async def read_result_tcp_votes(
+    db, results: List[Result], tcp_names: Dict[str, List[TCPCandidate]], condition
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Read the votes for each result's two TCP candidates.
+
+    Args:
+        db: Async session
+        results: Results to read votes for
+        tcp_names: TCP candidates by division, see read_tcp_candidates
+        condition: Filter on Result matching at least the given results
+
+    Returns:
+        Tuple of (TCP candidate 1 votes, TCP candidate 2 votes) aligned with
+        results, NaN where the division has no TCP pair or the result has no
+        votes for one of them
+    """
+    # Sum each result's TCP votes per TCP candidate in SQL
+    tcp_totals = defaultdict(dict)
+    for result_id, tcp_candidate, votes in await db.execute(
+        select(
+            ResultTCPVote.result_id,
+            ResultTCPVote.tcp_candidate,
+            func.sum(ResultTCPVote.votes),
+        )
+        .join(Result, Result.id == ResultTCPVote.result_id)
+        .where(condition)
+        .group_by(ResultTCPVote.result_id, ResultTCPVote.tcp_candidate)
+    ):
+        tcp_totals[result_id][tcp_candidate] = votes or 0
+
+    tcp1_votes = np.full(len(results), np.nan)
+    tcp2_votes = np.full(len(results), np.nan)
+    for n, result in enumerate(results):
+        candidates = tcp_names.get(result.electorate, [])
+        result_tcp = tcp_totals.get(result.id, {})
+        if len(candidates) >= 2 and all(
+            c.candidate_name in result_tcp for c in candidates[:2]
+        ):
+            tcp1_votes[n] = result_tcp[candidates[0].candidate_name]
+            tcp2_votes[n] = result_tcp[candidates[1].candidate_name]
+    return tcp1_votes, tcp2_votes
+
+
+async def read_projection_baseline(db) -> ProjectionBaseline:
+    """Get the 2022 booth results for projections, loading them if needed."""
+    version = await read_reference_version(db)
+    baseline = projection_baselines.get(version)
+    if baseline is None:
+        booths = await db.execute(
+            text(
+                "SELECT division_name, polling_place_name, "
+                "liberal_national_percentage, total_votes FROM booth_results_2022"
+            )
+        )
+        baseline = projection_baselines.install(
+            ProjectionBaseline(booths.all()), version
+        )
+    return baseline
+
+
+async def project_divisions(
+    db, division_name: Optional[str] = None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Project final TCP results from the reviewed booths counted so far.
+
+    Counted booths are matched to 2022 booths by AEC booth name (or booth
+    name), and every division is projected in one vectorized pass, see
+    common.seat_projection.
+
+    Args:
+        db: Async session
+        division_name: Division to project, or None for every division with
+            2022 booth results
+
+    Returns:
+        {division: projection payload}
+    """
+    baseline = await read_projection_baseline(db)
+    tcp_names = await read_tcp_candidates(db, division_name)
+    reviewed = (Result.is_reviewed == 1) & (
+        Result.electorate == division_name if division_name else True
+    )
+    results = (
+        (await db.execute(select(Result).where(reviewed).order_by(Result.id)))
+        .scalars()
+        .all()
+    )
+    tcp1_votes, tcp2_votes = await read_result_tcp_votes(
+        db, results, tcp_names, reviewed
+    )
+    tcp1_pct, _ = tcp_percentages(tcp1_votes, tcp2_votes)
+
+    # Later results for the same booth replace earlier ones
+    current_pct1 = np.full(len(baseline), np.nan)
+    unmatched = defaultdict(int)
+    for n, result in enumerate(results):
+        if np.isnan(tcp1_pct[n]):
+            continue
+        booth_name = result.aec_booth_name or result.booth_name
+        booth = baseline.booths.get(
+            (result.electorate, booth_name.upper() if booth_name else None)
+        )
+        if booth is None:
+            unmatched[result.electorate] += 1
+        else:
+            current_pct1[booth] = tcp1_pct[n]
+
+    name_pairs = [
+        tcp_name_pair(tcp_names.get(division, [])) for division in baseline.divisions
+    ]
+    projection = project_tcp(
+        baseline, current_pct1, liberal_side([swing for _, swing in name_pairs]) == 0
+    )
+
+    def optional(value) -> Optional[float]:
+        return None if np.isnan(value) else round(float(value), 2)
+
+    def payload(division: str) -> Dict[str, Any]:
+        n = baseline.division_numbers.get(division)
+        if n is None:
+            # No 2022 booths to project from
+            names = tcp_name_pair(tcp_names.get(division, []))[0]
+            projected = swing = None
+            booths_counted = total_booths = 0
+            counted_share = 0.0
+        else:
+            names = name_pairs[n][0]
+            projected = optional(projection["projected_pct1"][n])
+            swing = optional(projection["swing"][n])
+            booths_counted = int(projection["booths_counted"][n])
+            total_booths = int(projection["total_booths"][n])
+            counted_share = optional(projection["counted_share"][n])
+        return {
+            "division": division,
+            "tcp_candidate_1_name": names[0],
+            "tcp_candidate_2_name": names[1],
+            "booths_counted": booths_counted,
+            "total_booths": total_booths,
+            "unmatched_results": unmatched.get(division, 0),
+            "counted_vote_share": counted_share,
+            "swing": swing,
+            "projected_tcp": (
+                {names[0]: projected, names[1]: round(100 - projected, 2)}
+                if projected is not None
+                else None
+            ),
+            "projected_winner": (
+                None
+                if projected is None or projected == 50
+                else names[0] if projected > 50 else names[1]
+            ),
+        }
+
+    if division_name:
+        return {division_name: payload(division_name)}
+    return {division: payload(division) for division in baseline.divisions}
+
+
+async def read_booth_swings(
+    db, division_name: Optional[str] = None, booth: Optional[str] = None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Read polling places with their current TCP results and swing since 2022.
+
+    Percentages and swings for every booth are computed in one vectorized
+    pass, see common.booth_swing.
+
+    Args:
+        db: Async session
+        division_name: Division to read, or None for every division
+        booth: Only include polling places with this name
+
+    Returns:
+        {division: booth results payload} for each division read
+    """
+
+    def in_division(column):
+        return column == division_name if division_name else True
+
+    polling_places = (
+        (
+            await db.execute(
+                select(PollingPlace)
+                .where(in_division(PollingPlace.division_name))
+                .order_by(PollingPlace.division_name, PollingPlace.polling_place_name)
+            )
+        )
+        .scalars()
+        .all()
+    )
+    if booth:
+        polling_places = [p for p in polling_places if p.polling_place_name == booth]
+
+    tcp_names = await read_tcp_candidates(db, division_name)
+    results = (
+        (
+            await db.execute(
+                select(Result)
+                .where(in_division(Result.electorate))
+                .order_by(Result.id)
+            )
+        )
+        .scalars()
+        .all()
+    )
+
+    tcp1_votes, tcp2_votes = await read_result_tcp_votes(
+        db, results, tcp_names, in_division(Result.electorate)
+    )
+
+    # Liberal/National share at each 2022 booth
+    liberal_2022 = {}
+    for division, polling_place_name, percentage in await db.execute(
+        text(
+            "SELECT division_name, polling_place_name, liberal_national_percentage "
+            "FROM booth_results_2022"
+            + (" WHERE division_name = :electorate" if division_name else "")
+        ),
+        {"electorate": division_name},
+    ):
+        liberal_2022[(division, polling_place_name.upper())] = percentage
+
+    divisions = sorted(
+        {p.division_name for p in polling_places}
+        | {r.electorate for r in results if r.electorate}
+        | ({division_name} if division_name else set())
+    )
+    division_numbers = {division: n for n, division in enumerate(divisions)}
+
+    name_pairs = [tcp_name_pair(tcp_names.get(division, [])) for division in divisions]
+    reported_names = [reported for reported, _ in name_pairs]
+    swing_names = [swing for _, swing in name_pairs]
+
+    # One row per result that can be matched to a booth
+    booth_keys = []
+    previous = np.full(len(results), np.nan)
+    result_divisions = np.zeros(len(results), dtype=np.intp)
+    for n, result in enumerate(results):
+        booth_name = result.aec_booth_name or result.booth_name
+        booth_keys.append(
+            (result.electorate, booth_name.upper())
+            if booth_name and result.electorate
+            else None
+        )
+        if booth_keys[-1] is None:
+            continue
+        result_divisions[n] = division_numbers[result.electorate]
+        percentage = liberal_2022.get(booth_keys[-1])
+        if percentage is not None:
+            previous[n] = percentage
+
+    tcp1_pct, tcp2_pct = tcp_percentages(tcp1_votes, tcp2_votes)
+    swings = tcp_swings(
+        tcp1_pct,
+        tcp2_pct,
+        100 - previous,
+        previous,
+        result_divisions,
+        swing_names,
+        [PREVIOUS_TCP_NAMES] * len(divisions),
+    )
+
+    def optional(value) -> Optional[float]:
+        return None if np.isnan(value) else float(value)
+
+    payloads = {
+        division: {
+            "tcp_candidate_1_name": reported_names[n][0],
+            "tcp_candidate_2_name": reported_names[n][1],
+            "results_map": {},
+            "booth_results": [],
+        }
+        for n, division in enumerate(divisions)
+    }
+
+    # Later results for the same booth replace earlier ones
+    booth_results = {}
+    for n, result in enumerate(results):
+        if booth_keys[n] is None:
+            continue
+        booth_results[booth_keys[n]] = n
+        payloads[result.electorate]["results_map"][booth_keys[n][1]] = {
+            "tcp_candidate_1_percentage": optional(tcp1_pct[n]),
+            "tcp_candidate_2_percentage": optional(tcp2_pct[n]),
+            "swing": optional(swings[n]),
+            "is_reviewed": result.is_reviewed,
+            "result_id": result.id,
+        }
+
+    for p in polling_places:
+        key = (p.division_name, p.polling_place_name.upper())
+        names = reported_names[division_numbers[p.division_name]]
+        percentage = liberal_2022.get(key)
+        n = booth_results.get(key)
+        payloads[p.division_name]["booth_results"].append(
+            {
+                "id": p.id,
+                "polling_place_id": p.polling_place_id,
+                "polling_place_name": p.polling_place_name,
+                "address": p.address,
+                "status": p.status,
+                "wheelchair_access": p.wheelchair_access,
+                "data": raw_json(p.data, {}),
+                # TCP data
+                "tcp_candidate_1_percentage": (
+                    optional(tcp1_pct[n]) if n is not None else None
+                ),
+                "tcp_candidate_2_percentage": (
+                    optional(tcp2_pct[n]) if n is not None else None
+                ),
+                "is_reviewed": results[n].is_reviewed if n is not None else 0,
+                "result_id": results[n].id if n is not None else None,
+                # 2022 TCP data
+                "tcp_2022": (
+                    {
+                        "tcp1_name": names[0],
+                        "tcp2_name": names[1],
+                        # TCP1 percentage is 100 - Liberal National percentage
+                        "tcp1_pct": 100 - percentage,
+                        "tcp2_pct": percentage,
+                    }
+                    if percentage is not None
+                    else None
+                ),
+                "swing": optional(swings[n]) if n is not None else None,
+            }
+        )
+    return payloads
+
+
 @app.get("/booth-results")
 async def get_booth_results(
+    request: Request,
+    response: Response,
     division: Optional[str] = None,
     electorate: Optional[str] = None,
     booth: Optional[str] = None,
+    national: bool = False,
 ):
     """
     Get polling places for a specific division/booth with TCP results between the actual TCP candidates
+    and the swing at each booth since 2022. With national=true every division is returned at once.
     """
+    # Use either division or electorate parameter
+    division_name = division or electorate
     try:
-        import sys
-        from pathlib import Path
-
-        # Get the parent directory of the current file's directory
-        parent_dir = str(Path(__file__).parent.parent)
-        if parent_dir not in sys.path:
-            logger.info(f"Adding parent directory to Python path: {parent_dir}")
-            sys.path.append(parent_dir)
-
-        from common.booth_results_processor import get_polling_places_for_division
-
-        # Use either division or electorate parameter
-        division_name = division or electorate
-        if not division_name:
+        if not division_name and not national:
             return {
                 "status": "error",
                 "message": "Division/electorate parameter is required",
             }
 
-        # Get polling places
-        polling_places = get_polling_places_for_division(division_name)
-        logger.info(
-            f"Retrieved {len(polling_places)} polling places for division {division_name}"
-        )
-
-        # Filter by booth if specified
-        if booth:
-            polling_places = [
-                p for p in polling_places if p["polling_place_name"] == booth
-            ]
-
-        # Get TCP candidates for this division
-        db = SessionLocal()
+        db = AsyncSessionLocal()
         try:
-            # Get current TCP candidates
-            tcp_candidates = (
-                db.query(TCPCandidate).filter_by(electorate=division_name).all()
+            scopes = (
+                [RESULTS_SCOPE, REFERENCE_SCOPE]
+                if national
+                else [division_scope(division_name), REFERENCE_SCOPE]
             )
+            etag, _ = await read_data_versions(db, scopes)
+            cached = not_modified(request, response, etag)
+            if cached:
+                return cached
 
-            # Get candidate names, defaulting to generic terms if not set
-            tcp_candidate_1_name = "TCP Candidate 1"
-            tcp_candidate_2_name = "TCP Candidate 2"
-
-            if len(tcp_candidates) >= 2:
-                tcp_candidate_1_name = tcp_candidates[0].candidate_name
-                tcp_candidate_2_name = tcp_candidates[1].candidate_name
-            elif len(tcp_candidates) == 1:
-                tcp_candidate_1_name = tcp_candidates[0].candidate_name
-
-            # Get results for this division
-            results = db.query(Result).filter_by(electorate=division_name).all()
-
-            # Create a mapping of booth names to results
-            results_map = {}
-            for result in results:
-                if result.aec_booth_name:
-                    booth_name = result.aec_booth_name.upper()
-                elif result.booth_name:
-                    booth_name = result.booth_name.upper()
-                else:
-                    continue
-
-                # Parse the result data
-                result_data = json.loads(result.data) if result.data else {}
-                tcp_data = result_data.get("two_candidate_preferred", {})
-
-                # Get TCP percentages
-                tcp_candidate_1_percentage = None
-                tcp_candidate_2_percentage = None
-
-                if tcp_data and len(tcp_candidates) >= 2:
-                    tcp1_name = tcp_candidates[0].candidate_name
-                    tcp2_name = tcp_candidates[1].candidate_name
-
-                    if tcp1_name in tcp_data and tcp2_name in tcp_data:
-                        tcp1_votes = sum(tcp_data[tcp1_name].values())
-                        tcp2_votes = sum(tcp_data[tcp2_name].values())
-                        total_votes = tcp1_votes + tcp2_votes
-
-                        if total_votes > 0:
-                            tcp_candidate_1_percentage = (
-                                tcp1_votes / total_votes
-                            ) * 100
-                            tcp_candidate_2_percentage = (
-                                tcp2_votes / total_votes
-                            ) * 100
-
-                results_map[booth_name] = {
-                    "tcp_candidate_1_percentage": tcp_candidate_1_percentage,
-                    "tcp_candidate_2_percentage": tcp_candidate_2_percentage,
-                    "swing": None,  # We'll calculate this later
-                    "is_reviewed": result.is_reviewed,
-                    "result_id": result.id,
-                }
-
-            # Get 2022 results for swing calculation
-            cursor = db.execute(
-                text(
-                    """
-                SELECT polling_place_name, 
-                       liberal_national_percentage
-                FROM booth_results_2022
-                WHERE division_name = :electorate
-            """
-                ),
-                {"electorate": division_name},
+            payloads = await read_booth_swings(
+                db, None if national else division_name, booth
             )
-            results_2022 = {
-                row[0]: {
-                    "tcp1_name": tcp_candidate_1_name,
-                    "tcp2_name": tcp_candidate_2_name,
-                    "tcp1_pct": 100
-                    - row[1],  # TCP1 percentage is 100 - Liberal National percentage
-                    "tcp2_pct": row[1],  # TCP2 is Liberal National percentage
-                }
-                for row in cursor.fetchall()
-            }
         finally:
-            db.close()
+            await db.close()
 
-        return {
-            "status": "success",
-            "tcp_candidate_1_name": tcp_candidate_1_name,
-            "tcp_candidate_2_name": tcp_candidate_2_name,
-            "results_map": results_map,
-            "booth_results": [
-                {
-                    "id": p["id"],
-                    "polling_place_id": p["polling_place_id"],
-                    "polling_place_name": p["polling_place_name"],
-                    "address": p["address"],
-                    "status": p["status"],
-                    "wheelchair_access": p["wheelchair_access"],
-                    "data": json.loads(p["data"]) if p["data"] else {},
-                    # TCP data
-                    "tcp_candidate_1_percentage": None,
-                    "tcp_candidate_2_percentage": None,
-                    "is_reviewed": 0,
-                    # 2022 TCP data
-                    "tcp_2022": results_2022.get(p["polling_place_name"], None),
-                    "swing": None,
-                }
-                for p in polling_places
-            ],
-        }
+        if national:
+            logger.info(f"Calculated booth swings for {len(payloads)} divisions")
+            return FastJSONResponse(
+                {"status": "success", "national": True, "divisions": payloads},
+                headers=response.headers,
+            )
+
+        payload = payloads[division_name]
+        logger.info(
+            f"Retrieved {len(payload['booth_results'])} polling places for division {division_name}"
+        )
+        return FastJSONResponse(
+            {"status": "success", **payload}, headers=response.headers
+        )
     except Exception as e:
         logger.error(f"Error getting booth results for division {division_name}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -1021,18 +2142,45 @@ async def reset_results(request: Request):
         booth_name = data.get("booth_name")
         all_results = data.get("all_results", False)
 
-        db = SessionLocal()
+        db = AsyncSessionLocal()
         try:
             if all_results:
-                db.query(Result).delete()
+                deleted = (await db.execute(select(Result.id, Result.electorate))).all()
+                await db.execute(delete(ResultPrimaryVote))
+                await db.execute(delete(ResultTCPVote))
+                await db.execute(delete(Result))
+                await db.execute(
+                    BUMP_DIVISION_VERSIONS_SQL,
+                    {"updated_at": datetime.now(timezone.utc).isoformat()},
+                )
+                await bump_result_versions(db)
+                await log_result_changes(db, deleted, deleted=True)
                 message = "All results have been reset"
             elif division and booth_name:
-                db.query(Result).filter_by(
-                    electorate=division, booth_name=booth_name
-                ).delete()
+                result_filter = (Result.electorate == division) & (
+                    Result.booth_name == booth_name
+                )
+                deleted = (
+                    await db.execute(
+                        select(Result.id, Result.electorate).where(result_filter)
+                    )
+                ).all()
+                await delete_result_votes(db, result_filter)
+                await db.execute(delete(Result).where(result_filter))
+                versions = await bump_result_versions(db, division)
+                await log_result_changes(db, deleted, deleted=True)
                 message = f"Results for {booth_name} in {division} have been reset"
             elif division:
-                db.query(Result).filter_by(electorate=division).delete()
+                result_filter = Result.electorate == division
+                deleted = (
+                    await db.execute(
+                        select(Result.id, Result.electorate).where(result_filter)
+                    )
+                ).all()
+                await delete_result_votes(db, result_filter)
+                await db.execute(delete(Result).where(result_filter))
+                versions = await bump_result_versions(db, division)
+                await log_result_changes(db, deleted, deleted=True)
                 message = f"Results for {division} have been reset"
             else:
                 return {
@@ -1040,12 +2188,21 @@ async def reset_results(request: Request):
                     "message": "Please specify what results to reset",
                 }
 
-            db.commit()
+            await db.commit()
+            notify_changed([RESULTS_SCOPE])
+            if all_results:
+                division_tallies.clear()
+            elif booth_name:
+                division_tallies.remove(
+                    [result_id for result_id, _ in deleted], versions
+                )
+            else:
+                division_tallies.reset_division(division, versions[division])
             logger.info(message)
 
             return {"status": "success", "message": message}
         finally:
-            db.close()
+            await db.close()
     except Exception as e:
         logger.error(f"Error resetting results: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -1057,15 +2214,19 @@ async def get_unreviewed_results(division: str):
     Get unreviewed results for a specific division
     """
     try:
-        db = SessionLocal()
+        db = AsyncSessionLocal()
         try:
             # Get all results for the division that haven't been reviewed
             results = (
-                db.query(Result)
-                .filter(
-                    Result.electorate == division,
-                    Result.is_reviewed == 0,  # Only get unreviewed results
+                (
+                    await db.execute(
+                        select(Result).where(
+                            Result.electorate == division,
+                            Result.is_reviewed == 0,  # Only get unreviewed results
+                        )
+                    )
                 )
+                .scalars()
                 .all()
             )
 
@@ -1085,7 +2246,7 @@ async def get_unreviewed_results(division: str):
             )
             return {"status": "success", "unreviewed_results": unreviewed_results}
         finally:
-            db.close()
+            await db.close()
     except Exception as e:
         logger.error(f"Error getting unreviewed results for division {division}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -1097,9 +2258,9 @@ async def get_result(result_id: int):
     Get a specific result by ID
     """
     try:
-        db = SessionLocal()
+        db = AsyncSessionLocal()
         try:
-            result = db.query(Result).filter_by(id=result_id).first()
+            result = await db.get(Result, result_id)
             if not result:
                 raise HTTPException(
                     status_code=404, detail=f"Result with ID {result_id} not found"
@@ -1113,7 +2274,13 @@ async def get_result(result_id: int):
 
             # Get candidates with ballot positions
             candidates = (
-                db.query(Candidate).filter_by(electorate=result.electorate).all()
+                (
+                    await db.execute(
+                        select(Candidate).filter_by(electorate=result.electorate)
+                    )
+                )
+                .scalars()
+                .all()
             )
             candidate_positions = {
                 c.candidate_name: c.ballot_position for c in candidates
@@ -1147,18 +2314,16 @@ async def get_result(result_id: int):
             # Get polling places for this electorate
             polling_places = []
             try:
-                conn = sqlite3.connect(
-                    SQLALCHEMY_DATABASE_URL.replace("sqlite:///", "")
-                )
-                cursor = conn.cursor()
-                cursor.execute(
-                    """
+                cursor = await db.execute(
+                    text(
+                        """
                     SELECT polling_place_id, polling_place_name, address, status, wheelchair_access
                     FROM polling_places 
-                    WHERE division_name = ? 
+                    WHERE division_name = :division 
                     ORDER BY polling_place_name
-                """,
-                    (result.electorate,),
+                """
+                    ),
+                    {"division": result.electorate},
                 )
                 polling_places = [
                     dict(
@@ -1169,10 +2334,13 @@ async def get_result(result_id: int):
                     )
                     for row in cursor.fetchall()
                 ]
-                conn.close()
             except Exception as e:
                 logger.error(f"Error getting polling places: {e}")
 
+            _, booth_matches = await match_booth(
+                db, result.electorate, result.booth_name
+            )
+
             return {
                 "status": "success",
                 "result": {
@@ -1180,6 +2348,7 @@ async def get_result(result_id: int):
                     "timestamp": result.timestamp.isoformat(),
                     "electorate": result.electorate,
                     "booth_name": result.booth_name,
+                    "aec_booth_name": result.aec_booth_name,
                     "image_url": result.image_url,
                     "data": {
                         "primary_votes": sorted_primary_votes,
@@ -1187,10 +2356,11 @@ async def get_result(result_id: int):
                         "totals": totals,
                     },
                     "polling_places": polling_places,
+                    "booth_matches": [match.as_dict() for match in booth_matches],
                 },
             }
         finally:
-            db.close()
+            await db.close()
     except HTTPException:
         raise
     except Exception as e:
@@ -1219,9 +2389,9 @@ async def review_result(result_id: int, request: Request):
         if not booth_name:
             raise HTTPException(status_code=400, detail="Booth name is required")
 
-        db = SessionLocal()
+        db = AsyncSessionLocal()
         try:
-            result = db.query(Result).filter_by(id=result_id).first()
+            result = await db.get(Result, result_id)
             if not result:
                 raise HTTPException(
                     status_code=404, detail=f"Result with ID {result_id} not found"
@@ -1245,6 +2415,7 @@ async def review_result(result_id: int, request: Request):
 
             # Convert back to JSON string
             result.data = json.dumps(result_data)
+            await sync_result_votes(db, result, result_data)
             result.is_reviewed = 1
             result.reviewer = (
                 "Admin"  # You might want to get this from the request or session
@@ -1252,7 +2423,10 @@ async def review_result(result_id: int, request: Request):
             result.booth_name = booth_name  # Update the booth name
             result.aec_booth_name = booth_name  # Also update the AEC booth name
 
-            db.commit()
+            versions = await bump_result_versions(db, result.electorate)
+            await log_result_changes(db, [(result.id, result.electorate)])
+            await db.commit()
+            update_division_tally(result, result_data, versions)
 
             message = (
                 "Result approved successfully"
@@ -1261,25 +2435,20 @@ async def review_result(result_id: int, request: Request):
             )
             logger.info(f"{message} for result {result_id}")
 
-            try:
-                async with httpx.AsyncClient() as client:
-                    await client.post(
-                        FLASK_APP_URL,
-                        json={
-                            "result_id": result.id,
-                            "timestamp": result.timestamp.isoformat(),
-                            "electorate": result.electorate,
-                            "booth_name": result.aec_booth_name,  # Use AEC booth name in notification
-                            "action": "review",
-                            "approved": (action == "approve"),
-                        },
-                    )
-            except Exception as e:
-                logger.error(f"Failed to notify Flask app: {e}")
+            notifier.notify(
+                {
+                    "result_id": result.id,
+                    "timestamp": result.timestamp.isoformat(),
+                    "electorate": result.electorate,
+                    "booth_name": result.aec_booth_name,  # Use AEC booth name in notification
+                    "action": "review",
+                    "approved": (action == "approve"),
+                }
+            )
 
             return {"status": "success", "message": message}
         finally:
-            db.close()
+            await db.close()
     except HTTPException:
         raise
     except Exception as e:
@@ -1287,238 +2456,462 @@ async def review_result(result_id: int, request: Request):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def parse_result_fields(fields: Optional[str]) -> List[str]:
+    """
+    Parse a comma-separated fields= selection for /results.
+
+    Returns:
+        The selected field names in their usual order, all of them if none given
+    """
+    if not fields:
+        return list(RESULT_FIELDS)
+    names = {name.strip() for name in fields.split(",")} - {""}
+    unknown = names - set(RESULT_FIELDS)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}. "
+            f"Choose from {', '.join(RESULT_FIELDS)}",
+        )
+    return [name for name in RESULT_FIELDS if name in names]
+
+
+def encode_results_cursor(timestamp: datetime, result_id: int) -> str:
+    """Get the opaque cursor for the page of results after this one."""
+    raw = f"{timestamp.isoformat()}|{result_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_results_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Get the (timestamp, id) position a results cursor continues from."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        timestamp, result_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(timestamp), int(result_id)
+    except (ValueError, UnicodeDecodeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def select_result_fields(names: List[str]):
+    """Select the given result fields, plus the timestamp and id for ordering."""
+    columns = {"id", "timestamp", *names}
+    return select(*[getattr(Result, name) for name in RESULT_FIELDS if name in columns])
+
+
+def results_page_query(
+    names: List[str], after: Optional[Tuple[datetime, int]], limit: Optional[int]
+):
+    """
+    Build the query for a page of reviewed results, newest first.
+
+    Pages are keyed on (timestamp, id) so each one is an index range scan,
+    however deep into the results it starts.
+
+    Args:
+        names: Result fields to load
+        after: (timestamp, id) of the last result on the previous page
+        limit: Page size, or None for every remaining result
+    """
+    query = select_result_fields(names).where(Result.is_reviewed == 1)
+    if after:
+        timestamp, result_id = after
+        query = query.where(
+            or_(
+                Result.timestamp < timestamp,
+                and_(Result.timestamp == timestamp, Result.id < result_id),
+            )
+        )
+    query = query.order_by(Result.timestamp.desc(), Result.id.desc())
+    return query.limit(limit) if limit is not None else query
+
+
+def result_fields(row, names: List[str]) -> Dict[str, Any]:
+    """Get the selected fields of a results row."""
+    item = {name: getattr(row, name) for name in names}
+    if "timestamp" in item:
+        item["timestamp"] = item["timestamp"].isoformat()
+    if "data" in item:
+        item["data"] = raw_json(item["data"])
+    return item
+
+
+async def stream_results(
+    names: List[str], after: Optional[Tuple[datetime, int]], limit: Optional[int]
+):
+    """
+    Stream reviewed results as NDJSON, one result per line.
+
+    Results are read in keyset batches so only one batch is in memory at a
+    time. When a limit is given and more results remain, a final
+    {"next_cursor": ...} line continues from where the stream stopped.
+    """
+    db = AsyncSessionLocal()
+    try:
+        sent = 0
+        while limit is None or sent < limit:
+            batch = RESULTS_STREAM_BATCH
+            if limit is not None:
+                batch = min(batch, limit - sent)
+            rows = (await db.execute(results_page_query(names, after, batch))).all()
+            if rows:
+                yield b"".join(dumps(result_fields(row, names)) + b"\n" for row in rows)
+                sent += len(rows)
+                after = (rows[-1].timestamp, rows[-1].id)
+            if len(rows) < batch:
+                return
+        more = (await db.execute(results_page_query(["id"], after, 1))).first()
+        if more:
+            yield dumps({"next_cursor": encode_results_cursor(*after)}) + b"\n"
+    except Exception as e:
+        logger.error(f"Error streaming results: {e}")
+        raise
+    finally:
+        await db.close()
+
+
 @app.get("/results")
-async def api_results():
+async def api_results(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=RESULTS_PAGE_MAX),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    format: Optional[str] = None,
+):
     """
-    Get all results ordered by timestamp descending
+    Get reviewed results ordered by timestamp descending.
+
+    Pass limit to page through the results, following next_cursor from each
+    page, and fields (e.g. "id,timestamp,booth_name") to leave out the rest,
+    notably the raw data. format=ndjson (or Accept: application/x-ndjson)
+    streams one result per line instead of building the whole list.
     """
     try:
-        db = SessionLocal()
+        names = parse_result_fields(fields)
+        after = decode_results_cursor(cursor) if cursor else None
+        if format not in (None, "json", "ndjson"):
+            raise HTTPException(
+                status_code=400, detail="Format must be 'json' or 'ndjson'"
+            )
+        ndjson = format == "ndjson" or (
+            format is None
+            and "application/x-ndjson" in request.headers.get("accept", "")
+        )
+
+        db = AsyncSessionLocal()
         try:
-            results = (
-                db.query(Result)
-                .filter_by(is_reviewed=1)
-                .order_by(Result.timestamp.desc())
-                .all()
+            etag, _ = await read_data_versions(db, [RESULTS_SCOPE])
+            cached = not_modified(request, response, etag)
+            if cached:
+                return cached
+            if ndjson:
+                return StreamingResponse(
+                    stream_results(names, after, limit),
+                    media_type="application/x-ndjson",
+                    headers=response.headers,
+                )
+
+            # Read one extra row to tell whether there is another page
+            rows = (
+                await db.execute(
+                    results_page_query(
+                        names, after, limit + 1 if limit is not None else None
+                    )
+                )
+            ).all()
+            next_cursor = None
+            if limit is not None and len(rows) > limit:
+                rows = rows[:limit]
+                next_cursor = encode_results_cursor(rows[-1].timestamp, rows[-1].id)
+            return FastJSONResponse(
+                {
+                    "status": "success",
+                    "results": [result_fields(row, names) for row in rows],
+                    "next_cursor": next_cursor,
+                },
+                headers=response.headers,
             )
-            return {
-                "status": "success",
-                "results": [
-                    {
-                        "id": r.id,
-                        "timestamp": r.timestamp.isoformat(),
-                        "electorate": r.electorate,
-                        "booth_name": r.booth_name,
-                        "image_url": r.image_url,
-                        "data": r.data,
-                    }
-                    for r in results
-                ],
-            }
         finally:
-            db.close()
+            await db.close()
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting results: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/results/{result_id}")
-async def api_result_detail(result_id: int):
+@app.get("/results/changes")
+async def get_result_changes(
+    request: Request,
+    response: Response,
+    since: Optional[int] = Query(None, ge=0),
+    fields: Optional[str] = None,
+):
     """
-    Get a specific result by ID
+    Get the results saved or deleted since a sequence number.
+
+    Returns the reviewed results changed after since (with the same fields
+    selection as /results), the ids of results deleted or no longer reviewed,
+    and the divisions touched. Pass the returned seq as the next since;
+    without since only the current seq is returned. reset is true when since
+    is ahead of the log (e.g. the database was replaced) and the client
+    should reload everything.
     """
     try:
-        db = SessionLocal()
+        names = parse_result_fields(fields)
+        db = AsyncSessionLocal()
         try:
-            result = db.query(Result).filter_by(id=result_id).first()
-            if not result:
-                raise HTTPException(
-                    status_code=404, detail=f"Result with ID {result_id} not found"
-                )
-
-            # Parse the JSON data
-            result_data = json.loads(result.data) if result.data else {}
+            etag, versions = await read_data_versions(db, [RESULTS_SCOPE])
+            cached = not_modified(request, response, etag)
+            if cached:
+                return cached
 
-            return {
+            seq = versions.get(RESULTS_SCOPE, {}).get("version", 0)
+            changes = {
                 "status": "success",
-                "result": {
-                    "id": result.id,
-                    "timestamp": result.timestamp.isoformat(),
-                    "electorate": result.electorate,
-                    "booth_name": result.booth_name,
-                    "image_url": result.image_url,
-                    "data": result_data,
-                },
+                "seq": seq,
+                "reset": since is not None and since > seq,
+                "results": [],
+                "deleted": [],
+                "divisions": [],
             }
+            if since is None or changes["reset"]:
+                return changes
+
+            log = await db.execute(
+                select(ResultChange.result_id, ResultChange.electorate)
+                .where((ResultChange.seq > since) & (ResultChange.seq <= seq))
+                .order_by(ResultChange.id)
+            )
+            result_ids = set()
+            divisions = set()
+            for result_id, electorate in log:
+                result_ids.add(result_id)
+                if electorate:
+                    divisions.add(electorate)
+
+            # Send the current state of each result, however often it changed
+            rows = (
+                await db.execute(
+                    select_result_fields(names)
+                    .where(Result.id.in_(result_ids) & (Result.is_reviewed == 1))
+                    .order_by(Result.timestamp.desc(), Result.id.desc())
+                )
+            ).all()
+            changes["results"] = [result_fields(row, names) for row in rows]
+            changes["deleted"] = sorted(result_ids - {row.id for row in rows})
+            changes["divisions"] = sorted(divisions)
+            return FastJSONResponse(changes, headers=response.headers)
         finally:
-            db.close()
+            await db.close()
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error getting result {result_id}: {e}")
+        logger.error(f"Error getting result changes: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/results/division/{division}")
-async def get_division_results(division: str):
-    logger.info(f"Received request for results in division: {division}")
+@app.get("/results/divisions")
+async def get_batch_division_results(
+    request: Request,
+    response: Response,
+    divisions: List[str] = Query(["all"]),
+):
+    """
+    Get vote totals and booth counts for several divisions in one request.
+
+    Pass divisions as a comma-separated list or repeated parameter, or "all"
+    for every division.
+    """
     try:
-        # Connect to the database
-        db = SessionLocal()
-        logger.info("Connected to database")
-
-        # Get all results for the division
-        results = (
-            db.query(Result)
-            .filter(Result.electorate == division, Result.is_reviewed == 1)
-            .order_by(Result.timestamp.desc())
-            .all()
+        names = sorted(
+            {name.strip() for value in divisions for name in value.split(",")} - {""}
         )
+        every_division = not names or "all" in names
+        db = AsyncSessionLocal()
+        try:
+            scopes = (
+                [RESULTS_SCOPE, REFERENCE_SCOPE]
+                if every_division
+                else [division_scope(name) for name in names] + [REFERENCE_SCOPE]
+            )
+            etag, versions = await read_data_versions(db, scopes)
+            cached = not_modified(request, response, etag)
+            if cached:
+                return cached
 
-        logger.info(f"Found {len(results)} reviewed results for division {division}")
-
-        # Process results
-        primary_votes = {}
-        tcp_votes = {}
-        booth_results = []
-
-        for result in results:
-            try:
-                result_data = json.loads(result.data) if result.data else {}
-                logger.info(
-                    f"Processing result for booth {result.booth_name}: {result_data}"
-                )
-
-                # Aggregate primary votes
-                if "primary_votes" in result_data:
-                    for candidate, votes in result_data["primary_votes"].items():
-                        if candidate not in primary_votes:
-                            primary_votes[candidate] = 0
-                        primary_votes[candidate] += votes
-
-                # Aggregate TCP votes
-                if "two_candidate_preferred" in result_data:
-                    for tcp_candidate, candidate_votes in result_data[
-                        "two_candidate_preferred"
-                    ].items():
-                        for candidate, votes in candidate_votes.items():
-                            if candidate not in tcp_votes:
-                                tcp_votes[candidate] = {}
-                            if tcp_candidate not in tcp_votes[candidate]:
-                                tcp_votes[candidate][tcp_candidate] = 0
-                            tcp_votes[candidate][tcp_candidate] += votes
-
-                booth_results.append(
-                    {
-                        "id": result.id,
-                        "booth_name": result.booth_name,
-                        "timestamp": result.timestamp.isoformat(),
-                        "image_url": result.image_url,
-                        "primary_votes": result_data.get("primary_votes", {}),
-                        "tcp_votes": result_data.get("two_candidate_preferred", {}),
-                        "totals": result_data.get("totals", {}),
-                    }
+            summaries = await read_division_summaries(
+                db, None if every_division else names
+            )
+            if every_division:
+                _, versions = await read_data_versions(
+                    db, [division_scope(name) for name in summaries]
                 )
-            except json.JSONDecodeError as e:
-                logger.error(f"Error decoding JSON for result {result.id}: {str(e)}")
-                continue
-
-        # Convert aggregated votes to arrays for the frontend
-        primary_votes_array = [
-            {"candidate": k, "votes": v} for k, v in primary_votes.items()
-        ]
+        finally:
+            await db.close()
 
-        # Convert TCP votes to array format
-        tcp_votes_array = []
-        tcp_candidates = set()
+        for name, summary in summaries.items():
+            version = versions.get(division_scope(name))
+            summary["last_updated"] = version["updated_at"] if version else None
+        return {"status": "success", "divisions": summaries}
+    except Exception as e:
+        logger.error(f"Error getting results for divisions {divisions}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
-        # First, collect all TCP candidates
-        for candidate_votes in tcp_votes.values():
-            tcp_candidates.update(candidate_votes.keys())
 
-        # Convert to list and sort
-        tcp_candidates = sorted(list(tcp_candidates))
+@app.get("/results/projection")
+async def get_projection(request: Request, response: Response):
+    """
+    Get the projected final TCP result of every division from the booths counted so far
+    """
+    try:
+        db = AsyncSessionLocal()
+        try:
+            etag, _ = await read_data_versions(db, [RESULTS_SCOPE, REFERENCE_SCOPE])
+            cached = not_modified(request, response, etag)
+            if cached:
+                return cached
 
-        # Create array with vote distributions
-        for candidate, tcp_distribution in tcp_votes.items():
-            # Skip TCP candidates themselves
-            if candidate in tcp_candidates:
-                continue
+            projections = await project_divisions(db)
+        finally:
+            await db.close()
+        return {"status": "success", "divisions": projections}
+    except Exception as e:
+        logger.error(f"Error projecting results: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
-            entry = {
-                "candidate": candidate,
-                "primary_votes": primary_votes.get(candidate, 0),
-                "distributions": {},
-            }
 
-            # Add distribution to each TCP candidate
-            for tcp_candidate in tcp_candidates:
-                entry["distributions"][tcp_candidate] = tcp_distribution.get(
-                    tcp_candidate, 0
+@app.get("/results/{result_id}")
+async def api_result_detail(result_id: int):
+    """
+    Get a specific result by ID
+    """
+    try:
+        db = AsyncSessionLocal()
+        try:
+            result = await db.get(Result, result_id)
+            if not result:
+                raise HTTPException(
+                    status_code=404, detail=f"Result with ID {result_id} not found"
                 )
 
-            tcp_votes_array.append(entry)
-
-        # Calculate percentages
-        total_primary_votes = sum(primary_votes.values())
-        if total_primary_votes > 0:
-            for vote in primary_votes_array:
-                vote["percentage"] = (vote["votes"] / total_primary_votes) * 100
-
-        # Calculate TCP percentages
-        for entry in tcp_votes_array:
-            total = entry["primary_votes"]
-            if total > 0:
-                for tcp_candidate, votes in entry["distributions"].items():
-                    entry["distributions"][tcp_candidate] = {
-                        "votes": votes,
-                        "percentage": (votes / total) * 100,
-                    }
+            return FastJSONResponse(
+                {
+                    "status": "success",
+                    "result": {
+                        "id": result.id,
+                        "timestamp": result.timestamp.isoformat(),
+                        "electorate": result.electorate,
+                        "booth_name": result.booth_name,
+                        "image_url": result.image_url,
+                        "data": raw_json(result.data, {}),
+                    },
+                }
+            )
+        finally:
+            await db.close()
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting result {result_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
-        logger.info(f"Successfully processed {len(booth_results)} booth results")
 
-        return {
-            "status": "success",
-            "booth_count": len(booth_results),
-            "total_booths": len(
-                booth_results
-            ),  # This should be updated with actual total booths
-            "booth_results": booth_results,
-            "primary_votes": primary_votes_array,
-            "tcp_votes": tcp_votes_array,
-            "last_updated": datetime.now(timezone.utc).isoformat(),
-        }
+@app.get("/results/division/{division}")
+async def get_division_results(division: str, request: Request, response: Response):
+    logger.info(f"Received request for results in division: {division}")
+    try:
+        scope = division_scope(division)
+        db = AsyncSessionLocal()
+        try:
+            etag, versions = await read_data_versions(db, [scope])
+            cached = not_modified(request, response, etag)
+            if cached:
+                return cached
+
+            # Only a tally at the version behind the ETag may be served
+            version = versions.get(scope, {}).get("version", 0)
+            tally = division_tallies.get(division, version)
+            if tally is None:
+                # Not cached, changed since it was cached (possibly by another
+                # process) or caching disabled: build it from the database
+                booths = await read_booth_tallies(db, division)
+                tally = division_tallies.install(
+                    division, (booth for _, booth in booths), version
+                )
+                logger.info(
+                    f"Loaded {len(booths)} reviewed results for division {division}"
+                )
+            payload = tally.as_response()
+        finally:
+            await db.close()
+
+        # Tag the body with the version of the tally it was built from, and
+        # report that version's time so equal versions always produce
+        # identical bodies for the strong ETag
+        served = {scope: {**versions.get(scope, {}), "version": tally.version}}
+        response.headers["ETag"] = make_etag([scope], served)
+        if scope in versions:
+            payload = {**payload, "last_updated": versions[scope]["updated_at"]}
+        return FastJSONResponse(payload, headers=response.headers)
     except Exception as e:
         logger.error(f"Error getting results for division {division}: {str(e)}")
         return {"status": "error", "message": str(e)}
-    finally:
-        db.close()
-        logger.info("Database connection closed")
 
 
-@app.get("/electorates")
-async def get_electorates():
+@app.get("/results/division/{division}/projection")
+async def get_division_projection(
+    division: str, request: Request, response: Response
+):
     """
-    Get all unique electorates/divisions from the database
+    Get the projected final TCP result of a division from the booths counted so far
     """
     try:
-        db = SessionLocal()
+        db = AsyncSessionLocal()
         try:
-            # Get unique divisions from polling places table using simple distinct
-            polling_divisions = db.query(PollingPlace.division_name).distinct().all()
-            divisions = [d[0] for d in polling_divisions if d[0]]
+            etag, _ = await read_data_versions(
+                db, [division_scope(division), REFERENCE_SCOPE]
+            )
+            cached = not_modified(request, response, etag)
+            if cached:
+                return cached
 
-            # Get unique electorates from results table
-            result_electorates = db.query(Result.electorate).distinct().all()
-            electorates = [e[0] for e in result_electorates if e[0]]
+            projections = await project_divisions(db, division)
+        finally:
+            await db.close()
+        return {"status": "success", **projections[division]}
+    except Exception as e:
+        logger.error(f"Error projecting results for division {division}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
-            # Combine and deduplicate
-            all_electorates = list(set(divisions + electorates))
-            all_electorates.sort()
 
-            return {"status": "success", "electorates": all_electorates}
-        finally:
-            db.close()
+@app.get("/electorates")
+async def get_electorates(request: Request):
+    """
+    Get all unique electorates/divisions from the database
+    """
+
+    async def build(db):
+        # Get unique divisions from polling places table using simple distinct
+        polling_divisions = (
+            await db.execute(select(PollingPlace.division_name).distinct())
+        ).all()
+        divisions = [d[0] for d in polling_divisions if d[0]]
+
+        # Get unique electorates from results table
+        result_electorates = (
+            await db.execute(select(Result.electorate).distinct())
+        ).all()
+        electorates = [e[0] for e in result_electorates if e[0]]
+
+        # Combine and deduplicate
+        all_electorates = list(set(divisions + electorates))
+        all_electorates.sort()
+
+        return {"status": "success", "electorates": all_electorates}
+
+    try:
+        return await serve_cached(request, [RESULTS_SCOPE, REFERENCE_SCOPE], build)
     except Exception as e:
         logger.error(f"Error getting electorates: {e}")
         return {"status": "error", "message": str(e)}
@@ -1530,9 +2923,13 @@ async def get_tcp_candidates(division: str):
     Get TCP candidates for a specific division
     """
     try:
-        db = SessionLocal()
+        db = AsyncSessionLocal()
         try:
-            candidates = db.query(TCPCandidate).filter_by(electorate=division).all()
+            candidates = (
+                (await db.execute(select(TCPCandidate).filter_by(electorate=division)))
+                .scalars()
+                .all()
+            )
             return {
                 "status": "success",
                 "candidates": [
@@ -1541,7 +2938,7 @@ async def get_tcp_candidates(division: str):
                 ],
             }
         finally:
-            db.close()
+            await db.close()
     except Exception as e:
         logger.error(f"Error getting TCP candidates for {division}: {e}")
         return {"status": "error", "message": str(e)}
@@ -1562,14 +2959,22 @@ async def set_tcp_candidates(division: str, request: Request):
                 "message": "Exactly two candidates must be selected",
             }
 
-        db = SessionLocal()
+        db = AsyncSessionLocal()
         try:
             # Delete existing TCP candidates for this division
-            db.query(TCPCandidate).filter_by(electorate=division).delete()
+            await db.execute(
+                delete(TCPCandidate).where(TCPCandidate.electorate == division)
+            )
 
             # Get candidate details
             candidates = (
-                db.query(Candidate).filter(Candidate.id.in_(candidate_ids)).all()
+                (
+                    await db.execute(
+                        select(Candidate).where(Candidate.id.in_(candidate_ids))
+                    )
+                )
+                .scalars()
+                .all()
             )
 
             # Create new TCP candidates
@@ -1581,13 +2986,15 @@ async def set_tcp_candidates(division: str, request: Request):
                 )
                 db.add(tcp_candidate)
 
-            db.commit()
+            await db.execute(BUMP_VERSION_SQL, bump_params([REFERENCE_SCOPE]))
+            await db.commit()
+            notify_changed([REFERENCE_SCOPE])
             return {
                 "status": "success",
                 "message": "TCP candidates updated successfully",
             }
         finally:
-            db.close()
+            await db.close()
     except Exception as e:
         logger.error(f"Error setting TCP candidates for {division}: {e}")
         return {"status": "error", "message": str(e)}
@@ -1606,6 +3013,7 @@ class CandidateResponse(BaseModel):
 
 @app.get("/candidates")
 async def get_candidates(
+    request: Request,
     division: Optional[str] = None,
     electorate: Optional[str] = None,
     candidate_type: Optional[str] = None,
@@ -1614,76 +3022,85 @@ async def get_candidates(
     Get candidates, optionally filtered by division/electorate and/or candidate type.
     Accepts either 'division' or 'electorate' parameter for backward compatibility.
     """
-    try:
-        db = SessionLocal()
-        try:
-            query = db.query(Candidate)
 
-            # Use either division or electorate parameter
-            division_name = division or electorate
-            if division_name:
-                query = query.filter(Candidate.electorate == division_name)
-            if candidate_type:
-                query = query.filter(Candidate.candidate_type == candidate_type)
+    async def build(db):
+        query = select(Candidate)
 
-            candidates = query.order_by(Candidate.ballot_position).all()
+        # Use either division or electorate parameter
+        division_name = division or electorate
+        if division_name:
+            query = query.where(Candidate.electorate == division_name)
+        if candidate_type:
+            query = query.where(Candidate.candidate_type == candidate_type)
+
+        candidates = (
+            (await db.execute(query.order_by(Candidate.ballot_position)))
+            .scalars()
+            .all()
+        )
 
-            return {
-                "status": "success",
-                "candidates": [
-                    {
-                        "id": c.id,
-                        "candidate_name": c.candidate_name,
-                        "party": c.party,
-                        "electorate": c.electorate,
-                        "ballot_position": c.ballot_position,
-                        "candidate_type": c.candidate_type,
-                        "state": c.state,
-                        "data": json.loads(c.data) if c.data else {},
-                    }
-                    for c in candidates
-                ],
-            }
-        finally:
-            db.close()
+        return {
+            "status": "success",
+            "candidates": [
+                {
+                    "id": c.id,
+                    "candidate_name": c.candidate_name,
+                    "party": c.party,
+                    "electorate": c.electorate,
+                    "ballot_position": c.ballot_position,
+                    "candidate_type": c.candidate_type,
+                    "state": c.state,
+                    "data": raw_json(c.data, {}),
+                }
+                for c in candidates
+            ],
+        }
+
+    try:
+        return await serve_cached(request, [REFERENCE_SCOPE], build)
     except Exception as e:
         logger.error(f"Error getting candidates: {e}")
         return {"status": "error", "message": str(e)}
 
 
 @app.get("/polling-places/division/{division}")
-async def get_polling_places(division: str):
+async def get_polling_places(division: str, request: Request):
     """
     Get polling places for a specific division
     """
-    try:
-        db = SessionLocal()
-        try:
-            # Get polling places directly from the database using SQLAlchemy
-            polling_places = (
-                db.query(PollingPlace)
-                .filter(PollingPlace.division_name == division)
-                .order_by(PollingPlace.polling_place_name)
-                .all()
+
+    async def build(db):
+        # Get polling places directly from the database using SQLAlchemy
+        polling_places = (
+            (
+                await db.execute(
+                    select(PollingPlace)
+                    .where(PollingPlace.division_name == division)
+                    .order_by(PollingPlace.polling_place_name)
+                )
             )
+            .scalars()
+            .all()
+        )
 
-            return {
-                "status": "success",
-                "polling_places": [
-                    {
-                        "id": p.id,
-                        "polling_place_id": p.polling_place_id,
-                        "polling_place_name": p.polling_place_name,
-                        "address": p.address,
-                        "status": p.status,
-                        "wheelchair_access": p.wheelchair_access,
-                        "data": json.loads(p.data) if p.data else {},
-                    }
-                    for p in polling_places
-                ],
-            }
-        finally:
-            db.close()
+        return {
+            "status": "success",
+            "polling_places": [
+                {
+                    "id": p.id,
+                    "polling_place_id": p.polling_place_id,
+                    "polling_place_name": p.polling_place_name,
+                    "address": p.address,
+                    "status": p.status,
+                    "wheelchair_access": p.wheelchair_access,
+                    "data": raw_json(p.data, {}),
+                }
+                for p in polling_places
+            ],
+        }
+
+    try:
+        return await serve_cached(request, [REFERENCE_SCOPE], build)
     except Exception as e:
         logger.error(f"Error getting polling places for division {division}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -1703,71 +3120,65 @@ async def manual_entry(request: Request):
                 status_code=400, detail="Booth name and electorate are required"
             )
 
-        db = SessionLocal()
+        result_data = {
+            "primary_votes": data.get("primary_votes", {}),
+            "two_candidate_preferred": data.get("two_candidate_preferred", {}),
+            "totals": data.get("totals", {}),
+            "reviewed": True,
+            "approved": True,
+            "reviewed_at": datetime.now(timezone.utc).isoformat(),
+        }
+
+        db = AsyncSessionLocal()
         try:
             # If updating existing result
             if data.get("result_id"):
-                result = db.query(Result).filter_by(id=data["result_id"]).first()
+                result = await db.get(Result, data["result_id"])
                 if not result:
                     raise HTTPException(status_code=404, detail="Result not found")
 
+                previous_electorate = result.electorate
                 result.booth_name = data["booth_name"]
                 result.electorate = data["electorate"]
-                result.data = json.dumps(
-                    {
-                        "primary_votes": data.get("primary_votes", {}),
-                        "two_candidate_preferred": data.get(
-                            "two_candidate_preferred", {}
-                        ),
-                        "totals": data.get("totals", {}),
-                        "reviewed": True,
-                        "approved": True,
-                        "reviewed_at": datetime.now(timezone.utc).isoformat(),
-                    }
-                )
+                result.data = json.dumps(result_data)
                 result.is_reviewed = 1
                 result.reviewer = "Manual Entry"
                 db_result = result
             else:
                 # Create new result
+                previous_electorate = None
                 db_result = Result(
                     booth_name=data["booth_name"],
                     electorate=data["electorate"],
-                    data=json.dumps(
-                        {
-                            "primary_votes": data.get("primary_votes", {}),
-                            "two_candidate_preferred": data.get(
-                                "two_candidate_preferred", {}
-                            ),
-                            "totals": data.get("totals", {}),
-                            "reviewed": True,
-                            "approved": True,
-                            "reviewed_at": datetime.now(timezone.utc).isoformat(),
-                        }
-                    ),
+                    data=json.dumps(result_data),
                     is_reviewed=1,
                     reviewer="Manual Entry",
                 )
                 db.add(db_result)
 
-            db.commit()
-            db.refresh(db_result)
-
-            # Notify Flask app
-            try:
-                async with httpx.AsyncClient() as client:
-                    await client.post(
-                        FLASK_APP_URL,
-                        json={
-                            "result_id": db_result.id,
-                            "timestamp": db_result.timestamp.isoformat(),
-                            "electorate": db_result.electorate,
-                            "booth_name": db_result.booth_name,
-                            "action": "manual_entry",
-                        },
-                    )
-            except Exception as notify_err:
-                logger.error(f"Failed to notify Flask app: {notify_err}")
+            await sync_result_votes(db, db_result, result_data)
+            versions = await bump_result_versions(
+                db, previous_electorate, db_result.electorate
+            )
+            changes = [(db_result.id, db_result.electorate)]
+            if previous_electorate not in (None, db_result.electorate):
+                # A result moved between divisions is logged against both
+                changes.insert(0, (db_result.id, previous_electorate))
+            await log_result_changes(db, changes)
+            await db.commit()
+            await db.refresh(db_result)
+            update_division_tally(db_result, result_data, versions)
+
+            # Notify Flask app in the background
+            notifier.notify(
+                {
+                    "result_id": db_result.id,
+                    "timestamp": db_result.timestamp.isoformat(),
+                    "electorate": db_result.electorate,
+                    "booth_name": db_result.booth_name,
+                    "action": "manual_entry",
+                }
+            )
 
             return {
                 "status": "success",
@@ -1775,7 +3186,7 @@ async def manual_entry(request: Request):
                 "message": "Result saved successfully",
             }
         finally:
-            db.close()
+            await db.close()
     except HTTPException:
         raise
     except Exception as e:
@@ -1795,16 +3206,21 @@ async def update_result_booth_name(result_id: int, request: Request):
         if not booth_name:
             raise HTTPException(status_code=400, detail="Booth name is required")
 
-        db = SessionLocal()
+        db = AsyncSessionLocal()
         try:
-            result = db.query(Result).filter_by(id=result_id).first()
+            result = await db.get(Result, result_id)
             if not result:
                 raise HTTPException(
                     status_code=404, detail=f"Result with ID {result_id} not found"
                 )
 
             result.booth_name = booth_name
-            db.commit()
+            versions = await bump_result_versions(db, result.electorate)
+            await log_result_changes(db, [(result.id, result.electorate)])
+            await db.commit()
+            update_division_tally(
+                result, json.loads(result.data) if result.data else {}, versions
+            )
 
             return {
                 "status": "success",
@@ -1815,7 +3231,7 @@ async def update_result_booth_name(result_id: int, request: Request):
                 },
             }
         finally:
-            db.close()
+            await db.close()
     except HTTPException:
         raise
     except Exception as e:
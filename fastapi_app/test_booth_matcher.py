@@ -0,0 +1,50 @@
+from common.booth_matcher import BoothNameIndex, DivisionBoothIndex, normalize_booth_name
+
+POLLING_PLACES = [
+    (1, "Manly West Public School"),
+    (2, "Manly Vale Public School"),
+    (3, "St Kieran's Church Hall"),
+    (4, "Balgowlah North"),
+    (5, "Pre-Poll-Warringah"),
+]
+
+
+def test_normalize_booth_name():
+    assert normalize_booth_name("  Manly West P.S. ") == "MANLY WEST PUBLIC SCHOOL"
+    assert normalize_booth_name("manly west ps") == "MANLY WEST PUBLIC SCHOOL"
+    assert normalize_booth_name("St Kieran's") == "ST KIERAN S"
+    assert normalize_booth_name(None) == ""
+
+
+def test_exact_and_fuzzy_matches():
+    index = DivisionBoothIndex(POLLING_PLACES)
+
+    exact = index.match("MANLY WEST PS")
+    assert (exact[0].polling_place_id, exact[0].score) == (1, 1.0)
+
+    # OCR noise: dropped letters and a misread character
+    fuzzy = index.match("Manly Vaie Public Schol")
+    assert fuzzy[0].polling_place_id == 2
+    assert 0.5 < fuzzy[0].score < 1
+    assert [m.polling_place_id for m in index.match("Balgowlah Nth")][:1] == [4]
+    assert index.match("") == []
+
+
+def test_resolve_needs_a_clear_winner():
+    booths = BoothNameIndex(threshold=0.6)
+    index = booths.install("Warringah", POLLING_PLACES, 3)
+    assert booths.get("Warringah", 3) is index
+
+    best, matches = booths.resolve(index, "St Kierans Church Hall")
+    assert best.polling_place_id == 3
+    assert matches[0] == best
+
+    best, matches = booths.resolve(index, "Manly Public School")
+    assert best is None
+    assert {m.polling_place_id for m in matches[:2]} == {1, 2}
+
+    # A reload moves the reference data on; an index from before it is unused
+    assert booths.get("Warringah", 4) is None
+    newer = booths.install("Warringah", POLLING_PLACES[:2], 4)
+    booths.install("Warringah", POLLING_PLACES, 3)
+    assert booths.get("Warringah", 4) is newer
@@ -0,0 +1,66 @@
+import random
+
+import numpy as np
+import pytest
+
+from common.booth_swing import tcp_percentages, tcp_swings
+from main import calculate_tcp_swing
+
+NAME_PAIRS = [
+    ("SMITH (Liberal)", "JONES (Labor)"),
+    ("JONES (Labor)", "SMITH (Liberal)"),
+    ("STEGGALL (Independent)", "JONES (Labor)"),
+    ("JONES (Labor)", "STEGGALL (Independent)"),
+    ("OTHER", "LIBERAL NATIONAL"),
+    ("", "JONES (Labor)"),
+]
+
+
+def test_tcp_percentages_skip_uncounted_booths():
+    pct1, pct2 = tcp_percentages([30, 0, np.nan], [70, 0, 5])
+    assert pct1[0] == pytest.approx(30)
+    assert pct2[0] == pytest.approx(70)
+    assert np.isnan(pct1[1:]).all() and np.isnan(pct2[1:]).all()
+
+
+def test_tcp_swings_match_calculate_tcp_swing():
+    rng = random.Random(2025)
+    divisions = [(rng.choice(NAME_PAIRS), rng.choice(NAME_PAIRS)) for _ in range(40)]
+    booths = []
+    for _ in range(2000):
+        index = rng.randrange(len(divisions))
+        current = rng.choice([None, 0.0, rng.uniform(1, 99)])
+        previous = rng.choice([None, rng.uniform(1, 99)])
+        booths.append((index, current, previous))
+
+    current_pct1 = np.array([np.nan if c is None else c for _, c, _ in booths])
+    current_pct2 = np.where(current_pct1 == 0, 0.0, 100 - current_pct1)
+    previous_pct1 = np.array([np.nan if p is None else p for _, _, p in booths])
+    swings = tcp_swings(
+        current_pct1,
+        current_pct2,
+        previous_pct1,
+        100 - previous_pct1,
+        np.array([index for index, _, _ in booths]),
+        [current for current, _ in divisions],
+        [previous for _, previous in divisions],
+    )
+
+    for n, (index, current, previous) in enumerate(booths):
+        current_names, previous_names = divisions[index]
+        expected = calculate_tcp_swing(
+            current,
+            None if current is None else current_pct2[n],
+            *current_names,
+            previous
+            and {
+                "tcp1_name": previous_names[0],
+                "tcp2_name": previous_names[1],
+                "tcp1_pct": previous,
+                "tcp2_pct": 100 - previous,
+            },
+        )
+        if expected is None:
+            assert np.isnan(swings[n])
+        else:
+            assert swings[n] == pytest.approx(expected, abs=1e-9)
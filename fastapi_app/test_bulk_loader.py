@@ -0,0 +1,148 @@
+import pytest
+from sqlalchemy import inspect, text
+
+from common import bulk_loader
+from common.db_utils import primary_key_column
+
+
+@pytest.fixture
+def engine(db_engine, monkeypatch):
+    monkeypatch.setattr(bulk_loader, "get_connection", db_engine.connect)
+    with db_engine.connect() as conn:
+        conn.execute(
+            text(
+                f"""
+            CREATE TABLE candidates (
+                {primary_key_column(conn)},
+                candidate_name TEXT,
+                candidate_type TEXT,
+                ballot_position INTEGER
+            )
+        """
+            )
+        )
+        conn.execute(
+            text(
+                "CREATE INDEX ix_candidates_type_position "
+                "ON candidates (candidate_type, ballot_position)"
+            )
+        )
+        conn.commit()
+    return db_engine
+
+
+def make_candidates(count, candidate_type):
+    return [
+        {
+            "candidate_name": f"{candidate_type} {n}",
+            "candidate_type": candidate_type,
+            "ballot_position": n + 1,
+        }
+        for n in range(count)
+    ]
+
+
+COLUMNS = ("candidate_name", "candidate_type", "ballot_position")
+
+
+def count_by_type(engine):
+    with engine.connect() as conn:
+        return dict(
+            conn.execute(
+                text(
+                    "SELECT candidate_type, COUNT(*) FROM candidates "
+                    "GROUP BY candidate_type"
+                )
+            ).all()
+        )
+
+
+def test_bulk_load_replaces_matching_rows_and_reports(engine):
+    bulk_loader.bulk_load("candidates", COLUMNS, make_candidates(3, "senate"))
+    report = bulk_loader.bulk_load(
+        "candidates",
+        COLUMNS,
+        make_candidates(25, "house"),
+        where="candidate_type = :candidate_type",
+        params={"candidate_type": "house"},
+        batch_size=10,
+        label="candidates (house)",
+    )
+    bulk_loader.bulk_load(
+        "candidates",
+        COLUMNS,
+        make_candidates(7, "house"),
+        where="candidate_type = :candidate_type",
+        params={"candidate_type": "house"},
+        label="candidates (house)",
+    )
+
+    assert count_by_type(engine) == {"senate": 3, "house": 7}
+    assert report.rows == 25
+    assert report.as_dict()["rows_per_second"] > 0
+    assert "ix_candidates_type_position" in {
+        index["name"] for index in inspect(engine).get_indexes("candidates")
+    }
+    reports = {r.table: r for r in bulk_loader.get_load_reports()}
+    assert reports["candidates (house)"].rows == 7
+
+
+def test_failed_bulk_load_keeps_existing_rows(engine):
+    bulk_loader.bulk_load("candidates", COLUMNS, make_candidates(3, "house"))
+
+    def broken_rows():
+        yield from make_candidates(2, "house")
+        raise ValueError("bad row")
+
+    with pytest.raises(ValueError):
+        bulk_loader.bulk_load("candidates", COLUMNS, broken_rows(), batch_size=1)
+
+    assert count_by_type(engine) == {"house": 3}
+    assert "ix_candidates_type_position" in {
+        index["name"] for index in inspect(engine).get_indexes("candidates")
+    }
+
+
+def test_sync_rows_skips_unchanged_rows(engine):
+    with engine.connect() as conn:
+        conn.execute(text("ALTER TABLE candidates ADD COLUMN row_hash TEXT"))
+        conn.commit()
+    keys = ("candidate_type", "ballot_position")
+    house = make_candidates(4, "house")
+    bulk_loader.sync_rows("candidates", keys, COLUMNS, make_candidates(2, "senate"))
+
+    where = "candidate_type = :candidate_type"
+    params = {"candidate_type": "house"}
+    bulk_loader.sync_rows("candidates", keys, COLUMNS, house, where=where, params=params)
+    report = bulk_loader.sync_rows(
+        "candidates", keys, COLUMNS, house, where=where, params=params
+    )
+    assert (report.inserted, report.updated, report.deleted, report.unchanged) == (
+        0,
+        0,
+        0,
+        4,
+    )
+
+    house[1] = {**house[1], "candidate_name": "Renamed"}
+    report = bulk_loader.sync_rows(
+        "candidates", keys, COLUMNS, house[:3], where=where, params=params
+    )
+    assert (report.inserted, report.updated, report.deleted) == (0, 1, 1)
+    assert count_by_type(engine) == {"senate": 2, "house": 3}
+
+
+def test_unchanged_source_file_is_skipped(engine, tmp_path):
+    source = tmp_path / "house-candidates.csv"
+    source.write_text("name\nSmith\n")
+    digest = bulk_loader.file_sha256(source)
+    assert not bulk_loader.source_unchanged(source.name, digest, "candidates")
+
+    bulk_loader.bulk_load("candidates", COLUMNS, make_candidates(1, "house"))
+    bulk_loader.record_source_hash(source.name, digest, 1)
+    assert bulk_loader.source_unchanged(source.name, digest, "candidates")
+
+    source.write_text("name\nJones\n")
+    assert not bulk_loader.source_unchanged(
+        source.name, bulk_loader.file_sha256(source), "candidates"
+    )
@@ -0,0 +1,115 @@
+import os
+import sys
+import threading
+
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+import pytest
+from sqlalchemy import text
+
+from common.db_utils import (
+    create_db_engine,
+    engine_options,
+    get_async_sqlalchemy_url,
+    get_sqlalchemy_url,
+    is_sqlite_url,
+)
+
+from conftest import TEST_DATABASE_URL
+
+requires_postgres = pytest.mark.skipif(
+    not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set"
+)
+
+
+def test_database_url_overrides_sqlite_path(monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", "postgres://app:secret@db:5432/results")
+    assert get_sqlalchemy_url() == "postgresql://app:secret@db:5432/results"
+    assert not is_sqlite_url()
+    assert get_async_sqlalchemy_url() == "postgresql+asyncpg://app:secret@db:5432/results"
+
+    monkeypatch.delenv("DATABASE_URL")
+    assert get_sqlalchemy_url().startswith("sqlite:///")
+    assert get_async_sqlalchemy_url().startswith("sqlite+aiosqlite:///")
+
+
+def test_postgres_engine_uses_tuned_pool():
+    options = engine_options("postgresql://app@db/results")
+    assert options["pool_pre_ping"]
+    assert options["pool_size"] > 0
+    assert options["pool_recycle"] > 0
+
+
+def test_sqlite_connections_use_wal_and_busy_timeout(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'results.db'}")
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() > 0
+        assert conn.execute(text("PRAGMA cache_size")).scalar() < 0
+    engine.dispose()
+
+
+def test_uncommitted_work_is_rolled_back_on_release(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'results.db'}")
+    with engine.connect() as conn:
+        conn.execute(text("CREATE TABLE t (x INTEGER)"))
+        conn.commit()
+        conn.execute(text("INSERT INTO t VALUES (1)"))  # never committed
+
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM t")).scalar() == 0
+    engine.dispose()
+
+
+def test_engine_is_thread_safe(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'results.db'}")
+    with engine.connect() as conn:
+        conn.execute(text("CREATE TABLE t (x INTEGER)"))
+        conn.commit()
+
+    def writer(n):
+        for i in range(20):
+            with engine.connect() as conn:
+                conn.execute(text("INSERT INTO t VALUES (:x)"), {"x": n * 100 + i})
+                conn.commit()
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM t")).scalar() == 120
+    engine.dispose()
+
+
+@requires_postgres
+def test_postgres_concurrent_writers():
+    engine = create_db_engine(TEST_DATABASE_URL)
+    with engine.connect() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS db_utils_test"))
+        conn.execute(text("CREATE TABLE db_utils_test (x INTEGER)"))
+        conn.commit()
+
+    def writer(n):
+        for i in range(20):
+            with engine.connect() as conn:
+                conn.execute(
+                    text("INSERT INTO db_utils_test VALUES (:x)"), {"x": n * 100 + i}
+                )
+                conn.commit()
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM db_utils_test")).scalar() == 120
+        conn.execute(text("DROP TABLE db_utils_test"))
+        conn.commit()
+    engine.dispose()
@@ -0,0 +1,907 @@
+import asyncio
+import io
+import json
+from datetime import datetime
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+from sqlalchemy import create_engine, text, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from unittest.mock import AsyncMock
+
+import main
+from common import response_cache as response_cache_module
+from common.booth_matcher import BoothNameIndex
+from common.data_versions import REFERENCE_SCOPE, bump_versions, notify_changed
+from common.division_tally import TallyCache
+from common.http_client import SMS_MEDIA_MAX_BYTES, SharedHTTPClient
+from common.job_queue import JOB_MAX_ATTEMPTS
+from common.ocr_cache import OCRCache
+from common.ocr_engines import NoTableFound, OCRUnavailable
+from common.response_cache import ResponseCache
+from common.seat_projection import BaselineCache
+from main import (
+    app,
+    Base,
+    Candidate,
+    PollingPlace,
+    Result,
+    ResultPrimaryVote,
+    ResultTCPVote,
+    TCPCandidate,
+)
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def session_factory(tmp_path, monkeypatch):
+    db_path = tmp_path / "results.db"
+    engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(bind=engine)
+    async_engine = create_async_engine(
+        f"sqlite+aiosqlite:///{db_path}", poolclass=NullPool
+    )
+    monkeypatch.setattr(
+        main,
+        "AsyncSessionLocal",
+        async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False),
+    )
+    monkeypatch.setattr(main, "division_tallies", TallyCache())
+    monkeypatch.setattr(main, "response_cache", ResponseCache())
+    monkeypatch.setattr(main, "booth_index", BoothNameIndex())
+    monkeypatch.setattr(main, "projection_baselines", BaselineCache())
+    # Tests inspect the database through a plain sync session on the same file
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+
+def manual_entry(booth, primary, tcp, electorate="Testdiv"):
+    response = client.post(
+        "/manual-entry",
+        json={
+            "booth_name": booth,
+            "electorate": electorate,
+            "primary_votes": primary,
+            "two_candidate_preferred": tcp,
+            "totals": {"formal": sum(primary.values()), "informal": 3},
+        },
+    )
+    assert response.status_code == 200
+    return response.json()["result_id"]
+
+
+def test_division_results_aggregate_vote_rows(session_factory):
+    manual_entry(
+        "Booth A",
+        {"SMITH": 100, "JONES": 50, "BROWN": 10},
+        {"SMITH": {"BROWN": 6}, "JONES": {"BROWN": 4}},
+    )
+    manual_entry(
+        "Booth B",
+        {"SMITH": 20, "JONES": 80, "BROWN": 5},
+        {"SMITH": {"BROWN": 1}, "JONES": {"BROWN": 4}},
+    )
+    manual_entry("Elsewhere", {"SMITH": 999}, {}, electorate="Otherdiv")
+
+    data = client.get("/results/division/Testdiv").json()
+
+    assert data["status"] == "success"
+    assert data["booth_count"] == 2
+    assert {v["candidate"]: v["votes"] for v in data["primary_votes"]} == {
+        "SMITH": 120,
+        "JONES": 130,
+        "BROWN": 15,
+    }
+    assert data["tcp_votes"] == [
+        {
+            "candidate": "BROWN",
+            "primary_votes": 15,
+            "distributions": {
+                "JONES": {"votes": 8, "percentage": 8 / 15 * 100},
+                "SMITH": {"votes": 7, "percentage": 7 / 15 * 100},
+            },
+        }
+    ]
+    booth_a = next(b for b in data["booth_results"] if b["booth_name"] == "Booth A")
+    assert booth_a["primary_votes"] == {"SMITH": 100, "JONES": 50, "BROWN": 10}
+    assert booth_a["tcp_votes"] == {"SMITH": {"BROWN": 6}, "JONES": {"BROWN": 4}}
+    assert booth_a["totals"] == {"formal": 160, "informal": 3, "total": None}
+
+
+def test_vote_rows_replaced_on_update_and_reset(session_factory):
+    result_id = manual_entry("Booth A", {"SMITH": 100, "JONES": 50}, {})
+    client.post(
+        "/manual-entry",
+        json={
+            "result_id": result_id,
+            "booth_name": "Booth A",
+            "electorate": "Testdiv",
+            "primary_votes": {"SMITH": "7"},
+        },
+    )
+
+    db = session_factory()
+    rows = db.query(ResultPrimaryVote.candidate, ResultPrimaryVote.votes).all()
+    assert rows == [("SMITH", 7)]
+    db.close()
+
+    client.post("/admin/reset-results", json={"division": "Testdiv"})
+
+    db = session_factory()
+    assert db.query(Result).count() == 0
+    assert db.query(ResultPrimaryVote).count() == 0
+    assert db.query(ResultTCPVote).count() == 0
+    db.close()
+
+
+def without_timestamps(data):
+    data = dict(data)
+    data.pop("last_updated")
+    data["booth_results"] = [
+        {k: v for k, v in booth.items() if k != "timestamp"}
+        for booth in data["booth_results"]
+    ]
+    return data
+
+
+def test_cached_tally_follows_writes(session_factory, monkeypatch):
+    booth_a = manual_entry("Booth A", {"SMITH": 100, "JONES": 50}, {})
+    client.get("/results/division/Testdiv")
+    assert main.division_tallies.get("Testdiv", 1) is not None
+
+    manual_entry("Booth B", {"SMITH": 1, "BROWN": 9}, {"SMITH": {"BROWN": 9}})
+    manual_entry("Moved", {"SMITH": 5}, {})
+    client.post(
+        "/manual-entry",
+        json={
+            "result_id": booth_a,
+            "booth_name": "Booth A",
+            "electorate": "Testdiv",
+            "primary_votes": {"JONES": 70},
+        },
+    )
+    client.post(
+        "/admin/reset-results", json={"division": "Testdiv", "booth_name": "Moved"}
+    )
+
+    # Each write's delta moved the tally on to the version it committed as
+    tally = main.division_tallies.get("Testdiv", 5)
+    assert tally is not None
+    cached = client.get("/results/division/Testdiv").json()
+    assert main.division_tallies.get("Testdiv", 5) is tally
+    assert {v["candidate"]: v["votes"] for v in cached["primary_votes"]} == {
+        "SMITH": 1,
+        "BROWN": 9,
+        "JONES": 70,
+    }
+
+    # The incrementally maintained tally matches a fresh read of the database
+    monkeypatch.setattr(main, "division_tallies", TallyCache())
+    monkeypatch.setattr(main, "response_cache", ResponseCache())
+    monkeypatch.setattr(main, "booth_index", BoothNameIndex())
+    fresh = client.get("/results/division/Testdiv").json()
+    assert without_timestamps(cached) == without_timestamps(fresh)
+
+
+def test_tally_cache_rebuilt_on_startup(session_factory):
+    manual_entry("Booth A", {"SMITH": 100}, {})
+    main.division_tallies.clear()
+
+    with TestClient(app) as startup_client:
+        assert main.division_tallies.get("Testdiv", 1) is not None
+        data = startup_client.get("/results/division/Testdiv").json()
+    assert data["primary_votes"][0]["votes"] == 100
+
+
+def test_etags_follow_division_versions(session_factory):
+    manual_entry("Booth A", {"SMITH": 100}, {})
+    first = client.get("/results/division/Testdiv")
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "no-cache"
+
+    revalidated = client.get(
+        "/results/division/Testdiv", headers={"If-None-Match": etag}
+    )
+    assert revalidated.status_code == 304
+    assert revalidated.headers["ETag"] == etag
+    assert client.get("/results/division/Testdiv").json() == first.json()
+
+    # A write elsewhere leaves this division's tag alone but not /results
+    results_etag = client.get("/results").headers["ETag"]
+    manual_entry("Elsewhere", {"SMITH": 1}, {}, electorate="Otherdiv")
+    assert (
+        client.get(
+            "/results/division/Testdiv", headers={"If-None-Match": etag}
+        ).status_code
+        == 304
+    )
+    assert (
+        client.get("/results", headers={"If-None-Match": results_etag}).status_code
+        == 200
+    )
+
+    manual_entry("Booth B", {"SMITH": 5}, {})
+    changed = client.get("/results/division/Testdiv", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert changed.json()["booth_count"] == 2
+
+
+def test_division_etags_match_the_tally_served(session_factory, monkeypatch):
+    manual_entry("Booth A", {"SMITH": 100}, {})
+    etag = client.get("/results/division/Testdiv").headers["ETag"]
+
+    # A write through another process bumps the version in the database
+    # without this process's tally hearing about it
+    monkeypatch.setattr(main, "update_division_tally", lambda *args: None)
+    manual_entry("Booth B", {"SMITH": 5}, {})
+    assert main.division_tallies.get("Testdiv", 2) is None
+
+    changed = client.get("/results/division/Testdiv", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert changed.json()["primary_votes"][0]["votes"] == 105
+    assert main.division_tallies.get("Testdiv", 2) is not None
+    assert (
+        client.get(
+            "/results/division/Testdiv",
+            headers={"If-None-Match": changed.headers["ETag"]},
+        ).status_code
+        == 304
+    )
+
+
+def test_reference_etags(session_factory):
+    for path in ("/candidates", "/electorates", "/polling-places/division/Testdiv"):
+        etag = client.get(path).headers["ETag"]
+        assert client.get(path, headers={"If-None-Match": etag}).status_code == 304
+
+
+def cache_stats():
+    return client.get("/admin/response-cache").json()["response_cache"]
+
+
+def test_reference_responses_are_cached_until_invalidated(session_factory):
+    first = client.get("/candidates", params={"division": "Testdiv"})
+    second = client.get("/candidates", params={"division": "Testdiv"})
+    assert first.content == second.content
+    assert first.headers["ETag"] == second.headers["ETag"]
+    assert second.headers["Cache-Control"].startswith("public, max-age=")
+    assert (cache_stats()["hits"], cache_stats()["misses"]) == (1, 1)
+
+    with session_factory() as db:
+        db.add(
+            Candidate(
+                candidate_name="SMITH",
+                electorate="Testdiv",
+                candidate_type="house",
+            )
+        )
+        db.commit()
+    # Still served from the cache until a loader reports the change
+    assert client.get("/candidates", params={"division": "Testdiv"}).json()[
+        "candidates"
+    ] == []
+    notify_changed([REFERENCE_SCOPE])
+    candidates = client.get("/candidates", params={"division": "Testdiv"}).json()
+    assert [c["candidate_name"] for c in candidates["candidates"]] == ["SMITH"]
+
+    assert client.get("/electorates").json()["electorates"] == []
+    manual_entry("Booth A", {"SMITH": 10}, {})
+    assert client.get("/electorates").json()["electorates"] == ["Testdiv"]
+
+    # A reload by another process isn't reported here, but moves the version
+    etag = client.get("/candidates").headers["ETag"]
+    with session_factory() as db:
+        db.add(
+            Candidate(
+                candidate_name="JONES",
+                electorate="Testdiv",
+                candidate_type="house",
+            )
+        )
+        bump_versions(db.connection(), [REFERENCE_SCOPE])
+        db.commit()
+    reloaded = client.get("/candidates", headers={"If-None-Match": etag})
+    assert reloaded.status_code == 200
+    assert reloaded.headers["ETag"] != etag
+    assert len(reloaded.json()["candidates"]) == 2
+
+
+def test_response_cache_expires_and_evicts(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache_module.time, "monotonic", lambda: now[0])
+    cache = ResponseCache(max_entries=2, ttl=30)
+    cache.put("/a", b"a", '"a"', ["reference"])
+    cache.put("/b", b"b", '"b"', ["results"])
+    assert cache.get("/a").body == b"a"
+    cache.put("/c", b"c", '"c"', ["reference"])
+    assert cache.get("/b") is None
+
+    generation = cache.generation()
+    cache.invalidate("results")
+    cache.put("/stale", b"stale", '"s"', ["results"], generation)
+    assert cache.get("/stale") is None
+
+    now[0] += 31
+    assert cache.get("/a") is None
+    assert cache.stats()["evictions"] == 1
+
+
+def add_2022_booths(db, booths):
+    db.execute(
+        text(
+            """
+        CREATE TABLE booth_results_2022 (
+            id INTEGER PRIMARY KEY,
+            division_name TEXT NOT NULL,
+            polling_place_name TEXT NOT NULL,
+            liberal_national_percentage REAL,
+            labor_percentage REAL,
+            total_votes INTEGER,
+            data TEXT,
+            row_hash TEXT
+        )
+    """
+        )
+    )
+    for n, (division, booth, liberal, total_votes) in enumerate(booths):
+        db.add(
+            PollingPlace(
+                state="NSW",
+                division_id=1,
+                division_name=division,
+                polling_place_id=n,
+                polling_place_name=booth,
+            )
+        )
+        db.execute(
+            text(
+                "INSERT INTO booth_results_2022 (division_name, polling_place_name, "
+                "liberal_national_percentage, total_votes) "
+                "VALUES (:division, :booth, :liberal, :total_votes)"
+            ),
+            {
+                "division": division,
+                "booth": booth,
+                "liberal": liberal,
+                "total_votes": total_votes,
+            },
+        )
+
+
+def test_booth_results_include_swing(session_factory):
+    with session_factory() as db:
+        add_2022_booths(
+            db,
+            [
+                ("Testdiv", "Booth A", 55.0, 1000),
+                ("Testdiv", "Booth B", 40.0, 1000),
+                ("Otherdiv", "Booth C", 60.0, 1000),
+            ],
+        )
+        db.add(TCPCandidate(electorate="Testdiv", candidate_name="JONES", party="Labor"))
+        db.add(
+            TCPCandidate(electorate="Testdiv", candidate_name="SMITH", party="Liberal")
+        )
+        db.commit()
+
+    manual_entry(
+        "Booth A",
+        {"JONES": 40, "SMITH": 50, "BROWN": 10},
+        {"JONES": {"JONES": 40, "BROWN": 6}, "SMITH": {"SMITH": 50, "BROWN": 4}},
+    )
+    manual_entry("Booth C", {"SMITH": 10}, {}, electorate="Otherdiv")
+
+    data = client.get("/booth-results", params={"division": "Testdiv"}).json()
+    assert (data["tcp_candidate_1_name"], data["tcp_candidate_2_name"]) == (
+        "JONES",
+        "SMITH",
+    )
+    booths = {b["polling_place_name"]: b for b in data["booth_results"]}
+    # TCP is JONES 46 / SMITH 54 against a 55% Liberal share in 2022
+    assert booths["Booth A"]["tcp_candidate_2_percentage"] == pytest.approx(54.0)
+    assert booths["Booth A"]["swing"] == pytest.approx(-1.0)
+    assert booths["Booth A"]["is_reviewed"]
+    assert data["results_map"]["BOOTH A"]["swing"] == pytest.approx(-1.0)
+    assert booths["Booth B"]["swing"] is None
+    assert booths["Booth B"]["tcp_2022"]["tcp2_pct"] == 40.0
+
+    national = client.get("/booth-results", params={"national": "true"}).json()
+    assert set(national["divisions"]) == {"Testdiv", "Otherdiv"}
+    assert national["divisions"]["Testdiv"]["booth_results"] == data["booth_results"]
+    other = national["divisions"]["Otherdiv"]
+    assert other["tcp_candidate_1_name"] == "TCP Candidate 1"
+    assert other["booth_results"][0]["swing"] is None
+
+
+def test_batch_division_results(session_factory):
+    with session_factory() as db:
+        for n, booth in enumerate(("Booth A", "Booth B", "Booth C")):
+            db.add(
+                PollingPlace(
+                    state="NSW",
+                    division_id=1,
+                    division_name="Testdiv",
+                    polling_place_id=n,
+                    polling_place_name=booth,
+                )
+            )
+        db.commit()
+    manual_entry("Booth A", {"SMITH": 100, "JONES": 50}, {"SMITH": {"JONES": 50}})
+    manual_entry("Booth B", {"SMITH": 20, "JONES": 80}, {"JONES": {"SMITH": 20}})
+    manual_entry("Elsewhere", {"BROWN": 7}, {}, electorate="Otherdiv")
+
+    response = client.get("/results/divisions", params={"divisions": "all"})
+    data = response.json()
+    assert set(data["divisions"]) == {"Testdiv", "Otherdiv"}
+    testdiv = data["divisions"]["Testdiv"]
+    assert (testdiv["booth_count"], testdiv["total_booths"]) == (2, 3)
+    assert testdiv["primary_votes"] == [
+        {"candidate": "JONES", "votes": 130, "percentage": 130 / 250 * 100},
+        {"candidate": "SMITH", "votes": 120, "percentage": 120 / 250 * 100},
+    ]
+    assert {v["candidate"]: v["votes"] for v in testdiv["tcp_votes"]} == {
+        "SMITH": 50,
+        "JONES": 20,
+    }
+    division = client.get("/results/division/Testdiv").json()
+    assert testdiv["last_updated"] == division["last_updated"]
+    assert (
+        client.get(
+            "/results/divisions", headers={"If-None-Match": response.headers["ETag"]}
+        ).status_code
+        == 304
+    )
+
+    selected = client.get(
+        "/results/divisions",
+        params=[("divisions", "Otherdiv"), ("divisions", "Nowhere")],
+    ).json()["divisions"]
+    assert list(selected) == ["Nowhere", "Otherdiv"]
+    assert selected["Nowhere"]["booth_count"] == 0
+    assert selected["Otherdiv"]["primary_votes"][0]["votes"] == 7
+
+
+def test_scanned_booth_names_resolve_to_polling_places(
+    session_factory, monkeypatch, tmp_path
+):
+    with session_factory() as db:
+        for n, booth in enumerate(("Manly West Public School", "Manly Vale")):
+            db.add(
+                PollingPlace(
+                    state="NSW",
+                    division_id=1,
+                    division_name="Warringah",
+                    polling_place_id=100 + n,
+                    polling_place_name=booth,
+                )
+            )
+        db.commit()
+    monkeypatch.setattr(main, "uploads_dir", tmp_path)
+
+    def scan(booth_name):
+        monkeypatch.setattr(
+            main.image_processor,
+            "process_image",
+            AsyncMock(
+                return_value={
+                    "extracted_rows": [
+                        {"RowIndex": 1, "ColumnIndex": 1, "Text": "CANDIDATE"},
+                        {"RowIndex": 2, "ColumnIndex": 1, "Text": "SMITH"},
+                        {"RowIndex": 2, "ColumnIndex": 2, "Text": "12"},
+                    ],
+                    "booth_name": booth_name,
+                }
+            ),
+        )
+        response = client.post(
+            "/scan-image", files={"file": ("sheet.jpg", b"image", "image/jpeg")}
+        )
+        assert response.status_code == 202
+        assert response.json()["status"] == "queued"
+        assert asyncio.run(main.scan_workers.drain()) == 1
+        job = client.get(response.json()["status_url"]).json()["job"]
+        assert (job["status"], job["attempts"]) == ("succeeded", 1)
+        return job["result"]
+
+    scanned = scan("MANLY WEST P.S")
+    assert scanned["aec_booth_name"] == "Manly West Public School"
+    assert scanned["booth_matches"][0]["polling_place_id"] == 100
+    with session_factory() as db:
+        result = db.get(Result, scanned["result_id"])
+        assert result.aec_booth_name == "Manly West Public School"
+        assert json.loads(result.data)["booth_match"]["polling_place_id"] == 100
+
+    unclear = scan("Booth 7")
+    assert unclear["aec_booth_name"] is None
+    detail = client.get(f"/admin/result/{unclear['result_id']}").json()["result"]
+    assert detail["booth_matches"] == unclear["booth_matches"]
+
+    # Reloading reference data re-indexes the division
+    with session_factory() as db:
+        db.add(
+            PollingPlace(
+                state="NSW",
+                division_id=1,
+                division_name="Warringah",
+                polling_place_id=107,
+                polling_place_name="Booth 7",
+            )
+        )
+        db.commit()
+    notify_changed([REFERENCE_SCOPE])
+    matches = client.get(
+        "/admin/booth-matches/division/Warringah", params={"name": "booth 7"}
+    ).json()
+    assert matches["match"]["polling_place_id"] == 107
+
+    # So does a reload by another process, seen through the reference version
+    with session_factory() as db:
+        db.add(
+            PollingPlace(
+                state="NSW",
+                division_id=1,
+                division_name="Warringah",
+                polling_place_id=108,
+                polling_place_name="Booth 8",
+            )
+        )
+        bump_versions(db.connection(), [REFERENCE_SCOPE])
+        db.commit()
+    matches = client.get(
+        "/admin/booth-matches/division/Warringah", params={"name": "booth 8"}
+    ).json()
+    assert matches["match"]["polling_place_id"] == 108
+
+
+def test_projection_weights_booths_by_2022_votes(session_factory):
+    with session_factory() as db:
+        add_2022_booths(
+            db,
+            [
+                ("Testdiv", "Booth A", 55.0, 1000),
+                ("Testdiv", "Booth B", 40.0, 3000),
+                ("Otherdiv", "Booth C", 60.0, 1000),
+            ],
+        )
+        db.add(TCPCandidate(electorate="Testdiv", candidate_name="JONES", party="Labor"))
+        db.add(
+            TCPCandidate(electorate="Testdiv", candidate_name="SMITH", party="Liberal")
+        )
+        db.commit()
+
+    projection = client.get("/results/division/Testdiv/projection").json()
+    assert (projection["booths_counted"], projection["total_booths"]) == (0, 2)
+    assert projection["projected_tcp"] is None
+
+    manual_entry(
+        "Booth A",
+        {"JONES": 40, "SMITH": 50, "BROWN": 10},
+        {"JONES": {"JONES": 40, "BROWN": 6}, "SMITH": {"SMITH": 50, "BROWN": 4}},
+    )
+    manual_entry(
+        "Booth Z",
+        {"JONES": 10, "SMITH": 10},
+        {"JONES": {"JONES": 10}, "SMITH": {"SMITH": 10}},
+    )
+
+    response = client.get("/results/division/Testdiv/projection")
+    projection = response.json()
+    # JONES won 46% at Booth A against 45% in 2022; Booth B moves by the same
+    # point to 61% and carries three times the weight
+    assert projection["swing"] == pytest.approx(1.0)
+    assert projection["projected_tcp"]["JONES"] == pytest.approx(
+        (46 * 1000 + 61 * 3000) / 4000
+    )
+    assert projection["projected_winner"] == "JONES"
+    assert projection["counted_vote_share"] == pytest.approx(25.0)
+    assert projection["unmatched_results"] == 1
+    assert (
+        client.get(
+            "/results/division/Testdiv/projection",
+            headers={"If-None-Match": response.headers["ETag"]},
+        ).status_code
+        == 304
+    )
+
+    national = client.get("/results/projection").json()["divisions"]
+    assert set(national) == {"Testdiv", "Otherdiv"}
+    assert national["Testdiv"] == {
+        key: value for key, value in projection.items() if key != "status"
+    }
+    assert national["Otherdiv"]["projected_winner"] is None
+
+    # A reload of the 2022 booths by another process is seen through the
+    # reference version
+    with session_factory() as db:
+        db.execute(
+            text(
+                "UPDATE booth_results_2022 SET total_votes = 1000 "
+                "WHERE polling_place_name = 'Booth B'"
+            )
+        )
+        bump_versions(db.connection(), [REFERENCE_SCOPE])
+        db.commit()
+    projection = client.get("/results/division/Testdiv/projection").json()
+    assert projection["projected_tcp"]["JONES"] == pytest.approx((46 + 61) / 2)
+
+
+def test_results_pages_and_streams(session_factory):
+    ids = [
+        manual_entry(f"Booth {n}", {"SMITH": n}, {}, electorate="Testdiv")
+        for n in range(5)
+    ]
+    with session_factory() as db:
+        # Ties on timestamp are broken by id
+        db.execute(update(Result).values(timestamp=datetime(2025, 5, 3, 18)))
+        db.commit()
+    newest_first = ids[::-1]
+
+    full = client.get("/results").json()
+    assert [r["id"] for r in full["results"]] == newest_first
+    assert full["next_cursor"] is None
+    # Stored JSON is passed through as an object, not a string
+    with session_factory() as db:
+        stored = db.get(Result, newest_first[0]).data
+    assert full["results"][0]["data"] == json.loads(stored)
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, "fields": "id,booth_name"}
+        if cursor:
+            params["cursor"] = cursor
+        page = client.get("/results", params=params).json()
+        assert all(set(r) == {"id", "booth_name"} for r in page["results"])
+        seen += [r["id"] for r in page["results"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    assert seen == newest_first
+
+    response = client.get(
+        "/results", params={"format": "ndjson", "fields": "id", "limit": 3}
+    )
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert response.headers["ETag"]
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[:3] == [{"id": n} for n in newest_first[:3]]
+    rest = client.get(
+        "/results",
+        params={"cursor": lines[3]["next_cursor"], "fields": "id"},
+        headers={"Accept": "application/x-ndjson"},
+    )
+    assert [json.loads(line) for line in rest.text.splitlines()] == [
+        {"id": n} for n in newest_first[3:]
+    ]
+
+    assert client.get("/results", params={"fields": "id,secret"}).status_code == 400
+    assert client.get("/results", params={"cursor": "nonsense"}).status_code == 400
+
+
+def test_result_changes_feed(session_factory):
+    start = client.get("/results/changes").json()
+    assert (start["results"], start["deleted"]) == ([], [])
+
+    first = manual_entry("Booth A", {"SMITH": 5}, {})
+    second = manual_entry("Booth C", {"SMITH": 7}, {}, electorate="Otherdiv")
+    changes = client.get(
+        "/results/changes", params={"since": start["seq"], "fields": "id,booth_name"}
+    ).json()
+    assert changes["results"] == [
+        {"id": second, "booth_name": "Booth C"},
+        {"id": first, "booth_name": "Booth A"},
+    ]
+    assert changes["divisions"] == ["Otherdiv", "Testdiv"]
+    assert not changes["reset"]
+
+    response = client.post(
+        f"/results/{first}/update-booth-name", json={"booth_name": "Booth B"}
+    )
+    assert response.status_code == 200
+    client.post("/admin/reset-results", json={"division": "Otherdiv"})
+    response = client.get("/results/changes", params={"since": changes["seq"]})
+    later = response.json()
+    assert [r["booth_name"] for r in later["results"]] == ["Booth B"]
+    assert later["deleted"] == [second]
+    assert later["divisions"] == ["Otherdiv", "Testdiv"]
+    assert later["seq"] > changes["seq"]
+
+    # Nothing new since the latest seq
+    latest = client.get("/results/changes", params={"since": later["seq"]}).json()
+    assert (latest["results"], latest["deleted"], latest["divisions"]) == ([], [], [])
+    assert (
+        client.get(
+            "/results/changes",
+            params={"since": changes["seq"]},
+            headers={"If-None-Match": response.headers["ETag"]},
+        ).status_code
+        == 304
+    )
+    assert client.get("/results/changes", params={"since": 10**6}).json()["reset"]
+
+
+def test_failed_scans_are_retried_then_dead_lettered(
+    session_factory, monkeypatch, tmp_path
+):
+    uploads = tmp_path / "uploads"
+    uploads.mkdir()
+    monkeypatch.setattr(main, "uploads_dir", uploads)
+    monkeypatch.setattr(
+        main.image_processor,
+        "process_image",
+        AsyncMock(side_effect=RuntimeError("Textract throttled")),
+    )
+    monkeypatch.setattr(main.job_queue, "retry_delay", 0)
+    job_id = client.post(
+        "/scan-image", files={"file": ("sheet.jpg", b"image", "image/jpeg")}
+    ).json()["job_id"]
+    # The upload is kept for the retries
+    assert [path.read_bytes() for path in uploads.iterdir()] == [b"image"]
+
+    assert asyncio.run(main.scan_workers.drain()) == JOB_MAX_ATTEMPTS
+    job = client.get(f"/jobs/{job_id}").json()["job"]
+    assert (job["status"], job["error"]) == ("dead", "Textract throttled")
+
+    retried = client.post(f"/admin/jobs/{job_id}/retry").json()["job"]
+    assert (retried["status"], retried["attempts"]) == ("queued", 0)
+    assert client.post(f"/admin/jobs/{job_id}/retry").status_code == 400
+    assert client.get("/jobs/999").status_code == 404
+
+
+@pytest.mark.parametrize(
+    "error, attempts",
+    [
+        (NoTableFound("textract: no table"), 1),
+        (OCRUnavailable("tesseract: TesseractError()"), 1),
+        (OCRUnavailable("textract: circuit open", transient=True), JOB_MAX_ATTEMPTS),
+    ],
+)
+def test_scans_that_cannot_succeed_are_not_retried(
+    session_factory, monkeypatch, tmp_path, error, attempts
+):
+    monkeypatch.setattr(main, "uploads_dir", tmp_path)
+    monkeypatch.setattr(
+        main.image_processor, "process_image", AsyncMock(side_effect=error)
+    )
+    monkeypatch.setattr(main.job_queue, "retry_delay", 0)
+    job_id = client.post(
+        "/scan-image", files={"file": ("sheet.jpg", b"image", "image/jpeg")}
+    ).json()["job_id"]
+
+    assert asyncio.run(main.scan_workers.drain()) == attempts
+    job = client.get(f"/jobs/{job_id}").json()["job"]
+    assert job["status"] == "dead"
+    assert str(error) in job["error"]
+
+
+def test_undecodable_scans_are_dead_lettered_without_ocr(
+    session_factory, monkeypatch, tmp_path
+):
+    monkeypatch.setattr(main, "uploads_dir", tmp_path)
+    textract = AsyncMock()
+    processor = main.ImageProcessor(
+        executor=AsyncMock(analyze_document=textract),
+        cache=OCRCache(tmp_path / "ocr_cache"),
+    )
+    monkeypatch.setattr(main, "image_processor", processor)
+    job_id = client.post(
+        "/scan-image", files={"file": ("sheet.jpg", b"not an image", "image/jpeg")}
+    ).json()["job_id"]
+
+    assert asyncio.run(main.scan_workers.drain()) == 1
+    job = client.get(f"/jobs/{job_id}").json()["job"]
+    assert (job["status"], job["error"]) == ("dead", "Invalid image format")
+    textract.assert_not_called()
+
+
+def test_repeat_scans_link_to_the_saved_result(
+    session_factory, monkeypatch, tmp_path
+):
+    uploads = tmp_path / "uploads"
+    uploads.mkdir()
+    monkeypatch.setattr(main, "uploads_dir", uploads)
+    cells = [(1, 1, "CANDIDATE"), (2, 1, "SMITH"), (2, 2, "12")]
+    blocks = [
+        {
+            "Id": "table",
+            "BlockType": "TABLE",
+            "Relationships": [
+                {"Type": "CHILD", "Ids": [f"cell{n}" for n in range(len(cells))]}
+            ],
+        },
+        {"Id": "query", "BlockType": "QUERY_RESULT", "Text": "Booth A"},
+    ]
+    for n, (row, column, word) in enumerate(cells):
+        blocks.append(
+            {
+                "Id": f"cell{n}",
+                "BlockType": "CELL",
+                "RowIndex": row,
+                "ColumnIndex": column,
+                "Relationships": [{"Type": "CHILD", "Ids": [f"word{n}"]}],
+            }
+        )
+        blocks.append({"Id": f"word{n}", "BlockType": "WORD", "Text": word})
+    textract = AsyncMock(return_value={"Blocks": blocks})
+    processor = main.ImageProcessor(
+        executor=AsyncMock(analyze_document=textract),
+        cache=OCRCache(tmp_path / "ocr_cache"),
+    )
+    monkeypatch.setattr(main, "image_processor", processor)
+
+    image = io.BytesIO()
+    Image.new("RGB", (4, 4)).save(image, format="PNG")
+
+    def scan():
+        job_id = client.post(
+            "/scan-image",
+            files={"file": ("sheet.png", image.getvalue(), "image/png")},
+        ).json()["job_id"]
+        asyncio.run(main.scan_workers.drain())
+        return client.get(f"/jobs/{job_id}").json()["job"]["result"]
+
+    first = scan()
+    again = scan()
+    assert textract.await_count == 1
+    assert again["result_id"] == first["result_id"]
+    assert again["duplicate"]
+    assert again["primary_votes"] == first["primary_votes"] == {"SMITH": 12}
+    assert client.get("/admin/ocr-cache").json()["ocr_cache"]["hits"] == 1
+
+    # Once the result is gone the image is saved again, from the cached scan
+    with session_factory() as db:
+        db.delete(db.get(Result, first["result_id"]))
+        db.commit()
+    rescanned = scan()
+    assert textract.await_count == 1
+    assert "duplicate" not in rescanned
+
+
+def test_inbound_sms_downloads_media_once(session_factory, monkeypatch):
+    requests = []
+
+    def media(request):
+        requests.append(str(request.url))
+        if request.url.path == "/huge.jpg":
+            too_big = str(SMS_MEDIA_MAX_BYTES + 1)
+            return httpx.Response(200, headers={"Content-Length": too_big})
+        return httpx.Response(200, content=b"sheet")
+
+    monkeypatch.setattr(
+        main, "http_client", SharedHTTPClient(transport=httpx.MockTransport(media))
+    )
+    monkeypatch.setattr(
+        main.image_processor,
+        "process_image",
+        AsyncMock(
+            return_value={
+                "extracted_rows": [{"RowIndex": 1, "ColumnIndex": 1, "Text": "X"}],
+                "booth_name": "Booth A",
+                "electorate": "Testdiv",
+            }
+        ),
+    )
+    form = {
+        "from": "+61400000000",
+        "to": "+61400000001",
+        "body": "Booth A",
+        "timestamp": "2025-05-03T18:30:00",
+        "media": "https://media.example/sheet.jpg",
+    }
+    response = client.post("/inbound-sms", data=form)
+    assert response.status_code == 200
+    assert requests == ["https://media.example/sheet.jpg"]
+    main.image_processor.process_image.assert_awaited_once_with(
+        b"sheet", source="sms"
+    )
+
+    response = client.post(
+        "/inbound-sms", data={**form, "media": "https://media.example/huge.jpg"}
+    )
+    assert response.status_code == 413
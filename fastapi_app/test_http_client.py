@@ -0,0 +1,82 @@
+import asyncio
+import os
+import sys
+
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+import httpx
+import pytest
+
+from common.http_client import DownloadTooLarge, SharedHTTPClient, download
+
+
+def serve(*responses):
+    """Mock transport answering with the given responses in turn."""
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return responses[min(len(requests), len(responses)) - 1]
+
+    return SharedHTTPClient(transport=httpx.MockTransport(handler)), requests
+
+
+def fetch(shared, url="https://media.example/sheet.jpg", **kwargs):
+    async def run():
+        try:
+            return await download(shared.get(), url, retry_base=0, **kwargs)
+        finally:
+            await shared.aclose()
+
+    return asyncio.run(run())
+
+
+def test_transient_failures_are_retried():
+    shared, requests = serve(
+        httpx.Response(503), httpx.Response(429), httpx.Response(200, content=b"jpg")
+    )
+    assert fetch(shared) == b"jpg"
+    assert len(requests) == 3
+
+    shared, requests = serve(httpx.Response(404))
+    with pytest.raises(httpx.HTTPStatusError):
+        fetch(shared)
+    assert len(requests) == 1
+
+    shared, requests = serve(httpx.Response(502))
+    with pytest.raises(httpx.HTTPStatusError):
+        fetch(shared, retries=1)
+    assert len(requests) == 2
+
+
+def test_downloads_stop_at_the_size_limit():
+    shared, _ = serve(httpx.Response(200, content=b"x" * 100))
+    assert fetch(shared, max_bytes=100) == b"x" * 100
+
+    shared, _ = serve(httpx.Response(200, content=b"x" * 101))
+    with pytest.raises(DownloadTooLarge):
+        fetch(shared, max_bytes=100)
+
+    # Without a Content-Length the body is cut off as it streams in
+    async def chunks():
+        for _ in range(10):
+            yield b"x" * 60
+
+    shared, _ = serve(httpx.Response(200, content=chunks()))
+    with pytest.raises(DownloadTooLarge):
+        fetch(shared, max_bytes=100)
+
+
+def test_client_is_shared_within_a_loop():
+    shared, _ = serve(httpx.Response(200))
+
+    async def clients():
+        return shared.get(), shared.get()
+
+    first, again = asyncio.run(clients())
+    assert first is again
+    # Another event loop gets its own client and connections
+    other, _ = asyncio.run(clients())
+    assert other is not first
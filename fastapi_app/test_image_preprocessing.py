@@ -0,0 +1,89 @@
+import asyncio
+import io
+import os
+import sys
+
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+import pytest
+from PIL import Image
+
+from common.image_preprocessing import (
+    ImagePreprocessor,
+    PreprocessConfig,
+    preprocess_image,
+)
+
+
+def photo(size, format="JPEG", orientation=None, noisy=False):
+    image = Image.new("RGB", size, (120, 130, 140))
+    if noisy:
+        image = Image.frombytes("RGB", size, os.urandom(size[0] * size[1] * 3))
+    exif = Image.Exif()
+    if orientation:
+        exif[0x0112] = orientation
+    data = io.BytesIO()
+    image.save(data, format=format, exif=exif)
+    return data.getvalue()
+
+
+def test_photos_are_rotated_scaled_and_grayscaled():
+    config = PreprocessConfig(max_dimension=400, grayscale=True, autocontrast=True)
+    # Orientation 6: the camera was turned, so the stored image lies sideways
+    output, report = preprocess_image(photo((800, 600), orientation=6), config)
+
+    image = Image.open(io.BytesIO(output))
+    assert image.size == (300, 400)
+    assert image.mode == "L"
+    assert report["size_in"] == [800, 600]
+    assert report["size_out"] == [300, 400]
+    assert report["bytes_out"] == len(output)
+    assert list(report["timings_ms"]) == [
+        "decode",
+        "auto_rotate",
+        "downscale",
+        "grayscale",
+        "autocontrast",
+        "encode",
+    ]
+
+
+def test_output_format_follows_payload_size():
+    config = PreprocessConfig(grayscale=False, autocontrast=False, png_max_bytes=10000)
+    small, report = preprocess_image(photo((50, 50)), config)
+    assert report["format"] == "PNG"
+    assert small.startswith(b"\x89PNG")
+
+    # Noise compresses badly as PNG, so it is sent as JPEG
+    large, report = preprocess_image(photo((300, 300), noisy=True), config)
+    assert report["format"] == "JPEG"
+    assert Image.open(io.BytesIO(large)).format == "JPEG"
+
+    # Images still too big as JPEG are scaled down until they fit
+    config = PreprocessConfig(grayscale=False, png_max_bytes=0, max_bytes=40000)
+    fitted, report = preprocess_image(photo((400, 400), noisy=True), config)
+    assert len(fitted) <= 40000
+    assert report["size_out"][0] < 400
+
+
+def test_preprocessing_runs_in_worker_processes():
+    config = PreprocessConfig(max_dimension=100)
+    image = photo((200, 100), format="PNG")
+
+    async def run(workers, *images):
+        preprocessor = ImagePreprocessor(config, workers=workers)
+        try:
+            return [await preprocessor.preprocess(data) for data in images]
+        finally:
+            preprocessor.shutdown()
+
+    (pooled,) = asyncio.run(run(1, image))
+    (inline,) = asyncio.run(run(0, image))
+    assert pooled[0] == inline[0]
+    assert pooled[1]["size_out"] == [100, 50]
+
+    # Decoding errors come back from the worker
+    with pytest.raises(OSError):
+        asyncio.run(run(1, b"not an image"))
@@ -0,0 +1,106 @@
+import asyncio
+import os
+import sys
+
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from common.db_utils import get_async_sqlalchemy_url
+from common.job_queue import DEAD, QUEUED, SUCCEEDED, JobQueue, create_jobs_table
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def queue(db_engine):
+    with db_engine.begin() as conn:
+        create_jobs_table(conn)
+    async_engine = create_async_engine(
+        get_async_sqlalchemy_url(db_engine.url.render_as_string(hide_password=False)),
+        poolclass=NullPool,
+    )
+    return JobQueue(
+        async_sessionmaker(async_engine, expire_on_commit=False),
+        lease_seconds=60,
+        retry_delay=10,
+        clock=Clock(),
+    )
+
+
+def test_failures_back_off_then_dead_letter(queue):
+    async def run():
+        job = await queue.enqueue("scan_image", {"image": "a.jpg"}, max_attempts=3)
+        assert job.status == QUEUED
+
+        claimed = await queue.claim(["scan_image"])
+        assert (claimed.id, claimed.attempts) == (job.id, 1)
+        assert await queue.claim(["scan_image"]) is None
+        await queue.fail(claimed, "throttled")
+        # Retries wait 10s, then 20s
+        assert (await queue.get(job.id)).run_after == queue.clock.now + 10
+        assert await queue.claim(["scan_image"]) is None
+
+        queue.clock.now += 10
+        claimed = await queue.claim(["scan_image"])
+        await queue.fail(claimed, "throttled")
+        queue.clock.now += 20
+        claimed = await queue.claim(["scan_image"])
+        assert claimed.attempts == 3
+        await queue.fail(claimed, "still throttled")
+
+        dead = await queue.get(job.id)
+        assert (dead.status, dead.error) == (DEAD, "still throttled")
+        assert await queue.claim(["scan_image"]) is None
+
+        requeued = await queue.requeue(job.id)
+        assert (requeued.status, requeued.attempts) == (QUEUED, 0)
+        assert await queue.requeue(job.id) is None
+
+    asyncio.run(run())
+
+
+def test_expired_lease_is_taken_over(queue):
+    async def run():
+        job = await queue.enqueue("scan_image", {}, max_attempts=2)
+        stalled = await queue.claim(["scan_image"])
+
+        queue.clock.now += 61
+        taken_over = await queue.claim(["scan_image"])
+        assert (taken_over.id, taken_over.attempts) == (job.id, 2)
+
+        # The stalled worker no longer owns the job
+        assert not await queue.complete(stalled, {"result_id": 1})
+        assert await queue.complete(taken_over, {"result_id": 2})
+        done = await queue.get(job.id)
+        assert (done.status, done.result) == (SUCCEEDED, {"result_id": 2})
+
+        # A worker dying on the last attempt leaves the job dead
+        last = await queue.enqueue("scan_image", {}, max_attempts=1)
+        await queue.claim(["scan_image"])
+        queue.clock.now += 61
+        assert await queue.claim(["scan_image"]) is None
+        assert (await queue.get(last.id)).status == DEAD
+
+    asyncio.run(run())
+
+
+def test_concurrent_claims_take_each_job_once(queue):
+    async def run():
+        for n in range(5):
+            await queue.enqueue("scan_image", {"n": n})
+        claims = await asyncio.gather(*[queue.claim(["scan_image"]) for _ in range(8)])
+        return [job.id for job in claims if job]
+
+    claimed = asyncio.run(run())
+    assert len(claimed) == len(set(claimed)) == 5
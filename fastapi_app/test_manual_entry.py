@@ -1,21 +1,28 @@
 import pytest
 from fastapi.testclient import TestClient
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 import json
+from datetime import datetime
 
 from main import app
 
 client = TestClient(app)
 
-@patch('main.httpx.AsyncClient')
-@patch('main.SessionLocal')
-def test_manual_entry_new_result(mock_session, mock_httpx):
-    mock_db = MagicMock()
+@patch('main.notifier')
+@patch('main.AsyncSessionLocal')
+def test_manual_entry_new_result(mock_session, mock_notifier):
+    mock_db = AsyncMock()
+    mock_db.add = MagicMock()
+    mock_db.add_all = MagicMock()
+
+    async def refresh(result):
+        # Fill in what the database would on insert
+        result.id = 1
+        result.timestamp = datetime(2025, 5, 3, 18)
+
+    mock_db.refresh.side_effect = refresh
     mock_session.return_value = mock_db
     
-    mock_client = MagicMock()
-    mock_httpx.return_value.__aenter__.return_value = mock_client
-    
     test_data = {
         "booth_name": "Test Booth",
         "electorate": "Test Electorate",
@@ -35,19 +42,19 @@ def test_manual_entry_new_result(mock_session, mock_httpx):
     assert mock_db.add.called
     assert mock_db.commit.called
     
-    assert mock_client.post.called
+    assert mock_notifier.notify.called
+    assert mock_notifier.notify.call_args.args[0]["timestamp"] == "2025-05-03T18:00:00"
 
-@patch('main.httpx.AsyncClient')
-@patch('main.SessionLocal')
-def test_manual_entry_update_existing(mock_session, mock_httpx):
-    mock_db = MagicMock()
+@patch('main.notifier')
+@patch('main.AsyncSessionLocal')
+def test_manual_entry_update_existing(mock_session, mock_notifier):
+    mock_db = AsyncMock()
+    mock_db.add = MagicMock()
+    mock_db.add_all = MagicMock()
     mock_result = MagicMock()
-    mock_db.query.return_value.filter.return_value.first.return_value = mock_result
+    mock_db.get.return_value = mock_result
     mock_session.return_value = mock_db
     
-    mock_client = MagicMock()
-    mock_httpx.return_value.__aenter__.return_value = mock_client
-    
     test_data = {
         "result_id": 123,
         "booth_name": "Test Booth",
@@ -66,11 +73,13 @@ def test_manual_entry_update_existing(mock_session, mock_httpx):
     
     assert mock_result.data is not None
     
-    assert mock_client.post.called
+    assert mock_notifier.notify.called
 
-@patch('main.SessionLocal')
+@patch('main.AsyncSessionLocal')
 def test_manual_entry_missing_fields(mock_session):
-    mock_db = MagicMock()
+    mock_db = AsyncMock()
+    mock_db.add = MagicMock()
+    mock_db.add_all = MagicMock()
     mock_session.return_value = mock_db
     
     test_data = {
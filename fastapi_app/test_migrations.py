@@ -0,0 +1,92 @@
+import json
+import os
+import sys
+import threading
+
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+import pytest
+from sqlalchemy import inspect, text
+
+from common import migrations
+
+
+@pytest.fixture
+def engine(db_engine, monkeypatch):
+    monkeypatch.setattr(migrations, "get_connection", db_engine.connect)
+    return db_engine
+
+
+def test_migrations_upgrade_old_schema_once(engine):
+    with engine.connect() as conn:
+        conn.execute(
+            text(
+                "CREATE TABLE results (id INTEGER PRIMARY KEY, electorate VARCHAR, "
+                "booth_name VARCHAR, timestamp TIMESTAMP, image_url VARCHAR, data VARCHAR)"
+            )
+        )
+        data = {
+            "primary_votes": {"Smith": 10, "Jones": "5"},
+            "totals": {"formal": 15, "informal": 1, "total": 16},
+        }
+        conn.execute(
+            text("INSERT INTO results (id, electorate, data) VALUES (1, :e, :d)"),
+            {"e": "Warringah", "d": json.dumps(data)},
+        )
+        conn.commit()
+
+    assert migrations.run_migrations() == [1, 2, 3, 4, 5, 6, 7, 8]
+    assert migrations.run_migrations() == []
+
+    inspector = inspect(engine)
+    columns = {column["name"] for column in inspector.get_columns("results")}
+    assert {"is_reviewed", "reviewer", "aec_booth_name", "total_votes"} <= columns
+    assert inspector.has_table("result_changes")
+    assert inspector.has_table("jobs")
+    indexes = {
+        index["name"]
+        for table in ("results", "polling_places", "booth_results_2022", "candidates")
+        for index in inspector.get_indexes(table)
+    }
+    assert set(migrations.HOT_PATH_INDEXES) <= indexes
+    assert "ix_results_reviewed_timestamp_id" in indexes
+    with engine.connect() as conn:
+        votes = conn.execute(
+            text("SELECT candidate, votes FROM result_primary_votes ORDER BY id")
+        ).fetchall()
+        assert [tuple(row) for row in votes] == [("Smith", 10), ("Jones", 5)]
+
+
+def test_concurrent_runs_apply_each_migration_once(engine):
+    calls = []
+
+    def apply(conn):
+        calls.append(threading.get_ident())
+        conn.execute(text("CREATE TABLE counted (x INTEGER)"))
+
+    plan = [migrations.Migration(1, "counted", apply)]
+    threads = [
+        threading.Thread(target=migrations.run_migrations, args=(plan,))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+
+
+def test_failed_migration_rolls_back(engine):
+    def broken(conn):
+        conn.execute(text("CREATE TABLE half_done (x INTEGER)"))
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        migrations.run_migrations([migrations.Migration(1, "broken", broken)])
+
+    tables = set(inspect(engine).get_table_names())
+    assert "half_done" not in tables
+    assert "schema_migrations" not in tables
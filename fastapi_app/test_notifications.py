@@ -0,0 +1,88 @@
+import asyncio
+import json
+import os
+import sys
+
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+import httpx
+
+from common.http_client import SharedHTTPClient
+from common.notifications import NotificationDispatcher
+
+URL = "http://flask.test/api/notify"
+
+
+def flask_app(*statuses, delay=0.0):
+    """A fake Flask notify endpoint answering with ``statuses`` in turn."""
+    received = []
+
+    async def handler(request):
+        await asyncio.sleep(delay)
+        received.append(json.loads(request.content))
+        status = statuses[min(len(received), len(statuses)) - 1] if statuses else 200
+        return httpx.Response(status)
+
+    return SharedHTTPClient(transport=httpx.MockTransport(handler)), received
+
+
+def test_notifications_coalesce_per_electorate():
+    shared, received = flask_app()
+    notifier = NotificationDispatcher(URL, shared.get, workers=0, max_pending=2)
+    notifier.notify({"electorate": "Warringah", "result_id": 1})
+    notifier.notify({"electorate": "Mackellar", "result_id": 2})
+    notifier.notify({"electorate": "Warringah", "result_id": 3})
+    # The oldest electorate makes way once the queue is full
+    notifier.notify({"electorate": "Bradfield", "result_id": 4})
+
+    assert asyncio.run(notifier.drain()) == 2
+    assert received == [
+        {"electorate": "Mackellar", "result_id": 2},
+        {"electorate": "Bradfield", "result_id": 4},
+    ]
+    stats = notifier.stats()
+    assert (stats["queued"], stats["coalesced"], stats["dropped"]) == (4, 1, 1)
+    assert (stats["delivered"], stats["pending"]) == (2, 0)
+    assert stats["latency_ms"]["max"] >= stats["latency_ms"]["p50"] >= 0
+
+
+def test_failed_deliveries_are_retried():
+    shared, received = flask_app(503, 500, 200)
+    notifier = NotificationDispatcher(URL, shared.get, workers=0, retry_base=0)
+    notifier.notify({"electorate": "Warringah"})
+    asyncio.run(notifier.drain())
+    assert len(received) == 3
+    assert (notifier.delivered, notifier.retried, notifier.failed) == (1, 2, 0)
+
+    # Client errors are not retried
+    shared, received = flask_app(400)
+    notifier = NotificationDispatcher(URL, shared.get, workers=0, retry_base=0)
+    notifier.notify({"electorate": "Warringah"})
+    asyncio.run(notifier.drain())
+    assert len(received) == 1
+    assert (notifier.delivered, notifier.failed) == (0, 1)
+    assert notifier.stats()["latency_ms"]["p95"] is None
+
+
+def test_workers_deliver_in_the_background():
+    shared, received = flask_app(delay=0.05)
+    notifier = NotificationDispatcher(URL, shared.get, workers=2)
+
+    async def run():
+        notifier.start()
+        for n in range(4):
+            notifier.notify({"electorate": f"Division {n}"})
+        # Queuing returns straight away; the POSTs go out meanwhile
+        assert received == []
+        await asyncio.sleep(0.3)
+        delivered = len(received)
+        notifier.notify({"electorate": "Division 9"})
+        # Shutdown waits for what is still pending
+        await notifier.stop()
+        await shared.aclose()
+        return delivered
+
+    assert asyncio.run(run()) == 4
+    assert len(received) == 5
@@ -0,0 +1,76 @@
+import asyncio
+import io
+import os
+import sys
+
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+from PIL import Image
+
+from common.image_processor import ImageProcessor
+from common.ocr_cache import OCRCache, image_key
+
+
+def entry(n):
+    return {"extracted_rows": [{"RowIndex": 1, "ColumnIndex": 1, "Text": "x" * n}]}
+
+
+def test_entries_persist_and_evict_least_recently_used(tmp_path):
+    size = len(b'{"extracted_rows":[{"RowIndex":1,"ColumnIndex":1,"Text":"xx"}]}')
+    cache = OCRCache(tmp_path, max_bytes=3 * size)
+    for key in ("a", "b", "c"):
+        cache.put(key, entry(2))
+    assert cache.get("a") == entry(2)
+
+    cache.put("d", entry(2))
+    assert cache.get("b") is None
+    assert sorted(path.stem for path in tmp_path.iterdir()) == ["a", "c", "d"]
+    assert cache.stats() == {
+        "entries": 3,
+        "bytes": 3 * size,
+        "max_bytes": 3 * size,
+        "hits": 1,
+        "misses": 1,
+        "evictions": 1,
+    }
+
+    # The linked entry grows past the limit, pushing out the oldest
+    cache.link("c", 7)
+    cache.link("missing", 8)
+    assert sorted(path.stem for path in tmp_path.iterdir()) == ["c", "d"]
+
+    # A new process picks up the entries already on disk
+    reopened = OCRCache(tmp_path, max_bytes=3 * size)
+    assert reopened.get("c") == {**entry(2), "result_id": 7}
+    assert reopened.stats()["bytes"] == cache.stats()["bytes"]
+
+
+def test_repeat_images_skip_textract(tmp_path):
+    class FakeExecutor:
+        calls = 0
+
+        async def analyze_document(self, **kwargs):
+            FakeExecutor.calls += 1
+            return {
+                "Blocks": [
+                    {"Id": "t", "BlockType": "TABLE", "Relationships": []},
+                    {"Id": "q", "BlockType": "QUERY_RESULT", "Text": "Testville"},
+                ]
+            }
+
+    image = io.BytesIO()
+    Image.new("RGB", (4, 4)).save(image, format="PNG")
+    image = image.getvalue()
+    processor = ImageProcessor(executor=FakeExecutor(), cache=OCRCache(tmp_path))
+
+    first = asyncio.run(processor.process_image(image))
+    assert (first["booth_name"], first["result_id"]) == ("Testville", None)
+    assert first["image_sha256"] == image_key(image)
+    processor.link_result(first["image_sha256"], 42)
+
+    again = asyncio.run(processor.process_image(image, source="sms"))
+    assert FakeExecutor.calls == 1
+    assert (again["booth_name"], again["result_id"]) == ("Testville", 42)
+    assert again["source"] == "sms"
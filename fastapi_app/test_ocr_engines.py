@@ -0,0 +1,278 @@
+import asyncio
+import io
+import json
+import os
+import sys
+
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+import pytest
+from PIL import Image, ImageDraw
+
+from common.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from common.image_preprocessing import ImagePreprocessor
+from common.image_processor import ImageProcessor
+from common.ocr_cache import OCRCache, image_key
+from common.ocr_engines import (
+    NoTableFound,
+    OCREngine,
+    OCRRouter,
+    OCRUnavailable,
+    RecordedEngine,
+    TesseractEngine,
+)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeEngine(OCREngine):
+    def __init__(self, name, outcome, delay=0.0):
+        self.name = name
+        self.outcome = outcome
+        self.delay = delay
+        self.calls = 0
+
+    async def recognize(self, image_data, image_sha256):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if isinstance(self.outcome, Exception):
+            raise self.outcome
+        return {"extracted_rows": self.outcome, "booth_name": self.name}
+
+
+def test_circuit_opens_then_lets_one_trial_through():
+    clock = Clock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=30, clock=clock)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert (breaker.state, breaker.allow()) == (OPEN, False)
+
+    clock.now = 30
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert (breaker.state, breaker.allow()) == (OPEN, False)
+
+    clock.now = 60
+    assert breaker.allow()
+    breaker.record_success()
+    assert (breaker.state, breaker.allow()) == (CLOSED, True)
+    assert breaker.stats() == {
+        "state": CLOSED,
+        "consecutive_failures": 0,
+        "opened": 2,
+    }
+
+
+def test_cancelled_trial_frees_the_half_open_circuit():
+    clock = Clock()
+    textract = FakeEngine("textract", RuntimeError("throttled"))
+    router = OCRRouter(
+        [textract], breaker_factory=lambda: CircuitBreaker(1, 30, clock=clock)
+    )
+    with pytest.raises(OCRUnavailable):
+        asyncio.run(router.recognize(b"image", "key"))
+
+    clock.now = 30
+    textract.outcome, textract.delay = [], 1
+
+    async def cancel_trial():
+        trial = asyncio.create_task(router.recognize(b"image", "key"))
+        await asyncio.sleep(0.05)
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+
+    asyncio.run(cancel_trial())
+    assert router.breakers["textract"].state == HALF_OPEN
+    textract.delay = 0
+    assert asyncio.run(router.recognize(b"image", "key"))["engine"] == "textract"
+    assert router.breakers["textract"].state == CLOSED
+
+
+def test_router_falls_back_and_skips_open_circuits():
+    clock = Clock()
+    textract = FakeEngine("textract", RuntimeError("throttled"))
+    local = FakeEngine("tesseract", [{"RowIndex": 1, "ColumnIndex": 1, "Text": "A"}])
+    router = OCRRouter(
+        [textract, local],
+        breaker_factory=lambda: CircuitBreaker(2, 30, clock=clock),
+    )
+
+    for _ in range(3):
+        result = asyncio.run(router.recognize(b"image", "key"))
+        assert result["engine"] == "tesseract"
+    # The third image didn't wait on Textract
+    assert textract.calls == 2
+    stats = {engine["name"]: engine for engine in router.stats()["engines"]}
+    assert stats["textract"]["state"] == OPEN
+    assert (stats["textract"]["failures"], stats["textract"]["skipped"]) == (2, 1)
+    assert stats["tesseract"]["calls"] == 3
+
+    # Once the circuit half-opens, a recovered Textract is used again
+    clock.now = 30
+    textract.outcome = []
+    assert asyncio.run(router.recognize(b"image", "key"))["engine"] == "textract"
+
+
+def test_router_moves_on_from_slow_engines_and_missing_tables():
+    slow = FakeEngine("textract", [], delay=1)
+    blank = FakeEngine("tesseract", NoTableFound("no table"))
+    router = OCRRouter([slow, blank], timeout=0.05)
+    with pytest.raises(OCRUnavailable, match="textract"):
+        asyncio.run(router.recognize(b"image", "key"))
+
+    # Engines that worked but saw no table don't count against the circuit
+    router = OCRRouter([blank])
+    for _ in range(5):
+        with pytest.raises(NoTableFound):
+            asyncio.run(router.recognize(b"image", "key"))
+    assert router.stats()["engines"][0]["state"] == CLOSED
+
+
+def test_router_marks_failures_that_may_clear_up_as_transient():
+    class ThrottlingException(Exception):
+        pass
+
+    def failure(*engines):
+        with pytest.raises(OCRUnavailable) as raised:
+            asyncio.run(OCRRouter(list(engines), timeout=0.05).recognize(b"i", "k"))
+        return raised.value.transient
+
+    broken = FakeEngine("tesseract", RuntimeError("bad"))
+    assert not failure(broken)
+    assert not failure(FakeEngine("textract", NoTableFound("no table")), broken)
+    assert failure(FakeEngine("textract", ThrottlingException()), broken)
+    assert failure(FakeEngine("textract", ConnectionResetError()), broken)
+    assert failure(FakeEngine("textract", [], delay=1), broken)
+
+
+def tally_sheet():
+    """A 3x3 ruled table below a booth name label, and the words on it."""
+    image = Image.new("L", (400, 300), 255)
+    draw = ImageDraw.Draw(image)
+    for y in (100, 150, 200, 250):
+        draw.line([(50, y), (350, y)], fill=0, width=2)
+    for x in (50, 150, 250, 350):
+        draw.line([(x, 100), (x, 250)], fill=0, width=2)
+    data = io.BytesIO()
+    image.save(data, format="PNG")
+
+    words = [
+        ("BOOTH", 50, 40),
+        ("NAME:", 110, 40),
+        ("Manly", 170, 40),
+        ("Vale", 230, 41),
+        ("CANDIDATE", 60, 115),
+        ("ORDINARY", 160, 115),
+        ("SMITH", 60, 165),
+        ("120", 160, 165),
+        ("JONES", 60, 215),
+        ("Sam", 110, 215),
+        ("95", 160, 215),
+        ("", 260, 215),
+    ]
+
+    def image_to_data(image, config, output_type):
+        assert image.size == (400, 300)
+        return {
+            "text": [text for text, _, _ in words],
+            "left": [left for _, left, _ in words],
+            "top": [top for _, _, top in words],
+            "width": [40] * len(words),
+            "height": [16] * len(words),
+            "conf": ["96"] * (len(words) - 1) + ["-1"],
+        }
+
+    return data.getvalue(), image_to_data
+
+
+def test_tesseract_places_words_in_grid_cells():
+    image, image_to_data = tally_sheet()
+    engine = TesseractEngine(workers=1, image_to_data=image_to_data)
+    result = asyncio.run(engine.recognize(image, image_key(image)))
+
+    assert result["booth_name"] == "Manly Vale"
+    cells = {
+        (cell["RowIndex"], cell["ColumnIndex"]): cell["Text"]
+        for cell in result["extracted_rows"]
+    }
+    assert cells == {
+        (1, 1): "CANDIDATE",
+        (1, 2): "ORDINARY",
+        (1, 3): "",
+        (2, 1): "SMITH",
+        (2, 2): "120",
+        (2, 3): "",
+        (3, 1): "JONES Sam",
+        (3, 2): "95",
+        (3, 3): "",
+    }
+
+
+def test_recorded_responses_run_the_pipeline_offline(tmp_path):
+    image, _ = tally_sheet()
+    rows = [{"RowIndex": 1, "ColumnIndex": 1, "Text": "SMITH"}]
+    (tmp_path / f"{image_key(image)}.json").write_text(
+        json.dumps({"extracted_rows": rows, "booth_name": "Recorded"})
+    )
+    processor = ImageProcessor(
+        preprocessor=ImagePreprocessor(workers=0),
+        engines=[RecordedEngine(tmp_path)],
+    )
+    result = asyncio.run(processor.process_image(image))
+    assert (result["engine"], result["booth_name"]) == ("recorded", "Recorded")
+    assert result["extracted_rows"] == rows
+
+    # Unknown images get the default response, if there is one
+    engine = RecordedEngine(tmp_path)
+    with pytest.raises(LookupError):
+        asyncio.run(engine.recognize(b"other", "0" * 64))
+    (tmp_path / "default.json").write_text(json.dumps({"extracted_rows": []}))
+    assert asyncio.run(engine.recognize(b"other", "0" * 64))["booth_name"] is None
+
+
+def test_fallback_reads_are_cached_until_the_primary_engine_recovers(tmp_path):
+    clock = Clock()
+    textract = FakeEngine("textract", RuntimeError("throttled"))
+    local = FakeEngine("tesseract", [])
+    processor = ImageProcessor(
+        preprocessor=ImagePreprocessor(workers=0),
+        cache=OCRCache(tmp_path),
+        engines=[textract, local],
+    )
+    processor.ocr = OCRRouter(
+        [textract, local], breaker_factory=lambda: CircuitBreaker(1, 30, clock=clock)
+    )
+    sheet, _ = tally_sheet()
+    saved = io.BytesIO()
+    Image.new("L", (40, 40), 255).save(saved, format="PNG")
+    saved = saved.getvalue()
+
+    def scan(image):
+        return asyncio.run(processor.process_image(image))
+
+    assert scan(sheet)["engine"] == "tesseract"
+    assert scan(saved)["engine"] == "tesseract"
+    processor.link_result(image_key(saved), 7)
+    # While Textract's circuit is open the fallback read is reused
+    assert scan(sheet)["engine"] == "tesseract"
+    assert (textract.calls, local.calls) == (1, 2)
+
+    clock.now = 30
+    textract.outcome = []
+    assert scan(sheet)["engine"] == "textract"
+    assert scan(sheet)["engine"] == "textract"
+    assert textract.calls == 2
+    # A fallback read saved as a result still links to it
+    assert scan(saved)["result_id"] == 7
@@ -0,0 +1,140 @@
+import threading
+
+import pytest
+from sqlalchemy import text
+
+from common import booth_results_processor as processor
+from common import bulk_loader
+
+
+@pytest.fixture
+def engine(db_engine, monkeypatch):
+    monkeypatch.setattr(processor, "get_connection", db_engine.connect)
+    monkeypatch.setattr(bulk_loader, "get_connection", db_engine.connect)
+    processor.create_polling_places_table()
+    return db_engine
+
+
+def make_places(count, division="Warringah", prefix="Booth"):
+    return [
+        {
+            "state": "NSW",
+            "division_id": 1,
+            "division_name": division,
+            "polling_place_id": n + 1,
+            "polling_place_name": f"{prefix} {n}",
+            "address": f"{n} Example St",
+            "status": "Current",
+        }
+        for n in range(count)
+    ]
+
+
+def booth_names(engine):
+    with engine.connect() as conn:
+        return [
+            row[0]
+            for row in conn.execute(
+                text("SELECT polling_place_name FROM polling_places ORDER BY id")
+            )
+        ]
+
+
+def booth_ids(engine):
+    with engine.connect() as conn:
+        return dict(
+            conn.execute(text("SELECT polling_place_id, id FROM polling_places")).all()
+        )
+
+
+def test_reload_replaces_booths(engine):
+    assert processor.save_polling_places_to_database(make_places(3, prefix="Old"))
+    new_places = make_places(2, prefix="New") + [
+        {"state": "", "division_name": "Warringah", "polling_place_name": "Bad"}
+    ]
+    assert processor.save_polling_places_to_database(new_places)
+    assert processor.save_polling_places_to_database(make_places(2, prefix="New"))
+
+    assert booth_names(engine) == ["New 0", "New 1"]
+
+
+def test_reload_only_writes_changed_booths(engine):
+    places = make_places(5)
+    processor.save_polling_places_to_database(places)
+    ids_before = booth_ids(engine)
+
+    places[2] = {**places[2], "status": "Abolished"}
+    places.append(
+        {**places[0], "polling_place_id": 99, "polling_place_name": "Late Booth"}
+    )
+    processor.save_polling_places_to_database(places)
+
+    reports = {r.table: r for r in bulk_loader.get_load_reports()}
+    report = reports["polling_places"]
+    assert (report.inserted, report.updated, report.deleted, report.unchanged) == (
+        1,
+        1,
+        0,
+        4,
+    )
+    ids_after = booth_ids(engine)
+    assert {k: ids_after[k] for k in ids_before} == ids_before
+    with engine.connect() as conn:
+        assert (
+            conn.execute(
+                text("SELECT status FROM polling_places WHERE polling_place_id = 3")
+            ).scalar()
+            == "Abolished"
+        )
+
+
+def test_reload_keeps_prepoll_booths(engine):
+    processor.save_polling_places_to_database(make_places(2))
+    assert processor.add_prepoll_booths()
+    processor.save_polling_places_to_database(make_places(3))
+
+    assert booth_names(engine) == [
+        "Booth 0",
+        "Booth 1",
+        "Pre-Poll-Warringah",
+        "Booth 2",
+    ]
+
+
+def test_failed_reload_keeps_existing_booths(engine):
+    processor.save_polling_places_to_database(make_places(3, prefix="Old"))
+
+    # An ID too large for the column fails the insert after the updates
+    new_places = make_places(3, prefix="New") + [
+        {**make_places(1)[0], "polling_place_id": 2**63}
+    ]
+    assert not processor.save_polling_places_to_database(new_places)
+
+    assert booth_names(engine) == ["Old 0", "Old 1", "Old 2"]
+
+
+def test_readers_never_see_an_empty_table(engine):
+    processor.save_polling_places_to_database(make_places(500, prefix="Old"))
+    counts = []
+    done = threading.Event()
+
+    def reader():
+        while not done.is_set():
+            with engine.connect() as conn:
+                counts.append(
+                    conn.execute(text("SELECT COUNT(*) FROM polling_places")).scalar()
+                )
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    try:
+        for _ in range(5):
+            assert processor.save_polling_places_to_database(
+                make_places(500, prefix="New")
+            )
+    finally:
+        done.set()
+        thread.join()
+
+    assert counts
+    assert set(counts) == {500}
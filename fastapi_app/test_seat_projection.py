@@ -0,0 +1,51 @@
+import time
+
+import numpy as np
+import pytest
+
+from common.seat_projection import ProjectionBaseline, project_tcp
+
+
+def test_projection_applies_counted_swing_to_uncounted_booths():
+    baseline = ProjectionBaseline(
+        [
+            ("Adiv", "Booth A", 60.0, 100),
+            ("Adiv", "Booth B", 40.0, 300),
+            ("Bdiv", "Booth C", 55.0, 200),
+            ("Bdiv", "Booth D", None, 200),
+        ]
+    )
+    current = np.full(len(baseline), np.nan)
+    current[baseline.booths[("Adiv", "BOOTH A")]] = 50.0
+
+    projection = project_tcp(baseline, current, [False, True])
+
+    # Booth A swung 10 points to candidate 1 (40% -> 50%); Booth B follows
+    assert projection["swing"][0] == pytest.approx(10.0)
+    assert projection["projected_pct1"][0] == pytest.approx((50 * 100 + 70 * 300) / 400)
+    assert projection["counted_share"][0] == pytest.approx(25.0)
+    assert list(projection["booths_counted"]) == [1, 0]
+    assert list(projection["total_booths"]) == [2, 1]
+    assert np.isnan(projection["swing"][1])
+    assert np.isnan(projection["projected_pct1"][1])
+
+
+def test_projection_of_every_division_is_fast():
+    rng = np.random.default_rng(150)
+    booths = [
+        (f"Division {d}", f"Booth {b}", rng.uniform(20, 80), rng.integers(100, 3000))
+        for d in range(150)
+        for b in range(60)
+    ]
+    baseline = ProjectionBaseline(booths)
+    current = np.where(
+        rng.random(len(baseline)) < 0.4, rng.uniform(20, 80, len(baseline)), np.nan
+    )
+    liberal_first = rng.random(len(baseline.divisions)) < 0.5
+
+    started = time.perf_counter()
+    projection = project_tcp(baseline, current, liberal_first)
+    assert time.perf_counter() - started < 0.1
+    projected = projection["projected_pct1"]
+    assert not np.isnan(projected).any()
+    assert ((projected >= 0) & (projected <= 100)).all()
@@ -0,0 +1,190 @@
+import asyncio
+import io
+import os
+import sys
+import threading
+import time
+
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+import pytest
+from botocore.exceptions import ClientError
+from PIL import Image
+
+from common.image_processor import ImageProcessor
+from common.textract_executor import TextractExecutor, TokenBucket
+
+
+class FakeTextract:
+    """Stands in for the boto3 Textract client, throttling the first calls."""
+
+    def __init__(self, throttle=0, delay=0.0):
+        self.throttle = throttle
+        self.delay = delay
+        self.started = []
+        self.active = 0
+        self.peak_active = 0
+        self.lock = threading.Lock()
+
+    def analyze_document(self, **kwargs):
+        with self.lock:
+            self.started.append(time.monotonic())
+            self.active += 1
+            self.peak_active = max(self.peak_active, self.active)
+            throttled = len(self.started) <= self.throttle
+        try:
+            time.sleep(self.delay)
+            if throttled:
+                raise ClientError(
+                    {
+                        "Error": {
+                            "Code": "ProvisionedThroughputExceededException",
+                            "Message": "Rate exceeded",
+                        }
+                    },
+                    "AnalyzeDocument",
+                )
+            return {"Blocks": [], "Document": kwargs["Document"]}
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+def test_token_bucket_queues_callers_behind_each_other():
+    now = [0.0]
+    bucket = TokenBucket(2, capacity=2, clock=lambda: now[0])
+    assert [bucket.reserve() for _ in range(4)] == [0, 0, 0.5, 1.0]
+    now[0] = 1.0
+    assert bucket.reserve() == 0.5
+    bucket.set_rate(1)
+    assert bucket.reserve() == 2.0
+
+
+def test_concurrency_is_bounded_and_loop_stays_free():
+    client = FakeTextract(delay=0.05)
+    executor = TextractExecutor(client, max_concurrency=3, tps=1000)
+
+    async def run():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.005)
+
+        ticker = asyncio.create_task(tick())
+        responses = await asyncio.gather(
+            *[executor.analyze_document(Document={"Bytes": n}) for n in range(9)]
+        )
+        ticker.cancel()
+        return responses, ticks
+
+    responses, ticks = asyncio.run(run())
+    assert [r["Document"]["Bytes"] for r in responses] == list(range(9))
+    assert client.peak_active == 3
+    # The event loop kept running while the calls blocked
+    assert ticks >= 10
+    stats = executor.stats()
+    assert stats["calls"] == 9
+    assert stats["peak_queued"] >= 6
+    assert (stats["queued"], stats["in_flight"]) == (0, 0)
+
+
+def test_calls_are_rate_limited():
+    client = FakeTextract()
+    executor = TextractExecutor(client, max_concurrency=4, tps=20)
+
+    async def run():
+        await asyncio.gather(
+            *[executor.analyze_document(Document={}) for _ in range(6)]
+        )
+
+    asyncio.run(run())
+    # One token to start with, then one every 50ms
+    assert client.started[-1] - client.started[0] >= 0.24
+
+
+def test_throttled_calls_are_retried_and_slow_the_rate():
+    client = FakeTextract(throttle=2)
+    executor = TextractExecutor(
+        client, max_concurrency=1, tps=100, retry_base=0.001, max_retries=2
+    )
+    assert asyncio.run(executor.analyze_document(Document={})) == {
+        "Blocks": [],
+        "Document": {},
+    }
+    stats = executor.stats()
+    assert (stats["calls"], stats["throttled"], stats["retries"]) == (3, 2, 2)
+    # Halved twice, then a success wins a tenth of the quota back
+    assert stats["current_tps"] == pytest.approx(35)
+
+    client = FakeTextract(throttle=5)
+    executor = TextractExecutor(
+        client, max_concurrency=1, tps=100, retry_base=0.001, max_retries=2
+    )
+    with pytest.raises(ClientError):
+        asyncio.run(executor.analyze_document(Document={}))
+    assert executor.stats()["failed"] == 1
+    assert len(client.started) == 3
+
+
+def test_other_errors_are_not_retried():
+    class Broken:
+        calls = 0
+
+        def analyze_document(self, **kwargs):
+            Broken.calls += 1
+            raise ValueError("bad document")
+
+    executor = TextractExecutor(Broken(), tps=100)
+    with pytest.raises(ValueError):
+        asyncio.run(executor.analyze_document(Document={}))
+    assert Broken.calls == 1
+    assert executor.stats()["throttled"] == 0
+
+
+def test_image_processor_uses_executor():
+    image = io.BytesIO()
+    Image.new("RGB", (4, 4)).save(image, format="PNG")
+
+    class OneTable(FakeTextract):
+        def analyze_document(self, **kwargs):
+            super().analyze_document(**kwargs)
+            return {
+                "Blocks": [
+                    {"Id": "t", "BlockType": "TABLE", "Relationships": []},
+                    {"Id": "q", "BlockType": "QUERY_RESULT", "Text": " Testville "},
+                ]
+            }
+
+    client = OneTable(throttle=1)
+    processor = ImageProcessor(
+        executor=TextractExecutor(client, tps=100, retry_base=0.001)
+    )
+    result = asyncio.run(processor.process_image(image.getvalue()))
+    assert result["booth_name"] == "Testville"
+    assert len(client.started) == 2
+
+
+def test_calls_given_up_before_sending_are_skipped():
+    client = FakeTextract()
+    executor = TextractExecutor(client, max_concurrency=1, tps=5)
+
+    async def run():
+        first = executor.analyze_document(Document={})
+        # The second call waits 200ms for a token; the caller stops waiting first
+        second = asyncio.wait_for(executor.analyze_document(Document={}), 0.05)
+        results = await asyncio.gather(first, second, return_exceptions=True)
+        await asyncio.sleep(0.3)
+        return results
+
+    first, second = asyncio.run(run())
+    assert first == {"Blocks": [], "Document": {}}
+    assert isinstance(second, asyncio.TimeoutError)
+    assert len(client.started) == 1
+    stats = executor.stats()
+    assert (stats["calls"], stats["abandoned"]) == (1, 1)
+    assert (stats["queued"], stats["in_flight"]) == (0, 0)
@@ -23,6 +23,7 @@ from flask import (
     get_flashed_messages,
     g,
     send_from_directory,
+    Response,
 )
 from flask_socketio import SocketIO, emit
 from flask_login import (
@@ -45,11 +46,13 @@ from utils.aec_data_downloader import (
     download_and_process_aec_data,
     get_candidates_for_electorate,
 )
-from common.booth_results_processor import (
-    process_and_load_polling_places,
-    get_polling_places_for_division,
+from common.booth_results_processor import process_and_load_polling_places
+from common.db_utils import (
+    get_sqlalchemy_url,
+    ensure_database_exists,
+    engine_options,
+    is_sqlite_url,
 )
-from common.db_utils import get_sqlalchemy_url, ensure_database_exists
 
 load_dotenv()
 
@@ -89,6 +92,11 @@ os.chmod(data_dir, 0o777)  # Full permissions for the data directory
 app = Flask(__name__)
 app.config["SECRET_KEY"] = os.environ.get("SECRET_KEY", "dev_key_for_amalfi_results")
 app.config["SQLALCHEMY_DATABASE_URI"] = get_sqlalchemy_url()
+if not is_sqlite_url(app.config["SQLALCHEMY_DATABASE_URI"]):
+    # Size the server connection pool the same way as the FastAPI service
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(
+        app.config["SQLALCHEMY_DATABASE_URI"]
+    )
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 app.config["TEMPLATES_AUTO_RELOAD"] = True
 app.config["INSTANCE_PATH"] = (
@@ -513,17 +521,21 @@ def get_dashboard(electorate=None):
         return redirect(url_for("index"))
 
     # Initialize empty data structures - data will be loaded by frontend directly from FastAPI
-    booth_counts = {}
-    total_booths = {}
     booth_results = []
     primary_votes_array = []
     tcp_votes_array = []
 
-    # Get polling places counts for each electorate
+    # Booth counts and vote totals for every division in one request
+    overview = api_call("/results/divisions", params={"divisions": "all"})
+    summaries = (
+        overview.get("divisions", {}) if overview.get("status") == "success" else {}
+    )
+    booth_counts = {e: s["booth_count"] for e, s in summaries.items()}
+    total_booths = {e: s["total_booths"] for e, s in summaries.items()}
+    total_votes = {e: s["total_votes"] for e, s in summaries.items()}
     for e in electorates:
-        polling_places = get_polling_places_for_division(e)
-        total_booths[e] = len(polling_places) if polling_places else 0
-        booth_counts[e] = 0  # Will be populated by frontend
+        booth_counts.setdefault(e, 0)
+        total_booths.setdefault(e, 0)
 
     if not electorate:
         electorate = session.get("default_division")
@@ -536,13 +548,6 @@ def get_dashboard(electorate=None):
 
     is_admin = current_user.is_admin if hasattr(current_user, "is_admin") else False
 
-    # Calculate total votes for each electorate
-    total_votes = {}
-    for booth_result in booth_results:
-        if booth_result.electorate not in total_votes:
-            total_votes[booth_result.electorate] = 0
-        total_votes[booth_result.electorate] += booth_result.get_totals()["total"]
-
     return render_template(
         "electorate_dashboard.html",
         electorates=electorates,
@@ -724,6 +729,8 @@ def admin_review_result(result_id):
                     self.electorate = data["electorate"]
                     self.booth_name = data["booth_name"]
                     self.image_url = data["image_url"]
+                    self.aec_booth_name = data.get("aec_booth_name")
+                    self.booth_matches = data.get("booth_matches", [])
                     self._data = data["data"]
 
                 def get_primary_votes(self):
@@ -782,6 +789,7 @@ def admin_panel(division=None):
         messages=messages,
         selected_electorate=division,
         is_admin=app.config.get("IS_ADMIN", False),
+        scan_job=request.args.get("scan_job", type=int),
     )
 
 
@@ -1000,6 +1008,16 @@ def admin_upload_image():
         app.logger.info("Successfully uploaded image to FastAPI")
 
         result_data = response.json()
+        if result_data.get("status") == "queued":
+            # Scanning runs in the background; the admin panel polls the job
+            job_id = result_data["job_id"]
+            flash(
+                f"Image queued for processing (job {job_id}). The result will "
+                "open for review once it has been scanned.",
+                "info",
+            )
+            return redirect(url_for("admin_panel", scan_job=job_id))
+
         if result_data.get("status") == "success":
             result_id = result_data.get("result_id")
             flash("Image processed successfully!", "success")
@@ -1015,6 +1033,42 @@ def admin_upload_image():
         return redirect(url_for("admin_panel"))
 
 
+# Cache validators passed between the browser and FastAPI by the GET proxy
+PROXIED_RESPONSE_HEADERS = ("ETag", "Cache-Control")
+
+
+def proxy_get(endpoint):
+    """
+    Proxy a GET to FastAPI, passing conditional request headers both ways.
+
+    The upstream body is returned byte for byte so its strong ETag stays
+    valid, and a 304 from FastAPI is returned to the browser as a 304.
+    """
+    url = f"{FASTAPI_URL}{endpoint}"
+    headers = {}
+    if request.headers.get("If-None-Match"):
+        headers["If-None-Match"] = request.headers["If-None-Match"]
+    try:
+        upstream = requests.get(url, params=request.args, headers=headers, timeout=5)
+        passthrough = {
+            name: upstream.headers[name]
+            for name in PROXIED_RESPONSE_HEADERS
+            if name in upstream.headers
+        }
+        if upstream.status_code == 304:
+            return Response(status=304, headers=passthrough)
+        upstream.raise_for_status()
+        return Response(
+            upstream.content,
+            status=upstream.status_code,
+            content_type=upstream.headers.get("Content-Type", "application/json"),
+            headers=passthrough,
+        )
+    except requests.exceptions.RequestException as e:
+        app.logger.error(f"Failed to connect to FastAPI: {e}")
+        return jsonify({"status": "error", "message": str(e)})
+
+
 @app.route("/api/<path:path>", methods=["GET", "POST", "PUT", "DELETE"])
 def api_proxy(path):
     """Proxy all /api/* requests to the FastAPI server"""
@@ -1023,8 +1077,7 @@ def api_proxy(path):
 
     try:
         if method.lower() == "get":
-            response = api_call(f"/{path}", method="get", params=request.args)
-            return jsonify(response)
+            return proxy_get(f"/{path}")
         elif method.lower() == "post":
             data = request.get_json(silent=True)
             response = api_call(f"/{path}", method="post", data=data)
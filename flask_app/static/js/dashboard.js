@@ -100,13 +100,26 @@ async function loadPollingPlaces(electorate) {
     }
 }
 
+// ETag of the results currently displayed, so refreshing unchanged results
+// costs a 304 instead of the full payload
+let displayedResults = { division: null, etag: null };
+
 // Function to load results for a division
 async function loadResults(division) {
     try {
-        const response = await fetch(`/api/results/division/${encodeURIComponent(division)}`);
+        const headers = displayedResults.division === division && displayedResults.etag
+            ? { 'If-None-Match': displayedResults.etag }
+            : {};
+        const response = await fetch(`/api/results/division/${encodeURIComponent(division)}`, {
+            headers,
+            cache: 'no-store'
+        });
+        if (response.status === 304) return;
+
         const data = await response.json();
         
         if (data.status === 'success') {
+            displayedResults = { division, etag: response.headers.get('ETag') };
             updateDashboard(data);
         } else {
             console.error('Error loading results:', data.detail);
@@ -395,12 +408,28 @@ function openManualEntryModal(resultId, boothName, electorate) {
     console.log('Opening manual entry modal:', { resultId, boothName, electorate });
 }
 
-// Set up auto-refresh
-setInterval(() => {
-    if (currentElectorate) {
-        loadResults(currentElectorate);
+// Sequence number of the last result change seen, so each refresh only asks
+// which divisions changed since then
+let resultsSeq = null;
+
+async function refreshChangedResults() {
+    if (!currentElectorate) return;
+    try {
+        const since = resultsSeq === null ? '' : `?since=${resultsSeq}&fields=id`;
+        const response = await fetch(`/api/results/changes${since}`, { cache: 'no-store' });
+        if (!response.ok) throw new Error('Failed to fetch result changes');
+        const changes = await response.json();
+        if (resultsSeq === null || changes.reset || changes.divisions.includes(currentElectorate)) {
+            await loadResults(currentElectorate);
+        }
+        resultsSeq = changes.seq;
+    } catch (error) {
+        console.error('Error checking for result changes:', error);
     }
-}, 30000); // Refresh every 30 seconds 
+}
+
+// Set up auto-refresh
+setInterval(refreshChangedResults, 30000); // Refresh every 30 seconds 
 
 // Function to update TCP votes display
 function updateTCPVotes(votes) {
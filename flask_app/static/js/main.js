@@ -3,6 +3,7 @@ document.addEventListener('DOMContentLoaded', function() {
     console.log('Amalfi Results app initialized');
     
     if (window.location.pathname === '/results') {
+        checkForNewResults();
         setInterval(checkForNewResults, 30000);
     }
     
@@ -18,14 +19,22 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 });
 
+// Sequence number of the last result change seen; each check only asks for
+// the changes since then
+let resultsSeq = null;
+
 function checkForNewResults() {
-    fetch('/api/results')
+    const since = resultsSeq === null ? '' : `?since=${resultsSeq}&fields=id`;
+    fetch(`/api/results/changes${since}`, { cache: 'no-store' })
         .then(response => response.json())
         .then(data => {
-            const currentCount = document.querySelectorAll('tbody tr').length;
-            if (data.length > currentCount) {
+            if (data.status !== 'success') return;
+            const changed = data.reset || data.results.length || data.deleted.length;
+            if (resultsSeq !== null && changed) {
                 window.location.reload();
+                return;
             }
+            resultsSeq = data.seq;
         })
         .catch(error => console.error('Error checking for new results:', error));
 }
@@ -51,5 +51,30 @@ class TestAdminUpload(unittest.TestCase):
         
         self.assertIn(b'Image processed successfully', response.data)
 
+    @patch('app.requests.get')
+    @patch('app.requests.post')
+    def test_admin_upload_image_returns_queued_job(self, mock_post, mock_get):
+        mock_post.return_value = MagicMock(status_code=202)
+        mock_post.return_value.json.return_value = {
+            'status': 'queued',
+            'job_id': 7,
+            'status_url': '/jobs/7'
+        }
+
+        self.app.post('/login', data={
+            'email': 'admin@test.com',
+            'password': 'password'
+        })
+
+        test_image = (BytesIO(b'test image content'), 'test.jpg')
+        response = self.app.post('/admin/upload-image',
+                                 data={'image': test_image},
+                                 content_type='multipart/form-data')
+
+        # The upload doesn't wait for the scan; the admin panel polls the job
+        mock_get.assert_not_called()
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('/admin/panel?scan_job=7', response.headers['Location'])
+
 if __name__ == '__main__':
     unittest.main()
@@ -12,7 +12,16 @@ import logging
 import requests
 from pathlib import Path
 from typing import Dict, List, Any, Optional
-import sqlite3
+
+from sqlalchemy import text
+
+from common.bulk_loader import (
+    file_sha256,
+    record_source_hash,
+    source_unchanged,
+    sync_rows,
+)
+from common.db_utils import get_connection, get_db_path, primary_key_column
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
@@ -24,12 +33,31 @@ AEC_SENATE_CANDIDATES_URL = (
 )
 AEC_HOUSE_CANDIDATES_URL = "https://aec.gov.au/election/files/data/house-candidates.csv"
 
+CANDIDATE_COLUMNS = (
+    "candidate_name",
+    "party",
+    "electorate",
+    "ballot_position",
+    "candidate_type",
+    "state",
+    "data",
+)
+
+# A candidate's ballot identity; the senate reuses ballot positions across
+# tickets, so the name is part of the key
+CANDIDATE_KEY_COLUMNS = (
+    "candidate_type",
+    "electorate",
+    "ballot_position",
+    "candidate_name",
+)
+
 # Determine if running in Docker
 is_docker = os.path.exists("/.dockerenv") or os.path.isdir("/app/data")
 data_dir_path = (
     "/app/data" if is_docker else str(Path(__file__).parent.parent.parent / "data")
 )
-db_path = f"{data_dir_path}/results.db"
+db_path = get_db_path()
 
 logger.info(f"Using database path: {db_path}")
 
@@ -118,29 +146,28 @@ def save_to_json(data: List[Dict[str, Any]], output_path: Path) -> bool:
 
 
 def create_candidates_table() -> None:
-    """Create the candidates table in the SQLite database if it doesn't exist."""
+    """Create the candidates table in the database if it doesn't exist."""
     try:
-        logger.info(f"Creating candidates table in database: {db_path}")
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-
-        cursor.execute(
+        logger.info("Creating candidates table if it doesn't exist")
+        with get_connection() as conn:
+            conn.execute(
+                text(
+                    f"""
+            CREATE TABLE IF NOT EXISTS candidates (
+                {primary_key_column(conn)},
+                candidate_name TEXT NOT NULL,
+                party TEXT,
+                electorate TEXT NOT NULL,
+                ballot_position INTEGER,
+                candidate_type TEXT NOT NULL,
+                state TEXT,
+                data TEXT,
+                row_hash TEXT
+            )
             """
-        CREATE TABLE IF NOT EXISTS candidates (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            candidate_name TEXT NOT NULL,
-            party TEXT,
-            electorate TEXT NOT NULL,
-            ballot_position INTEGER,
-            candidate_type TEXT NOT NULL,
-            state TEXT,
-            data JSON
-        )
-        """
-        )
-
-        conn.commit()
-        conn.close()
+                )
+            )
+            conn.commit()
         logger.info("Successfully created candidates table")
     except Exception as e:
         logger.error(f"Error creating candidates table: {e}")
@@ -148,7 +175,9 @@ def create_candidates_table() -> None:
 
 def save_to_database(candidates: List[Dict[str, Any]], candidate_type: str) -> bool:
     """
-    Save candidate data to the SQLite database.
+    Save candidate data to the database.
+
+    Only candidates that are new, changed or no longer listed are written.
 
     Args:
         candidates: List of candidate dictionaries
@@ -159,59 +188,41 @@ def save_to_database(candidates: List[Dict[str, Any]], candidate_type: str) -> b
     """
     try:
         logger.info(f"Saving {len(candidates)} {candidate_type} candidates to database")
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-
-        cursor.execute(
-            "DELETE FROM candidates WHERE candidate_type = ?", (candidate_type,)
-        )
+        if candidates:
+            logger.info(f"First candidate data: {candidates[0]}")
 
+        rows = []
         for candidate in candidates:
-            if candidate == candidates[0]:
-                logger.info(f"First candidate data: {candidate}")
-
-            if candidate_type == "senate":
-                surname = candidate.get("surname", "")
-                given_name = candidate.get("ballotGivenName", "")
-                name = f"{given_name} {surname}".strip()
-                party = candidate.get("partyBallotName", "")
-                electorate = candidate.get("state", "")
-                state = candidate.get("state", "")
-                try:
-                    ballot_position = int(candidate.get("ballotPosition", 0))
-                except (ValueError, TypeError):
-                    ballot_position = 0
-            else:  # house
-                surname = candidate.get("surname", "")
-                given_name = candidate.get("ballotGivenName", "")
-                name = f"{given_name} {surname}".strip()
-                party = candidate.get("partyBallotName", "")
-                electorate = candidate.get("division", "")
-                state = candidate.get("state", "")
-                try:
-                    ballot_position = int(candidate.get("ballotPosition", 0))
-                except (ValueError, TypeError):
-                    ballot_position = 0
-
-            cursor.execute(
-                """
-            INSERT INTO candidates 
-            (candidate_name, party, electorate, ballot_position, candidate_type, state, data)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            """,
-                (
-                    name,
-                    party,
-                    electorate,
-                    ballot_position,
-                    candidate_type,
-                    state,
-                    json.dumps(candidate),
-                ),
+            surname = candidate.get("surname", "")
+            given_name = candidate.get("ballotGivenName", "")
+            try:
+                ballot_position = int(candidate.get("ballotPosition", 0))
+            except (ValueError, TypeError):
+                ballot_position = 0
+            rows.append(
+                {
+                    "candidate_name": f"{given_name} {surname}".strip(),
+                    "party": candidate.get("partyBallotName", ""),
+                    # Senate candidates are grouped by state rather than division
+                    "electorate": candidate.get(
+                        "state" if candidate_type == "senate" else "division", ""
+                    ),
+                    "ballot_position": ballot_position,
+                    "candidate_type": candidate_type,
+                    "state": candidate.get("state", ""),
+                    "data": json.dumps(candidate),
+                }
             )
 
-        conn.commit()
-        conn.close()
+        sync_rows(
+            "candidates",
+            CANDIDATE_KEY_COLUMNS,
+            CANDIDATE_COLUMNS,
+            rows,
+            where="candidate_type = :candidate_type",
+            params={"candidate_type": candidate_type},
+            label=f"candidates ({candidate_type})",
+        )
         logger.info(f"Successfully saved {candidate_type} candidates to database")
         return True
     except Exception as e:
@@ -231,23 +242,19 @@ def get_candidates_for_electorate(electorate: str) -> List[Dict[str, Any]]:
     """
     try:
         logger.info(f"Getting candidates for electorate: {electorate}")
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-
-        cursor.execute(
+        with get_connection() as conn:
+            cursor = conn.execute(
+                text(
+                    """
+            SELECT * FROM candidates 
+            WHERE electorate = :electorate 
+            ORDER BY ballot_position
             """
-        SELECT * FROM candidates 
-        WHERE electorate = ? 
-        ORDER BY ballot_position
-        """,
-            (electorate,),
-        )
-
-        rows = cursor.fetchall()
-        candidates = [dict(row) for row in rows]
+                ),
+                {"electorate": electorate},
+            )
+            candidates = [dict(row) for row in cursor.mappings()]
 
-        conn.close()
         logger.info(f"Found {len(candidates)} candidates for electorate {electorate}")
         return candidates
     except Exception as e:
@@ -255,6 +262,33 @@ def get_candidates_for_electorate(electorate: str) -> List[Dict[str, Any]]:
         return []
 
 
+def load_candidates_file(csv_path: Path, candidate_type: str) -> bool:
+    """
+    Load a downloaded candidates CSV unless it matches the file last loaded.
+
+    Args:
+        csv_path: Path to the downloaded CSV file
+        candidate_type: Type of candidates ('senate' or 'house')
+
+    Returns:
+        bool: True if the candidates are loaded, False otherwise
+    """
+    content_hash = file_sha256(csv_path)
+    if source_unchanged(csv_path.name, content_hash, "candidates"):
+        logger.info(f"{csv_path.name} is unchanged, skipping reload")
+        return True
+
+    candidates = parse_csv(csv_path)
+    if not candidates:
+        return False
+
+    save_to_json(candidates, csv_path.with_suffix(".json"))
+    if not save_to_database(candidates, candidate_type):
+        return False
+    record_source_hash(csv_path.name, content_hash, len(candidates))
+    return True
+
+
 def download_and_process_aec_data() -> bool:
     """Download and process AEC candidate data."""
     try:
@@ -271,21 +305,10 @@ def download_and_process_aec_data() -> bool:
         if not download_file(AEC_HOUSE_CANDIDATES_URL, house_csv_path):
             return False
 
-        # Parse and save data
-        senate_candidates = parse_csv(senate_csv_path)
-        house_candidates = parse_csv(house_csv_path)
-
-        if not senate_candidates or not house_candidates:
-            return False
-
-        # Save to JSON files
-        save_to_json(senate_candidates, data_dir / "senate-candidates.json")
-        save_to_json(house_candidates, data_dir / "house-candidates.json")
-
-        # Save to database
-        if not save_to_database(senate_candidates, "senate"):
+        # Parse and save any file that changed
+        if not load_candidates_file(senate_csv_path, "senate"):
             return False
-        if not save_to_database(house_candidates, "house"):
+        if not load_candidates_file(house_csv_path, "house"):
             return False
 
         return True